@@ -0,0 +1,300 @@
+"""
+Process-wide Chromium shared by every Playwright spider in a CrawlerProcess.
+
+- The browser is launched on the first `playwright=True` request, never at startup.
+- Each crawler's download handler registers itself as a user of the browser.
+- The browser (and the Playwright driver) is closed when the last user releases it.
+- While the browser is up, the RSS of the Playwright process tree is sampled so each
+  spider can report the peak memory the browser reached while it was running.
+
+Pages are handed out by a per-spider `PagePool`: spiders lease pages through
+`playwright_include_page` and give them back with `release_page(page)` instead of closing them.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import suppress
+
+from playwright.async_api import PlaywrightContextManager
+
+logger = logging.getLogger(__name__)
+
+RSS_SAMPLE_INTERVAL = 2  # seconds
+
+BROWSER_LAUNCH_SECONDS = "playwright/browser_launch_seconds"
+BROWSER_PEAK_RSS = "playwright/browser_peak_rss"
+
+
+def _children_by_pid():
+    """Map each pid to the pids of its direct children, using /proc (Linux only)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The process name may contain spaces, so split after the closing parenthesis
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return 0
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def process_tree_rss(root_pids):
+    """
+    Sum the RSS (in bytes) of the given processes and all of their descendants.
+    Pages shared between Chromium processes are counted once per process, so this over-estimates slightly.
+    Returns None when /proc is not available.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    children = _children_by_pid()
+    total, stack, seen = 0, list(root_pids), set()
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        total += _rss_bytes(pid)
+        stack.extend(children.get(pid, []))
+    return total
+
+
+def _child_pids():
+    if not os.path.isdir("/proc"):
+        return set()
+    return set(_children_by_pid().get(os.getpid(), []))
+
+
+class SharedBrowser:
+    """
+    A single Playwright driver + browser that is launched on first use and closed when its last user releases it.
+
+    Attributes:
+        launch_duration (float): Seconds the last launch took (driver start + browser launch).
+        peak_rss (int): Highest RSS (bytes) sampled for the Playwright process tree since launch.
+    """
+    def __init__(self, browser_type_name, launch_options):
+        self.browser_type_name = browser_type_name
+        self.launch_options = launch_options
+        self.playwright_context_manager = None
+        self.playwright = None
+        self.browser = None
+        self.launch_duration = None
+        self.peak_rss = None
+        self._users = set()
+        self._driver_pids = set()
+        self._lock = asyncio.Lock()
+        self._rss_task = None
+
+    @property
+    def is_running(self):
+        return self.browser is not None and self.browser.is_connected()
+
+    async def acquire(self, user):
+        """Register `user` (a download handler) and return the browser, launching it if needed."""
+        async with self._lock:
+            launched = not self.is_running
+            if launched:
+                await self._launch()
+            self._users.add(user)
+            # Only the spider that triggered the launch pays for it, the others reuse the running browser
+            user.stats.set_value(BROWSER_LAUNCH_SECONDS, round(self.launch_duration, 3) if launched else 0.0)
+            return self.browser
+
+    async def release(self, user):
+        """Unregister `user`, closing the browser once nobody is using it."""
+        async with self._lock:
+            self._users.discard(user)
+            if self._users or self.browser is None:
+                return
+            await self._shutdown()
+
+    async def _launch(self):
+        start_time = time.monotonic()
+        if self.playwright is None:
+            existing_children = _child_pids()
+            self.playwright_context_manager = PlaywrightContextManager()
+            self.playwright = await self.playwright_context_manager.start()
+            self._driver_pids = _child_pids() - existing_children
+
+        logger.info(f"Launching shared {self.browser_type_name} browser.")
+        browser_type = getattr(self.playwright, self.browser_type_name)
+        try:
+            self.browser = await browser_type.launch(**self.launch_options)
+        except Exception:
+            # Don't leave an idle driver behind if the browser itself fails to start
+            await self.playwright.stop()
+            self.playwright = None
+            self.playwright_context_manager = None
+            self._driver_pids = set()
+            raise
+        self.launch_duration = time.monotonic() - start_time
+        self.peak_rss = None
+        logger.info(f"Shared {self.browser_type_name} browser launched in {self.launch_duration:.2f}s.")
+
+        if self._driver_pids:
+            self._rss_task = asyncio.ensure_future(self._sample_rss())
+
+    async def _shutdown(self):
+        logger.info(f"Last Playwright spider closed, shutting down shared {self.browser_type_name} browser.")
+        if self._rss_task:
+            self._rss_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._rss_task
+            self._rss_task = None
+        with suppress(Exception):
+            await self.browser.close()
+        if self.playwright is not None:
+            await self.playwright.stop()
+        self.browser = None
+        self.playwright = None
+        self.playwright_context_manager = None
+        self._driver_pids = set()
+        if self.peak_rss is not None:
+            logger.info(f"Shared browser peak RSS: {self.peak_rss / 1024 ** 2:.1f} MB.")
+
+    async def _sample_rss(self):
+        while True:
+            rss = process_tree_rss(self._driver_pids)
+            if rss:
+                self.peak_rss = max(self.peak_rss or 0, rss)
+                for user in self._users:
+                    user.stats.max_value(BROWSER_PEAK_RSS, rss)
+            await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+
+
+class PagePool:
+    """
+    Bounded pool of Playwright pages for one spider.
+
+    - At most `max_pages` pages are leased at the same time, further leases wait for a free slot.
+    - Released pages are reset (routes removed, navigated to about:blank) and reused by the next lease.
+    - Pages that are closed while leased free their slot, so upstream page closes are handled too.
+    - `close()` closes every page still in the pool, and reports the pages the spider never released.
+    """
+    def __init__(self, max_pages, stats):
+        self.max_pages = max_pages
+        self.stats = stats
+        self._semaphore = asyncio.Semaphore(max_pages)
+        self._idle = {}  # context name -> pages ready for reuse
+        self._leased = {}  # page -> context name
+
+    async def lease(self, context_name, create_page):
+        """Return an idle page from `context_name`, or a new one from `create_page()` if none is available."""
+        await self._semaphore.acquire()
+        try:
+            page = await self._take_idle_page(context_name)
+            if page is None:
+                page = await create_page()
+                page.once("close", lambda closed_page: self._page_closed(closed_page))
+                self.stats.inc_value("playwright/page_pool/created")
+            else:
+                self.stats.inc_value("playwright/page_pool/reused")
+        except BaseException:
+            self._semaphore.release()
+            raise
+        self._leased[page] = context_name
+        _page_pools[page] = self
+        return page
+
+    async def release(self, page):
+        """Reset a leased page and make it available to the next lease. Pages that fail to reset are closed."""
+        context_name = self._leased.pop(page, None)
+        if context_name is None:
+            return
+        try:
+            await page.unroute_all(behavior="ignoreErrors")
+            await page.goto("about:blank")
+        except Exception:
+            _page_pools.pop(page, None)
+            with suppress(Exception):
+                await page.close()
+        else:
+            self._idle.setdefault(context_name, []).append(page)
+        finally:
+            self._semaphore.release()
+
+    async def close(self):
+        """Close all pooled pages. Pages still leased at this point were leaked by the spider."""
+        leaked = list(self._leased)
+        if leaked:
+            logger.warning(f"Closing {len(leaked)} Playwright page(s) that were never released.")
+            self.stats.inc_value("playwright/page_pool/leaked", len(leaked))
+        idle = [page for pages in self._idle.values() for page in pages]
+        self._idle.clear()
+        for page in leaked + idle:
+            _page_pools.pop(page, None)
+            with suppress(Exception):
+                await page.close()
+
+    async def _take_idle_page(self, context_name):
+        pages = self._idle.get(context_name, [])
+        while pages:
+            page = pages.pop()
+            if not page.is_closed():
+                return page
+        # Keep the total number of pages within max_pages when other contexts still hold idle pages
+        if len(self._leased) + sum(len(p) for p in self._idle.values()) >= self.max_pages:
+            for other_pages in self._idle.values():
+                if other_pages:
+                    with suppress(Exception):
+                        await other_pages.pop().close()
+                    break
+        return None
+
+    def _page_closed(self, page):
+        _page_pools.pop(page, None)
+        if self._leased.pop(page, None) is not None:
+            self._semaphore.release()
+
+
+_page_pools = {}
+
+
+async def release_page(page):
+    """
+    Give a page obtained through `playwright_include_page` back to its spider's pool.
+    Pages that don't belong to a pool are simply closed.
+    """
+    if page is None:
+        return
+    pool = _page_pools.get(page)
+    if pool is not None:
+        await pool.release(page)
+    elif not page.is_closed():
+        await page.close()
+
+
+_shared_browsers = {}
+
+
+def get_shared_browser(browser_type_name, launch_options):
+    """Return the shared browser for this browser type and launch options, creating the (unlaunched) entry if needed."""
+    key = (browser_type_name, json.dumps(launch_options, sort_keys=True, default=str))
+    if key not in _shared_browsers:
+        _shared_browsers[key] = SharedBrowser(browser_type_name, launch_options)
+    return _shared_browsers[key]
+
+
+def get_browser_metrics(stats):
+    """Return the browser launch time and peak RSS recorded in `stats` (None when the spider never used a browser)."""
+    peak_rss = stats.get_value(BROWSER_PEAK_RSS)
+    return {
+        "browser_launch_seconds": stats.get_value(BROWSER_LAUNCH_SECONDS),
+        "browser_peak_rss_mb": round(peak_rss / 1024 ** 2, 1) if peak_rss else None,
+    }
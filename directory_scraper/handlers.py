@@ -0,0 +1,206 @@
+# Define here the download handlers used by the directory_scraper project
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/settings.html#download-handlers
+
+import asyncio
+import logging
+import re
+from contextlib import suppress
+
+from playwright._impl._errors import TargetClosedError
+from scrapy import signals
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+from scrapy.utils.defer import deferred_from_coro, maybe_deferred_to_future
+from scrapy_playwright.handler import ScrapyPlaywrightDownloadHandler
+from twisted.internet.defer import inlineCallbacks
+
+from directory_scraper.browser import PagePool, get_shared_browser, release_page
+
+logger = logging.getLogger(__name__)
+
+HTTP_REQUEST_COUNT = "hybrid/request_count/http"
+PLAYWRIGHT_REQUEST_COUNT = "hybrid/request_count/playwright"
+BLOCKED_REQUEST_COUNT = "blocking/request_count"
+PLAYWRIGHT_RESPONSE_BYTES = "playwright/response_bytes"
+
+
+class ResourceBlocker:
+    """
+    Decides which requests made by a Playwright page are aborted before they are sent.
+
+    A request is blocked when its resource type is in `PLAYWRIGHT_BLOCKED_RESOURCE_TYPES`
+    or its URL matches one of the `PLAYWRIGHT_BLOCKED_URL_PATTERNS` regexes. Navigation requests
+    (the page itself) are never blocked. Blocked requests are counted in the crawler stats
+    under `blocking/request_count`, broken down by resource type and by URL pattern.
+    """
+    def __init__(self, resource_types, url_patterns, stats):
+        self.resource_types = set(resource_types)
+        self.url_patterns = [re.compile(pattern) for pattern in url_patterns]
+        self.stats = stats
+
+    @classmethod
+    def from_settings(cls, settings, stats):
+        """Return a blocker for the (per-spider) settings, or None when blocking is disabled."""
+        if not settings.getbool("PLAYWRIGHT_BLOCK_RESOURCES", True):
+            return None
+        resource_types = settings.getlist("PLAYWRIGHT_BLOCKED_RESOURCE_TYPES")
+        url_patterns = settings.getlist("PLAYWRIGHT_BLOCKED_URL_PATTERNS")
+        if not resource_types and not url_patterns:
+            return None
+        return cls(resource_types, url_patterns, stats)
+
+    def __call__(self, playwright_request):
+        if playwright_request.is_navigation_request():
+            return False
+        if playwright_request.resource_type in self.resource_types:
+            self.stats.inc_value(BLOCKED_REQUEST_COUNT)
+            self.stats.inc_value(f"{BLOCKED_REQUEST_COUNT}/resource_type/{playwright_request.resource_type}")
+            return True
+        for pattern in self.url_patterns:
+            if pattern.search(playwright_request.url):
+                self.stats.inc_value(BLOCKED_REQUEST_COUNT)
+                self.stats.inc_value(f"{BLOCKED_REQUEST_COUNT}/url_pattern/{pattern.pattern}")
+                return True
+        return False
+
+
+class LazyPlaywrightDownloadHandler(ScrapyPlaywrightDownloadHandler):
+    """
+    scrapy-playwright handler that borrows the process-wide shared browser (see `browser.py`)
+    instead of starting its own Playwright driver when the engine starts.
+
+    The browser is acquired when the first page is created and released when the handler closes,
+    so Chromium shuts down as soon as the last Playwright spider in the process is done.
+
+    Pages come from a `PagePool` capped at `PLAYWRIGHT_PAGE_POOL_SIZE`. Spiders give pages back with
+    `directory_scraper.browser.release_page(page)`, and pages still leased when the spider closes are closed.
+
+    Unless `PLAYWRIGHT_ABORT_REQUEST` is set, sub-requests are filtered by a `ResourceBlocker` built from the spider's settings.
+    """
+    shared_browser = None
+    _browser_acquired = False
+
+    def __init__(self, crawler):
+        super().__init__(crawler)
+        self.page_pool = PagePool(crawler.settings.getint("PLAYWRIGHT_PAGE_POOL_SIZE", 4), self.stats)
+        crawler.signals.connect(self._spider_closed, signals.spider_closed)
+        if self.abort_request is None:
+            self.abort_request = ResourceBlocker.from_settings(crawler.settings, self.stats)
+
+    async def _launch(self):
+        # Nothing is started up front, the shared browser is launched on the first page
+        self.shared_browser = get_shared_browser(self.config.browser_type_name, self.config.launch_options)
+
+    async def _maybe_launch_browser(self):
+        async with self.browser_launch_lock:
+            if not hasattr(self, "browser"):
+                self.browser = await self.shared_browser.acquire(self)
+                self._browser_acquired = True
+                self.stats.inc_value("playwright/browser_count")
+                self.browser.on("disconnected", self._browser_disconnected_callback)
+
+    async def _create_page(self, request, spider):
+        context_name = request.meta.setdefault("playwright_context", "default")
+        return await self.page_pool.lease(context_name, lambda: super(LazyPlaywrightDownloadHandler, self)._create_page(request, spider))
+
+    async def _download_request(self, request, spider):
+        try:
+            return await super()._download_request(request, spider)
+        except Exception:
+            # Upstream keeps included pages open on failure; give them back so the slot isn't lost
+            if request.meta.get("playwright_include_page"):
+                await release_page(request.meta.pop("playwright_page", None))
+            raise
+
+    def _increment_response_stats(self, response):
+        super()._increment_response_stats(response)
+        # Content-Length is missing for chunked responses, so this is a lower bound of what the page downloaded
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit():
+            self.stats.inc_value(PLAYWRIGHT_RESPONSE_BYTES, int(content_length))
+
+    def _spider_closed(self, spider):
+        return self._deferred_from_coro(self.page_pool.close())
+
+    async def _close(self):
+        await self.page_pool.close()
+        with suppress(TargetClosedError):
+            await asyncio.gather(*[ctx.context.close() for ctx in self.context_wrappers.values()])
+        self.context_wrappers.clear()
+        if self._browser_acquired:
+            self._browser_acquired = False
+            await self.shared_browser.release(self)
+
+
+class HybridDownloadHandler:
+    """
+    Download handler that only sends requests with `meta["playwright"]` to Chromium.
+    Every other request goes straight to Scrapy's native HTTP/1.1 handler.
+
+    The Playwright handler is created on the first browser request, so spiders
+    that never ask for Playwright (e.g. kln, mof, kbs) never start the Playwright driver or Chromium.
+
+    The number of requests that took each path is kept in the crawler stats under
+    `hybrid/request_count/http` and `hybrid/request_count/playwright`.
+    """
+
+    def __init__(self, settings, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self._http_handler = HTTP11DownloadHandler(settings, crawler)
+        self._playwright_handler = None
+        self._playwright_lock = asyncio.Lock()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings, crawler)
+
+    def download_request(self, request, spider):
+        if request.meta.get("playwright"):
+            self.stats.inc_value(PLAYWRIGHT_REQUEST_COUNT, spider=spider)
+            return deferred_from_coro(self._download_with_playwright(request, spider))
+
+        self.stats.inc_value(HTTP_REQUEST_COUNT, spider=spider)
+        return self._http_handler.download_request(request, spider)
+
+    async def _download_with_playwright(self, request, spider):
+        handler = await self._get_playwright_handler()
+        return await maybe_deferred_to_future(handler.download_request(request, spider))
+
+    async def _get_playwright_handler(self):
+        """Create and start the scrapy-playwright handler on first use."""
+        async with self._playwright_lock:
+            if self._playwright_handler is None:
+                logger.info(f"First Playwright request for '{self.crawler.spider.name}', setting up Playwright.")
+                handler = LazyPlaywrightDownloadHandler.from_crawler(self.crawler)
+                # The engine_started signal that normally launches Playwright has already fired
+                await handler._launch()
+                self._playwright_handler = handler
+        return self._playwright_handler
+
+    @inlineCallbacks
+    def close(self):
+        yield self._http_handler.close()
+        if self._playwright_handler is not None:
+            yield self._playwright_handler.close()
+
+
+def get_request_counts(stats):
+    """Return how many requests took the HTTP and Playwright paths, as recorded in `stats`."""
+    return {
+        "http_requests": stats.get_value(HTTP_REQUEST_COUNT, 0),
+        "playwright_requests": stats.get_value(PLAYWRIGHT_REQUEST_COUNT, 0),
+    }
+
+
+def get_blocking_metrics(stats):
+    """
+    Return how many Playwright sub-requests were blocked and how many KB the pages still downloaded, as recorded in `stats`.
+    The breakdown by resource type and URL pattern is in the `blocking/request_count/*` stats.
+    """
+    response_bytes = stats.get_value(PLAYWRIGHT_RESPONSE_BYTES)
+    return {
+        "blocked_requests": stats.get_value(BLOCKED_REQUEST_COUNT, 0),
+        "playwright_kb_loaded": round(response_bytes / 1024, 1) if response_bytes else None,
+    }
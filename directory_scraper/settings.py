@@ -92,10 +92,10 @@ REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 FEED_EXPORT_ENCODING = "utf-8"
 
-# Set Playwright as the download handler for HTTP/HTTPS requests
+# Only requests with meta["playwright"] go through Playwright, the rest use Scrapy's HTTP/1.1 handler
 DOWNLOAD_HANDLERS = {
-    "http": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
-    "https": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler"
+    "http": "directory_scraper.handlers.HybridDownloadHandler",
+    "https": "directory_scraper.handlers.HybridDownloadHandler"
 }
 
 # Optional: Playwright browser settings
@@ -105,6 +105,19 @@ PLAYWRIGHT_LAUNCH_OPTIONS = {
 }
 # to enable Playwright for all requests
 PLAYWRIGHT_BROWSER_TYPE = "chromium"
+# Maximum number of pages each Playwright spider can have open at once (pages are recycled, see browser.py)
+PLAYWRIGHT_PAGE_POOL_SIZE = 4
+# Sub-requests Playwright pages don't need for the DOM are aborted (see handlers.ResourceBlocker).
+# Spiders can override these in custom_settings, or set PLAYWRIGHT_BLOCK_RESOURCES = False to load everything.
+PLAYWRIGHT_BLOCK_RESOURCES = True
+PLAYWRIGHT_BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]
+PLAYWRIGHT_BLOCKED_URL_PATTERNS = [
+    r"google-analytics\.com",
+    r"googletagmanager\.com",
+    r"doubleclick\.net",
+    r"connect\.facebook\.net",
+    r"static\.hotjar\.com",
+]
 
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 
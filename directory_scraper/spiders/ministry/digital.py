@@ -1,9 +1,11 @@
 import scrapy
 from scrapy_playwright.page import PageMethod
+from directory_scraper.browser import release_page
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
 class DIGITALSpider(scrapy.Spider):
     name = 'digital'
+    playwright_enabled = True
     start_urls = ['https://kd-portal.vercel.app/direktori']#['https://www.digital.gov.my/direktori']
 
     person_sort_order = 0
@@ -32,100 +34,101 @@ class DIGITALSpider(scrapy.Spider):
 
     async def parse(self, response):
         page = response.meta["playwright_page"]
-        page_count = 0
-        current_unit = None
-        current_division = None
-        all_data = []
-
-        while True:
-            page_count += 1
-            rows = response.xpath('//table/tbody/tr')
-
-            if not rows:
-                self.logger.error("No rows found in the table!")
-            else:
-                self.logger.debug(f"Found {len(rows)} rows in page {page_count}.")
-
-            for row in rows:
-                name = row.xpath('.//td[contains(@id, "_nama")]/text()').get()
-                division_parts = row.xpath('.//td[contains(@id, "_bhg")]//p//text()').getall()
-                division = ''.join(division_parts).strip() if division_parts else None
-                division = division.replace("...","") if division else None
-                position = row.xpath('.//td[contains(@id, "_jawatan")]/p/text()').get()
-                phone = row.xpath('.//td[contains(@id, "_telefon")]/p/text()').get()
-                email = row.xpath('.//td[contains(@id, "_emel")]/p/text()').get()
-
-                if division != self.last_processed_division:
-                    self.division_sort_order += 1 
-                    self.last_processed_division = division
-
-                if email and email not in ["-", "—", "–"]:
-                    email = f"{email}@digital.gov.my"
-
-                if division and division != current_division:
-                    current_division = division
-                    if name:  # If it's a person (must have name value)
-                        current_unit = None  # Reset the current unit when the division changes
-                    #self.logger.debug(f"Detected new division: {current_division}")
-
-                # If name exists and all other fields are null, it's a unit
-                if name and not division and not position and not phone and not email:
-                    current_unit = name  # Set this as the current unit
-                    #self.logger.debug(f"Detected unit: {current_unit}")
-                    continue  # Skip to the next row, as this is a unit
-
-                self.person_sort_order += 1
-
-                staff_data = {
-                    'org_sort': 999,
-                    'org_id': 'DIGITAL',
-                    'org_name': 'KEMENTERIAN DIGITAL',
-                    'org_type': 'ministry',
-                    'division_sort_order': self.division_sort_order,
-                    'division_name': division.strip() if division else None,
-                    'subdivision_name': current_unit.strip() if current_unit else None,
-                    'position_sort_order': self.person_sort_order,
-                    'position_name': position.strip() if position else None,
-                    'person_name': name.strip() if name else None,
-                    'person_phone': phone.strip() if phone else None,
-                    'person_email': email.strip() if email else None,
-                    'person_fax': None,
-                    'parent_org_id': None,  # is the parent
-                    #'page_number': page_count
-                }
-
-                all_data.append(staff_data)
-
-            try:
-                # Check if the "Next" button is available and clickable
-                # Option 1: Use the CSS selector
-                next_button = await page.wait_for_selector('body > div > div.flex-1 > main > section:nth-child(2) > div > div > div > div.flex.items-center.justify-center.gap-2.pt-8 > nav > ul > li:nth-child(10) > button:not([disabled])', timeout=10000)
-
-                # Option 2: Use the XPath
-                # next_button = await page.wait_for_selector('//html/body/div/div[2]/main/section[2]/div/div/div/div[3]/nav/ul/li[9]/button[not(@disabled)]', timeout=10000)
-
-                if next_button:
-                    self.logger.debug(f"Clicking the 'Seterusnya' (Next) button to load page {page_count + 1}...")
-                    await next_button.click()
-                    await page.wait_for_selector('table')  # Wait for the next page's table to load
-                    #await page.wait_for_timeout(2000)  # delay to ensure the table loads fully
-                    new_body = await page.content()
-                    response = scrapy.http.HtmlResponse(
-                        url=response.url,
-                        body=new_body,
-                        encoding='utf-8',
-                        request=response.request
-                    )
+        try:
+            page_count = 0
+            current_unit = None
+            current_division = None
+            all_data = []
+
+            while True:
+                page_count += 1
+                rows = response.xpath('//table/tbody/tr')
+
+                if not rows:
+                    self.logger.error("No rows found in the table!")
                 else:
-                    self.logger.debug(f"Not found 'Seterusnya' (Next) button to load page")
+                    self.logger.debug(f"Found {len(rows)} rows in page {page_count}.")
+
+                for row in rows:
+                    name = row.xpath('.//td[contains(@id, "_nama")]/text()').get()
+                    division_parts = row.xpath('.//td[contains(@id, "_bhg")]//p//text()').getall()
+                    division = ''.join(division_parts).strip() if division_parts else None
+                    division = division.replace("...","") if division else None
+                    position = row.xpath('.//td[contains(@id, "_jawatan")]/p/text()').get()
+                    phone = row.xpath('.//td[contains(@id, "_telefon")]/p/text()').get()
+                    email = row.xpath('.//td[contains(@id, "_emel")]/p/text()').get()
+
+                    if division != self.last_processed_division:
+                        self.division_sort_order += 1 
+                        self.last_processed_division = division
+
+                    if email and email not in ["-", "—", "–"]:
+                        email = f"{email}@digital.gov.my"
+
+                    if division and division != current_division:
+                        current_division = division
+                        if name:  # If it's a person (must have name value)
+                            current_unit = None  # Reset the current unit when the division changes
+                        #self.logger.debug(f"Detected new division: {current_division}")
+
+                    # If name exists and all other fields are null, it's a unit
+                    if name and not division and not position and not phone and not email:
+                        current_unit = name  # Set this as the current unit
+                        #self.logger.debug(f"Detected unit: {current_unit}")
+                        continue  # Skip to the next row, as this is a unit
+
+                    self.person_sort_order += 1
+
+                    staff_data = {
+                        'org_sort': 999,
+                        'org_id': 'DIGITAL',
+                        'org_name': 'KEMENTERIAN DIGITAL',
+                        'org_type': 'ministry',
+                        'division_sort_order': self.division_sort_order,
+                        'division_name': division.strip() if division else None,
+                        'subdivision_name': current_unit.strip() if current_unit else None,
+                        'position_sort_order': self.person_sort_order,
+                        'position_name': position.strip() if position else None,
+                        'person_name': name.strip() if name else None,
+                        'person_phone': phone.strip() if phone else None,
+                        'person_email': email.strip() if email else None,
+                        'person_fax': None,
+                        'parent_org_id': None,  # is the parent
+                        #'page_number': page_count
+                    }
+
+                    all_data.append(staff_data)
+
+                try:
+                    # Check if the "Next" button is available and clickable
+                    # Option 1: Use the CSS selector
+                    next_button = await page.wait_for_selector('body > div > div.flex-1 > main > section:nth-child(2) > div > div > div > div.flex.items-center.justify-center.gap-2.pt-8 > nav > ul > li:nth-child(10) > button:not([disabled])', timeout=10000)
+
+                    # Option 2: Use the XPath
+                    # next_button = await page.wait_for_selector('//html/body/div/div[2]/main/section[2]/div/div/div/div[3]/nav/ul/li[9]/button[not(@disabled)]', timeout=10000)
+
+                    if next_button:
+                        self.logger.debug(f"Clicking the 'Seterusnya' (Next) button to load page {page_count + 1}...")
+                        await next_button.click()
+                        await page.wait_for_selector('table')  # Wait for the next page's table to load
+                        #await page.wait_for_timeout(2000)  # delay to ensure the table loads fully
+                        new_body = await page.content()
+                        response = scrapy.http.HtmlResponse(
+                            url=response.url,
+                            body=new_body,
+                            encoding='utf-8',
+                            request=response.request
+                        )
+                    else:
+                        self.logger.debug(f"Not found 'Seterusnya' (Next) button to load page")
+                        break
+
+                except PlaywrightTimeoutError:
+                    # Handle case where clicking the next button fails due to visibility or timeout issues
+                    self.logger.debug(f"TimeoutError: Unable to click the 'Seterusnya' button on page {page_count}. Ending scraping.")
                     break
-
-            except PlaywrightTimeoutError:
-                # Handle case where clicking the next button fails due to visibility or timeout issues
-                self.logger.debug(f"TimeoutError: Unable to click the 'Seterusnya' button on page {page_count}. Ending scraping.")
-                break
-
-        await page.close()
+        finally:
+            await release_page(page)
 
         # post-processing after scraping is complete
         fixed_data = fix_subdivision_value(all_data)
@@ -1,8 +1,10 @@
 import scrapy
 from scrapy_playwright.page import PageMethod
+from directory_scraper.browser import release_page
 
 class KOMUNIKASIpider(scrapy.Spider):
     name = "komunikasi"
+    playwright_enabled = True
     allowed_domains = ["komunikasi.gov.my"]
     start_urls = ["https://www.komunikasi.gov.my/hubungi-kami/direktori-kementerian"]
 
@@ -25,23 +27,25 @@ class KOMUNIKASIpider(scrapy.Spider):
     
     async def parse_item(self, response):
         page = response.meta["playwright_page"]
-        
-        for person_sort, row in enumerate(response.css("article[class='uk-article']").css("div[class='uk-panel']")):
-            contact_details = [txt.strip() for txt in row.xpath("div[not(@class)]/text()").getall() if txt.strip()]
-            person_data = {
-                "org_sort": 20,
-                "org_id": "KOMUNIKASI",
-                "org_name": "Kementerian Komunikasi",
-                "org_type": "ministry",
-                "division_sort": 1,
-                "division_name": "PEJABAT MENTERI, SETIAUSAHA, & BAHAGIAN",
-                "subdivision_name": None,
-                "position_sort": person_sort+1,
-                "person_name": self.none_handler(row.css("h3 > strong::text").get()),
-                "position_name": self.none_handler(row.css("div[class='uk-margin']::text").get()),
-                "person_phone": self.none_handler(contact_details[0]),
-                "person_email": self.email_handler(self.none_handler(contact_details[1])),
-                "person_fax": None,
-                "parent_org_id": None,
-            }
-            yield person_data
\ No newline at end of file
+        try:
+            for person_sort, row in enumerate(response.css("article[class='uk-article']").css("div[class='uk-panel']")):
+                contact_details = [txt.strip() for txt in row.xpath("div[not(@class)]/text()").getall() if txt.strip()]
+                person_data = {
+                    "org_sort": 20,
+                    "org_id": "KOMUNIKASI",
+                    "org_name": "Kementerian Komunikasi",
+                    "org_type": "ministry",
+                    "division_sort": 1,
+                    "division_name": "PEJABAT MENTERI, SETIAUSAHA, & BAHAGIAN",
+                    "subdivision_name": None,
+                    "position_sort": person_sort+1,
+                    "person_name": self.none_handler(row.css("h3 > strong::text").get()),
+                    "position_name": self.none_handler(row.css("div[class='uk-margin']::text").get()),
+                    "person_phone": self.none_handler(contact_details[0]),
+                    "person_email": self.email_handler(self.none_handler(contact_details[1])),
+                    "person_fax": None,
+                    "parent_org_id": None,
+                }
+                yield person_data
+        finally:
+            await release_page(page)
\ No newline at end of file
@@ -1,10 +1,12 @@
 import scrapy
 from scrapy_playwright.page import PageMethod
+from directory_scraper.browser import release_page
 import asyncio
 from scrapy.selector import Selector
 
 class KuskopcsrfSpider(scrapy.Spider):
     name = 'kuskop'
+    playwright_enabled = True
     allowed_domains = ['kuskop.gov.my']
     start_urls = ['https://www.kuskop.gov.my/index.php?id=11&page_id=27']
 
@@ -12,10 +14,6 @@ class KuskopcsrfSpider(scrapy.Spider):
 
     custom_settings = {
         'PLAYWRIGHT_BROWSER_TYPE': 'chromium',
-        'DOWNLOAD_HANDLERS': {
-            'http': 'scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler',
-            'https': 'scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler',
-        },
         'TWISTED_REACTOR': 'twisted.internet.asyncioreactor.AsyncioSelectorReactor',
         'PLAYWRIGHT_LAUNCH_OPTIONS': {'headless': False},
     }
@@ -36,46 +34,44 @@ class KuskopcsrfSpider(scrapy.Spider):
 
     async def interact_with_page(self, response):
         page = response.meta['playwright_page']
-        self.logger.info("Routing requests to block Google Analytics.")
-        await page.route("**/*", lambda route, request: route.abort() if "google-analytics.com" in request.url else route.continue_())
-
-        self.logger.info("Extracting all 'bahagian' options dynamically.")
-        content = await page.content()
-        selector = Selector(text=content)
-
-        options = selector.xpath('//select[@id="pilihbahagian"]/option[@value != ""]/attribute::value').getall()
-        self.logger.info(f"Found {len(options)} options for 'bahagian'.")
+        try:
+            self.logger.info("Extracting all 'bahagian' options dynamically.")
+            content = await page.content()
+            selector = Selector(text=content)
 
-        for option_value in options:
-            self.logger.info(f"Selecting option '{option_value}' from '#pilihbahagian'.")
-            await page.select_option('#pilihbahagian', option_value)
+            options = selector.xpath('//select[@id="pilihbahagian"]/option[@value != ""]/attribute::value').getall()
+            self.logger.info(f"Found {len(options)} options for 'bahagian'.")
 
-            self.logger.info("Waiting for network idle state after selecting option.")
-            await page.wait_for_load_state('networkidle')
-            #await asyncio.sleep(2)
+            for option_value in options:
+                self.logger.info(f"Selecting option '{option_value}' from '#pilihbahagian'.")
+                await page.select_option('#pilihbahagian', option_value)
 
-            self.logger.info("Clicking the search button.")
-            await page.click('button.btn-default[type="submit"]:has-text("CARI")')
+                self.logger.info("Waiting for network idle state after selecting option.")
+                await page.wait_for_load_state('networkidle')
+                #await asyncio.sleep(2)
 
-            self.logger.info("Waiting for network idle state after clicking the search button.")
-            await page.wait_for_load_state('networkidle')
-            #await asyncio.sleep(2)
+                self.logger.info("Clicking the search button.")
+                await page.click('button.btn-default[type="submit"]:has-text("CARI")')
 
-            self.logger.info(f"Taking a snapshot of the page content for option '{option_value}'.")
-            content = await page.content()
+                self.logger.info("Waiting for network idle state after clicking the search button.")
+                await page.wait_for_load_state('networkidle')
+                #await asyncio.sleep(2)
 
-            # # Save the content for debugging (optional)
-            # with open(f'response_content_option_{option_value}.html', 'w', encoding='utf-8') as file:
-            #     file.write(content)
+                self.logger.info(f"Taking a snapshot of the page content for option '{option_value}'.")
+                content = await page.content()
 
-            self.logger.info(f"Parsing content for option '{option_value}'.")
-            selector = Selector(text=content)
+                # # Save the content for debugging (optional)
+                # with open(f'response_content_option_{option_value}.html', 'w', encoding='utf-8') as file:
+                #     file.write(content)
 
-            #use async for to iterate over the yielded items from parse_results
-            async for item in self.parse_results(selector, option_value):
-                yield item
+                self.logger.info(f"Parsing content for option '{option_value}'.")
+                selector = Selector(text=content)
 
-        await page.close()
+                #use async for to iterate over the yielded items from parse_results
+                async for item in self.parse_results(selector, option_value):
+                    yield item
+        finally:
+            await release_page(page)
 
     async def parse_results(self, selector, option_value):
         self.logger.info("Starting to parse directory entries.")
@@ -1,9 +1,11 @@
 import re
 import scrapy
 from scrapy_playwright.page import PageMethod
+from directory_scraper.browser import release_page
 
 class MOESpider(scrapy.Spider):
     name = "moe"
+    playwright_enabled = True
     allowed_domains = ["direktori.moe.gov.my"]
     start_urls = ["https://direktori.moe.gov.my/ajax/public/getdir.php?id=1&textsearch=&selectsearch="]
 
@@ -19,7 +21,6 @@ class MOESpider(scrapy.Spider):
             callback=self.extract_bahagian,
             meta={
                 "playwright": True,
-                "playwright_include_page": True,
                 "playwright_page_methods": [
                         PageMethod("wait_for_selector", "button[type='button']"),
                 ],
@@ -78,58 +79,59 @@ class MOESpider(scrapy.Spider):
 
     async def parse_item(self, response):
         page = response.meta["playwright_page"]
-        division = response.meta["division"]
-        division_sort_order = response.meta["division_sort_order"]
+        try:
+            division = response.meta["division"]
+            division_sort_order = response.meta["division_sort_order"]
         
-        await page.click("input[type='checkbox']")
-        # yield {"url": response.url, "body": response.text}
-        person_sort_order = 0
-        current_unit = None
-        current_subunit = None
-        for table in response.css("div[class='panel-group'] > div[class='panel panel-default']"):
-            current_unit = self.none_handler(table.xpath("div[@class='panel-heading']/text()").getall())
-            unit_data = table.xpath("div[starts-with(@class, 'panel-collapse collapse')]/div[@class='panel-body']")
-            head_email_domain = self.none_handler(unit_data.xpath("table/thead/tr[1]/th[4]/span/text()").getall())[1:-1]
-            for head_row in unit_data.xpath("table/tbody/tr"):
-                person_sort_order += 1
-                yield {
-                    "org_sort": 21,
-                    "org_id": "MOE",
-                    "org_name": "KEMENTERIAN PENDIDIKAN",
-                    "org_type": "ministry",
-                    "division_name": division,
-                    "division_sort": division_sort_order,
-                    "subdivision_name": current_unit,
-                    "position_sort": person_sort_order,
-                    "person_name": self.none_handler(head_row.xpath("td[2]/text()").getall()),
-                    "position_name": self.none_handler(head_row.xpath("td[3]/text()").getall()),
-                    "person_phone": self.none_handler(head_row.xpath("td[4]/text()").getall()),
-                    "person_email": self.email_handler(head_row.xpath("td[5]/text()").getall(), head_email_domain),
-                    "person_fax": None,
-                    "parent_org_id": None
-                }
-
-            if unit_staff := unit_data.xpath("div//div[@role='tablist']/div[@class='panel panel-default']"):
-                for subunit_table in unit_staff:
-                    current_subunit = self.none_handler(subunit_table.xpath("div[@class='panel-heading']/h4/a/text()").getall())
-                    email_domain = self.none_handler(subunit_table.xpath("div[2]//table/thead/tr[1]/th[4]/span/text()").getall())[1:-1]
-                    for subunit_row in subunit_table.xpath("div[2]//table/tbody/tr"):
-                        person_sort_order += 1
-                        yield {
-                            "org_sort": 21,
-                            "org_id": "MOE",
-                            "org_name": "KEMENTERIAN PENDIDIKAN",
-                            "org_type": "ministry",
-                            "division_name": division,
-                            "division_sort": division_sort_order,
-                            "subdivision_name": f"{current_unit} > {current_subunit}",
-                            "position_sort": person_sort_order,
-                            "person_name": self.none_handler(subunit_row.xpath("td[2]/text()").getall()),
-                            "position_name": self.none_handler(subunit_row.xpath("td[3]/text()").getall()),
-                            "person_phone": self.email_handler(subunit_row.xpath("td[4]/text()").getall(), email_domain),
-                            "person_email": self.none_handler(subunit_row.xpath("td[5]/text()").getall()),
-                            "person_fax": None,
-                            "parent_org_id": None
-                        }
+            await page.click("input[type='checkbox']")
+            # yield {"url": response.url, "body": response.text}
+            person_sort_order = 0
+            current_unit = None
+            current_subunit = None
+            for table in response.css("div[class='panel-group'] > div[class='panel panel-default']"):
+                current_unit = self.none_handler(table.xpath("div[@class='panel-heading']/text()").getall())
+                unit_data = table.xpath("div[starts-with(@class, 'panel-collapse collapse')]/div[@class='panel-body']")
+                head_email_domain = self.none_handler(unit_data.xpath("table/thead/tr[1]/th[4]/span/text()").getall())[1:-1]
+                for head_row in unit_data.xpath("table/tbody/tr"):
+                    person_sort_order += 1
+                    yield {
+                        "org_sort": 21,
+                        "org_id": "MOE",
+                        "org_name": "KEMENTERIAN PENDIDIKAN",
+                        "org_type": "ministry",
+                        "division_name": division,
+                        "division_sort": division_sort_order,
+                        "subdivision_name": current_unit,
+                        "position_sort": person_sort_order,
+                        "person_name": self.none_handler(head_row.xpath("td[2]/text()").getall()),
+                        "position_name": self.none_handler(head_row.xpath("td[3]/text()").getall()),
+                        "person_phone": self.none_handler(head_row.xpath("td[4]/text()").getall()),
+                        "person_email": self.email_handler(head_row.xpath("td[5]/text()").getall(), head_email_domain),
+                        "person_fax": None,
+                        "parent_org_id": None
+                    }
 
-        await page.close()
\ No newline at end of file
+                if unit_staff := unit_data.xpath("div//div[@role='tablist']/div[@class='panel panel-default']"):
+                    for subunit_table in unit_staff:
+                        current_subunit = self.none_handler(subunit_table.xpath("div[@class='panel-heading']/h4/a/text()").getall())
+                        email_domain = self.none_handler(subunit_table.xpath("div[2]//table/thead/tr[1]/th[4]/span/text()").getall())[1:-1]
+                        for subunit_row in subunit_table.xpath("div[2]//table/tbody/tr"):
+                            person_sort_order += 1
+                            yield {
+                                "org_sort": 21,
+                                "org_id": "MOE",
+                                "org_name": "KEMENTERIAN PENDIDIKAN",
+                                "org_type": "ministry",
+                                "division_name": division,
+                                "division_sort": division_sort_order,
+                                "subdivision_name": f"{current_unit} > {current_subunit}",
+                                "position_sort": person_sort_order,
+                                "person_name": self.none_handler(subunit_row.xpath("td[2]/text()").getall()),
+                                "position_name": self.none_handler(subunit_row.xpath("td[3]/text()").getall()),
+                                "person_phone": self.email_handler(subunit_row.xpath("td[4]/text()").getall(), email_domain),
+                                "person_email": self.none_handler(subunit_row.xpath("td[5]/text()").getall()),
+                                "person_fax": None,
+                                "parent_org_id": None
+                            }
+        finally:
+            await release_page(page)
\ No newline at end of file
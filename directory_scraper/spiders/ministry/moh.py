@@ -1,10 +1,12 @@
 import scrapy
 from scrapy.selector import Selector
 from scrapy_playwright.page import PageMethod
+from directory_scraper.browser import release_page
 from time import sleep
 
 class MOHSpider(scrapy.Spider):
     name = "moh"
+    playwright_enabled = True
     allowed_domains = ["www.moh.gov.my"]
     start_urls = ["https://www.moh.gov.my/index.php/edirectory/member_list"]
     
@@ -18,7 +20,6 @@ class MOHSpider(scrapy.Spider):
             callback=self.extract_bahagian,
             meta={
                 "playwright": True,
-                "playwright_include_page": True,
                 "playwright_page_methods": [
                     PageMethod("wait_for_selector", "select[name='division'][id='division-search']"),
                 ]
@@ -61,44 +62,46 @@ class MOHSpider(scrapy.Spider):
     
     async def parse(self, response):
         page = response.meta["playwright_page"]
-        division_sort_order = response.meta["division_sort_order"]
-        page_number = 1
-        total_pages = int(pagenum) if (pagenum := response.xpath("//a[starts-with(@class, 'paginate_button') and @tabindex=0 and not(contains(text(), 'Next'))][last()]/text()").get()) else 0
-        while page_number <= total_pages:
-            current_page = Selector(text=await page.content())
-            page_number = int(current_page.xpath("//a[@class='paginate_button current']/text()").get())
+        try:
+            division_sort_order = response.meta["division_sort_order"]
+            page_number = 1
+            total_pages = int(pagenum) if (pagenum := response.xpath("//a[starts-with(@class, 'paginate_button') and @tabindex=0 and not(contains(text(), 'Next'))][last()]/text()").get()) else 0
+            while page_number <= total_pages:
+                current_page = Selector(text=await page.content())
+                page_number = int(current_page.xpath("//a[@class='paginate_button current']/text()").get())
 
-            for person_sort, data_point in enumerate(current_page.css("div[class='profile-detail col-8-12']")):
-                name = self.none_handler(data_point.css("a::text").get())
-                position = self.none_handler(data_point.css("p::text").get())
-                phone = self.none_handler(data_point.css("tbody > tr:nth-child(1)").css("td[class='data-label']::text").get())
-                email = self.none_handler(data_point.css("tbody > tr:nth-child(2)").css("td[class='data-label']::text").get())
-                division = self.none_handler(data_point.css("tbody > tr:nth-child(3)").css("td[class='data-label']::text").get())
-                unit = self.none_handler(data_point.css("tbody > tr:nth-child(4)").css("td[class='data-label']::text").get())
+                for person_sort, data_point in enumerate(current_page.css("div[class='profile-detail col-8-12']")):
+                    name = self.none_handler(data_point.css("a::text").get())
+                    position = self.none_handler(data_point.css("p::text").get())
+                    phone = self.none_handler(data_point.css("tbody > tr:nth-child(1)").css("td[class='data-label']::text").get())
+                    email = self.none_handler(data_point.css("tbody > tr:nth-child(2)").css("td[class='data-label']::text").get())
+                    division = self.none_handler(data_point.css("tbody > tr:nth-child(3)").css("td[class='data-label']::text").get())
+                    unit = self.none_handler(data_point.css("tbody > tr:nth-child(4)").css("td[class='data-label']::text").get())
                 
-                person_data = {
-                    "org_sort":28,
-                    "org_id": "MOH",
-                    "org_name": "KEMENTERIAN KESIHATAN",
-                    "org_type": "ministry",
-                    "division_name": division,
-                    "division_sort": division_sort_order,
-                    "subdivision_name": unit,
-                    "position_sort": 10*page_number + person_sort + 1,
-                    "person_name": name,
-                    "position_name": position,
-                    "person_phone": phone,
-                    "person_email": email,
-                    "person_fax": None,
-                    "parent_org_id": None
-                }
+                    person_data = {
+                        "org_sort":28,
+                        "org_id": "MOH",
+                        "org_name": "KEMENTERIAN KESIHATAN",
+                        "org_type": "ministry",
+                        "division_name": division,
+                        "division_sort": division_sort_order,
+                        "subdivision_name": unit,
+                        "position_sort": 10*page_number + person_sort + 1,
+                        "person_name": name,
+                        "position_name": position,
+                        "person_phone": phone,
+                        "person_email": email,
+                        "person_fax": None,
+                        "parent_org_id": None
+                    }
 
-                yield person_data
+                    yield person_data
 
-            next_page_available = current_page.css("a[class='paginate_button next']")
+                next_page_available = current_page.css("a[class='paginate_button next']")
             
-            if next_page_available:
-                await page.click("a[class='paginate_button next']")
-            else:
-                break
-        await page.close()
\ No newline at end of file
+                if next_page_available:
+                    await page.click("a[class='paginate_button next']")
+                else:
+                    break
+        finally:
+            await release_page(page)
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Benchmark of the ES upload (data_to_es.upload_clean_data_to_es) against the in-process fake (fake_es.py), no cluster needed.
+
+A synthetic directory of clean records is generated (one file per ministry), then replayed through the per-org diff:
+1. initial load: the index is empty, every document is added;
+2. unchanged: the same files again, nothing to write (the cost of reading the existing documents);
+3. edits: a share of the persons change phone or position, some are added or leave, and one division per ministry
+   gets a new person at the top (every position_sort after it shifts: partial updates, the _ids don't move).
+Reported per phase: wall time (and the part of it spent in the fake, which a real cluster replaces by its own latency),
+round trips to ES (per API), bytes sent and received, and the documents in the index.
+
+Usage:
+    python bench_es_upload.py [--ministries 30] [--rows 200000] [--edit-rate 0.01] [--org-concurrency N] [--reject-rate 0] [--log-changes] [--seed N]
+"""
+import argparse
+import contextlib
+import copy
+import io
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from directory_scraper.src.elasticsearch_upload import data_to_es, fake_es
+from directory_scraper.src.benchmarks.bench_phone_normaliser import SAMPLE_PHONES
+
+DIVISIONS_PER_MINISTRY = 40
+POSITIONS = ["Ketua Setiausaha", "Timbalan Ketua Setiausaha", "Setiausaha Bahagian", "Pegawai Tadbir", "Penolong Pegawai Tadbir", "Pembantu Tadbir"]
+NAMES = ["Ahmad", "Siti", "Lim", "Muthu", "Nurul", "Tan", "Aminah", "Rajesh", "Farah", "Wong"]
+
+def generate_files(ministries, rows, seed):
+    """Returns one {"file_name", "file_data"} per ministry, `rows` clean records in all."""
+    rng = random.Random(seed)
+    files = []
+    for ministry in range(ministries):
+        org_id = f"MIN{ministry + 1:02d}"
+        size = rows // ministries + (1 if ministry < rows % ministries else 0)
+        records = []
+        for position_sort in range(1, size + 1):
+            division_sort = 1 + (position_sort - 1) * DIVISIONS_PER_MINISTRY // size
+            name = f"{rng.choice(NAMES)} {position_sort}"
+            records.append({
+                "org_sort": ministry + 1,
+                "org_id": org_id,
+                "org_name": f"KEMENTERIAN CONTOH {ministry + 1}",
+                "org_type": "ministry",
+                "division_sort": division_sort,
+                "division_name": f"Bahagian {division_sort}",
+                "subdivision_name": None,
+                "position_sort": position_sort,
+                "position_name": rng.choice(POSITIONS),
+                "person_name": name,
+                "person_phone": rng.choice(SAMPLE_PHONES),
+                "person_email": f"{name.lower().replace(' ', '.')}@{org_id.lower()}.gov.my",
+                "person_fax": None,
+                "parent_org_id": None,
+            })
+        files.append({"file_name": f"{org_id}.json", "file_data": records})
+    return files
+
+def edit_files(files, edit_rate, seed):
+    """Returns a copy of `files` with `edit_rate` of the records edited, added or removed, and one division reshuffled per file."""
+    rng = random.Random(seed + 1)
+    edited = []
+    for file in files:
+        records = []
+        for record in copy.deepcopy(file["file_data"]):
+            roll = rng.random()
+            if roll < edit_rate / 4:
+                continue  # left
+            if roll < edit_rate:
+                record[rng.choice(["person_phone", "position_name"])] = rng.choice(SAMPLE_PHONES + POSITIONS)
+            records.append(record)
+            if rng.random() < edit_rate / 4:
+                records.append({**record, "person_name": f"Baharu {len(records)}", "person_email": f"baharu.{len(records)}@gov.my"})
+        # A new person at the top of one division
+        division_sort = rng.randint(1, DIVISIONS_PER_MINISTRY)
+        first = next((i for i, record in enumerate(records) if record["division_sort"] == division_sort), 0)
+        records.insert(first, {**records[first], "person_name": "Ketua Baharu", "person_email": "ketua.baharu@gov.my"})
+        for position_sort, record in enumerate(records, 1):
+            record["position_sort"] = position_sort
+        edited.append({"file_name": file["file_name"], "file_data": records})
+    return edited
+
+def run_phase(name, fake, files, log_changes, org_concurrency):
+    """Uploads `files` to the fake and prints the wall time and the requests of the upload."""
+    fake.stats.clear()
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        summaries = data_to_es.upload_clean_data_to_es(files, log_changes=log_changes, org_concurrency=org_concurrency)
+    seconds = time.perf_counter() - start
+    stats = dict(fake.stats)
+    rows = sum(len(file["file_data"]) for file in files)
+    doc_count = sum(len(index.docs) for index in fake.indices.values())
+    apis = ", ".join(f"{api} {count}" for api, count in sorted(stats.items()) if api not in ("requests", "request_bytes", "response_bytes", "seconds"))
+    print(
+        f"{name:>12}: {rows:>8} rows | {seconds:8.2f}s (fake ES {stats.get('seconds', 0):6.2f}s) | {stats.get('requests', 0):>6} round trips"
+        f" | sent {stats.get('request_bytes', 0) / 1e6:8.2f} MB | received {stats.get('response_bytes', 0) / 1e6:8.2f} MB | {doc_count} docs"
+    )
+    print(f"{'':>14}{apis}")
+    failed = [summary for summary in summaries if summary.startswith("❗")]
+    for summary in failed:
+        print(f"{'':>14}{summary}")
+    return not failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark upload_clean_data_to_es against an in-process fake Elasticsearch.")
+    parser.add_argument("--ministries", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=200_000, help="Records over all ministries.")
+    parser.add_argument("--edit-rate", type=float, default=0.01, help="Share of the records edited, added or removed in the 'edits' phase.")
+    parser.add_argument("--org-concurrency", type=int, default=data_to_es.ORG_CONCURRENCY)
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="Share of the bulk items the fake rejects with 429.")
+    parser.add_argument("--log-changes", action="store_true", help="Write the change log (logs/es_changes_log.ndjson) too.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not data_to_es.ES_INDEX:
+        data_to_es.ES_INDEX = "bench-directory"
+    fake = fake_es.FakeElasticsearch(bulk_reject_rate=args.reject_rate, seed=args.seed)
+    data_to_es.set_es_client_factory(lambda: fake_es.create_fake_client(fake))
+    if args.reject_rate:
+        data_to_es.BULK_INITIAL_BACKOFF = 0  # the fake isn't overloaded, don't wait before the retries
+
+    files = generate_files(args.ministries, args.rows, args.seed)
+    edited = edit_files(files, args.edit_rate, args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_to_es.create_index_if_not_exists()
+
+    ok = True
+    for name, phase_files in (("initial load", files), ("unchanged", files), ("edits", edited)):
+        ok &= run_phase(name, fake, phase_files, args.log_changes, args.org_concurrency)
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
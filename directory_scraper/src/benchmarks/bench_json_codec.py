@@ -0,0 +1,87 @@
+"""
+Benchmark of the JSON codec (json_codec.py) against the previous json.dump(indent=4) files.
+
+Cleaned records are generated (bench_process_pipeline.generate_records run through data_processing_pipeline), then written
+and read back as files with each codec and layout. Reported: write time, read time and file size. The json_codec rows
+are run with orjson (if installed) and with the json module fallback, which must give the same bytes.
+
+Usage:
+    python bench_json_codec.py [--sizes 10000 100000] [--repeat 3] [--seed N]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from directory_scraper.src.utils import json_codec
+from directory_scraper.src.data_processing.process_data import data_processing_pipeline
+from directory_scraper.src.benchmarks.bench_process_pipeline import generate_records
+
+def legacy_dump(data, file_path):
+    with open(file_path, "w") as f:
+        json.dump(data, f, indent=4)
+
+def legacy_load(file_path):
+    with open(file_path, "r") as f:
+        return json.load(f)
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+def run(data, folder, repeat):
+    """Prints the write/read time and size of each codec, returns True if both backends of json_codec give the same bytes."""
+    cases = [("json indent=4 (before)", legacy_dump, legacy_load)]
+    for layout in (json_codec.ROWS, json_codec.COMPACT, json_codec.PRETTY):
+        cases.append((f"{json_codec.get_backend()} {layout}", lambda d, p, layout=layout: json_codec.dump_file(d, p, layout), json_codec.load_file))
+
+    baseline = None
+    for name, dump, load in cases:
+        file_path = os.path.join(folder, "bench.json")
+        write_seconds = best_time(lambda: dump(data, file_path), repeat)
+        read_seconds = best_time(lambda: load(file_path), repeat)
+        size = os.path.getsize(file_path)
+        assert load(file_path) == data
+        baseline = baseline or (write_seconds, read_seconds, size)
+        print(
+            f"  {name:>24}: write {write_seconds:7.3f}s ({baseline[0] / write_seconds:4.1f}x) | read {read_seconds:7.3f}s ({baseline[1] / read_seconds:4.1f}x)"
+            f" | {size / 1e6:8.2f} MB ({size / baseline[2]:4.0%})"
+        )
+
+    # The json module fallback
+    orjson, json_codec.orjson = json_codec.orjson, None
+    try:
+        fallback_rows = json_codec.dumps_rows(data)
+        fallback_seconds = best_time(lambda: json_codec.dumps_rows(data), repeat)
+    finally:
+        json_codec.orjson = orjson
+    identical = fallback_rows == json_codec.dumps_rows(data)
+    print(f"  {'json rows (fallback)':>24}: dumps {fallback_seconds:7.3f}s | {'same bytes' if identical else 'DIFFERENT BYTES'} as {json_codec.get_backend()}")
+    return identical
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark json_codec against json.dump(indent=4).")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000], help="Number of cleaned records.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measure (the best is kept).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    identical = True
+    with tempfile.TemporaryDirectory() as folder:
+        for size in args.sizes:
+            data = data_processing_pipeline(generate_records(size, args.seed))
+            print(f"{len(data)} cleaned records:")
+            identical &= run(data, folder, args.repeat)
+    return identical
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,144 @@
+"""
+Benchmark and equivalence check of the phone normaliser (process_data.validate_person_phone).
+
+Every `person_phone` found in the JSON files of the given folders is normalised twice:
+- with the previous implementation (a chain of re.sub calls, then every pattern tried one by one), kept below as reference,
+- with PhoneNormaliser (precompiled, combined patterns, memoised).
+The outputs must be identical. Timings are printed for both.
+
+Usage:
+    python bench_phone_normaliser.py [folder ...] [--repeat N]
+
+Folders default to the spiders output and clean data folders of the workflows.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from directory_scraper.path_config import DEFAULT_SPIDERS_OUTPUT_FOLDER, DEFAULT_CLEAN_DATA_FOLDER
+from directory_scraper.src.data_processing.process_data import VALID_PHONE_REGEX, INVALID_PHONE_REGEX
+from directory_scraper.src.data_processing.phone_normaliser import PhoneNormaliser, UNKNOWN
+
+WORKFLOWS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../workflows"))
+DEFAULT_FOLDERS = [os.path.join(WORKFLOWS_DIR, DEFAULT_SPIDERS_OUTPUT_FOLDER), os.path.join(WORKFLOWS_DIR, DEFAULT_CLEAN_DATA_FOLDER)]
+
+# Always included, so the check also covers every cleaning and formatting branch when no corpus is available
+SAMPLE_PHONES = [
+    "-", "0", "tiada", ".", " ", "Telefon: 03-8000 8000", "-+603-88721983", "0362000591", "60362000104",
+    "+60362000104", "042625133 ext. 101", "042625133", "03-0388721983", "04-7314957(117)", "0313415437 ext:32845",
+    "-03-88721983", "03-03-9236500", "087-087211415", "03-29358989-ext.205)", "(+410227994044", "09-5163251(128",
+    "03-8091 8000 ext 18208", "082-242257EXT102", "03 - 8000 8000.", "03-88823330(6330)", "03-55106922Samb.10",
+    "0000000", "111", "03", "06 ", "04-04", "03-2771-", "+60-8871", "186", "011-011", "03-1234", "(+62)215224947 ext. 3105/(+62)811-8881-0247",
+    "+1(514)9545771", "03–80917258", "09-7449223/09-7486645", "1-300-88-1234", "(Pejabat)03-88721983", "abc",
+    "+60 12-345 6789", "012-345 6789", "1800-88-1234", "*1234", "(8424)37343849/3836", "62-215224962",
+]
+
+def legacy_normalise_phone(phone):
+    """The previous validate_person_phone, returning (phone, is_unknown) instead of updating a record."""
+    if phone in ["-", "0", "tiada", "."]:
+        return None, False
+
+    phone = phone.strip()
+    phone = re.sub(r'^-\+', "+", phone)
+    phone = re.sub(r'\([a-zA-Z ]*\)$|\((?=ext.)|(?<=\d{4})\)', " ", phone, flags=re.IGNORECASE)
+    phone = re.sub(r'ext(\.\s{0,1}|\s*:\s*){0,1}', "-ext.", phone, flags=re.IGNORECASE)
+    phone = phone.replace("--", "-")
+    phone = phone.replace("..", ".")
+    phone = re.sub(r'(?<=\d)\.$', "", phone)
+    phone = phone.replace(" ", "")
+    phone = re.sub(r'^Telefon.*?(?=[06\(]|\+\d|-$)|-$', "", phone)
+    phone = re.sub(r'\s+', "", phone)
+    phone = re.sub(r'\)(?!.*\()', "", phone)
+    phone = re.sub(r'\((?!.*\))', "", phone)
+    phone = re.sub(r'^-(?=03|08)', "", phone)
+
+    if not phone:
+        return None, False
+
+    if re.match(r'^03\d{8}$', phone):
+        phone = f'{phone[:2]}-{phone[2:]}'
+    elif re.match(r'^603\d{7,8}$', phone):
+        phone = f'{phone[:3]}-{phone[3:]}'
+    elif re.match(r'^\+603\d{7,8}$', phone):
+        phone = f'{phone[:4]}-{phone[4:]}'
+    elif re.match(r'^0\d{7,8}-ext\.\d+$', phone):
+        phone = f'{phone[:2]}-{phone[2:]}'
+    elif re.match(r'^0\d{7,8}$', phone):
+        phone = f'{phone[:2]}-{phone[2:]}'
+    elif re.match(r'^03-\d{9}$', phone):
+        pass
+    elif re.match(r'^\d{2}-\d{7}\(\d{3}\)$', phone):
+        pass
+    elif re.match(r'^03\d{8}-ext.\d{4,5}', phone):
+        phone = f"{phone[:2]}-{phone[2:]}"
+    elif re.match(r'^-(?=03|08)', phone):
+        phone = f"{phone[1:3]}-{phone[3:]}"
+    elif pattern_lst := re.findall(r'(^(?:03|087))[\-\s]+\1', phone):
+        trunc_pos = len(pattern_lst[0])
+        clean_phone = re.sub(rf'{pattern_lst[0]}[\-\s]*', "", phone, count=1).replace("-", "")
+        phone = f"{clean_phone[:trunc_pos]}-{clean_phone[trunc_pos:]}"
+
+    if any(re.match(pattern, phone, re.IGNORECASE) for pattern in INVALID_PHONE_REGEX):
+        return None, False
+    return phone, not any(re.match(pattern, phone, re.IGNORECASE) for pattern in VALID_PHONE_REGEX)
+
+def load_phones(folders):
+    phones = []
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        for file_name in sorted(os.listdir(folder)):
+            if not file_name.endswith(".json"):
+                continue
+            with open(os.path.join(folder, file_name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, list):
+                phones.extend(record["person_phone"] for record in data if isinstance(record, dict) and isinstance(record.get("person_phone"), str) and record["person_phone"])
+    return phones
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the phone normaliser against the previous implementation.")
+    parser.add_argument("folders", nargs="*", default=DEFAULT_FOLDERS, help="Folders of JSON files to take the phone numbers from.")
+    parser.add_argument("--repeat", type=int, default=1, help="Run over the corpus N times.")
+    args = parser.parse_args()
+
+    corpus_phones = load_phones(args.folders)
+    phones = (corpus_phones + SAMPLE_PHONES) * args.repeat
+    print(f"{len(corpus_phones)} phone numbers from the corpus ({len(set(corpus_phones))} distinct), {len(SAMPLE_PHONES)} samples, x{args.repeat}: {len(phones)} calls.")
+
+    start = time.perf_counter()
+    legacy_results = [legacy_normalise_phone(phone) for phone in phones]
+    legacy_seconds = time.perf_counter() - start
+
+    normaliser = PhoneNormaliser(VALID_PHONE_REGEX, INVALID_PHONE_REGEX)
+    start = time.perf_counter()
+    results = [normaliser.normalise(phone) for phone in phones]
+    seconds = time.perf_counter() - start
+
+    # Same work without the memoisation, to show what precompiling and combining the patterns alone gives
+    start = time.perf_counter()
+    for phone in phones:
+        normaliser._normalise(phone)
+    uncached_seconds = time.perf_counter() - start
+
+    mismatches = [
+        (phone, legacy, (result.phone, result.status == UNKNOWN))
+        for phone, legacy, result in zip(phones, legacy_results, results)
+        if legacy != (result.phone, result.status == UNKNOWN)
+    ]
+    for phone, legacy, new in mismatches[:20]:
+        print(f"MISMATCH {phone!r}: previous {legacy!r}, normaliser {new!r}")
+
+    print(f"previous implementation: {legacy_seconds:.4f}s")
+    print(f"PhoneNormaliser:         {seconds:.4f}s ({legacy_seconds / seconds:.1f}x faster, {normaliser.cache_info()})")
+    print(f"  without memoisation:   {uncached_seconds:.4f}s ({legacy_seconds / uncached_seconds:.1f}x faster)")
+    print(f"statuses: {dict(Counter(result.status for result in results))}")
+    print("Outputs identical." if not mismatches else f"{len(mismatches)} mismatches.")
+    return not mismatches
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,131 @@
+"""
+Benchmark and equivalence check of the two data_processing_pipeline backends (dict and pandas).
+
+Synthetic datasets of the given sizes are generated (realistic records mixed with the edge cases the pipeline handles:
+missing keys, wrong types, padded strings, office names, unknown org_ids, 'position_sort' instead of 'position_sort_order'...),
+and the JSON files of the given folders are used as fixtures. Every dataset is run through both backends,
+whose outputs must serialise to the same JSON. Warnings are not logged while timing.
+
+Usage:
+    python bench_process_pipeline.py [--sizes 10000 100000 1000000] [--folders folder ...] [--seed N]
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from directory_scraper.path_config import DEFAULT_SPIDERS_OUTPUT_FOLDER
+from directory_scraper.src.data_processing.process_data import data_processing_pipeline
+from directory_scraper.src.benchmarks.bench_phone_normaliser import SAMPLE_PHONES
+
+WORKFLOWS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../workflows"))
+DEFAULT_FOLDERS = [os.path.join(WORKFLOWS_DIR, DEFAULT_SPIDERS_OUTPUT_FOLDER)]
+
+ORG_IDS = ["JPM", "MOF", "KKM", "MOE", "DIGITAL", "KPKM", "UNKNOWN_ORG", "  MOT ", ""]
+NAMES = ["Ahmad bin Ali", " siti aminah ", "Kosong", "pejabat ketua setiausaha", "Kaunter Pertanyaan", "-", None, "Lim Wei Ling"]
+POSITIONS = ["Ketua Setiausaha", "pegawai tadbir ", None, "Setiausaha Bahagian"]
+EMAILS = ["ali@jpm.gov.my", "siti @ mof.gov.my", None, "", "not-an-email", "lim.wl@digital.gov.my "]
+DIVISIONS = ["Bahagian Khidmat Pengurusan", " unit integriti", None, "Bahagian Teknologi Maklumat"]
+
+def generate_records(size, seed):
+    """Generates `size` records, about one in ten with an edge case."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(size):
+        record = {
+            "org_sort": 999,
+            "org_id": rng.choice(ORG_IDS[:6]),
+            "org_name": "KEMENTERIAN CONTOH",
+            "org_type": "ministry",
+            "division_sort": rng.randint(1, 40),
+            "division_name": rng.choice(DIVISIONS),
+            "subdivision_name": None,
+            "position_sort_order": i,
+            "position_name": rng.choice(POSITIONS),
+            "person_name": rng.choice(NAMES[:3] + NAMES[-1:]),
+            "person_phone": rng.choice(SAMPLE_PHONES),
+            "person_email": rng.choice(EMAILS[:1] + EMAILS[-1:]),
+            "person_fax": None,
+            "parent_org_id": None,
+        }
+        if rng.random() < 0.1:
+            edge = rng.randrange(10)
+            if edge == 0:
+                del record[rng.choice(["org_name", "org_type", "division_name", "person_fax", "org_sort"])]
+            elif edge == 1:
+                record["division_sort"] = rng.choice([str(record["division_sort"]), f" {record['division_sort']}", float(record["division_sort"]), None, "x"])
+            elif edge == 2:
+                record["org_id"] = rng.choice(ORG_IDS)
+            elif edge == 3:
+                record["person_name"] = rng.choice(NAMES)
+            elif edge == 4:
+                record["person_email"] = rng.choice(EMAILS)
+            elif edge == 5:
+                record["person_fax"] = rng.choice([12345, "03-1234 5678 "])
+            elif edge == 6:
+                record["org_type"] = rng.choice(["Agency", "jabatan", None])
+            elif edge == 7:
+                record["extra_key"] = " dropped "
+            elif edge == 8:
+                record["org_name"] = rng.choice([None, 7, "  kementerian  "])
+            elif edge == 9:
+                record["position_sort"] = record.pop("position_sort_order")
+        records.append(record)
+    return records
+
+def load_fixtures(folders):
+    fixtures = []
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        for file_name in sorted(os.listdir(folder)):
+            if file_name.endswith(".json"):
+                with open(os.path.join(folder, file_name), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, list):
+                    fixtures.append((file_name, data))
+    return fixtures
+
+def run(name, data):
+    """Runs both backends on copies of `data`, prints the timings, and returns True if the outputs are the same."""
+    dict_input, pandas_input = copy.deepcopy(data), copy.deepcopy(data)
+    start = time.perf_counter()
+    dict_output = data_processing_pipeline(dict_input)
+    dict_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pandas_output = data_processing_pipeline(pandas_input, backend="pandas")
+    pandas_seconds = time.perf_counter() - start
+
+    identical = json.dumps(dict_output) == json.dumps(pandas_output)
+    print(f"{name:>24}: {len(data):>8} rows -> {len(dict_output):>8} | dict {dict_seconds:8.3f}s | pandas {pandas_seconds:8.3f}s ({dict_seconds / pandas_seconds:5.1f}x) | {'identical' if identical else 'DIFFERENT'}")
+    if not identical:
+        for index, (a, b) in enumerate(zip(dict_output, pandas_output)):
+            if json.dumps(a) != json.dumps(b):
+                print(f"  first difference at {index}:\n  dict:   {a}\n  pandas: {b}")
+                break
+    return identical
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dict and pandas backends of data_processing_pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000, 1_000_000], help="Sizes of the synthetic datasets.")
+    parser.add_argument("--folders", nargs="*", default=DEFAULT_FOLDERS, help="Folders of spider output JSON files used as fixtures.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    data_processing_pipeline(generate_records(10, args.seed), backend="pandas")  # imports pandas before timing
+    identical = True
+    for file_name, data in load_fixtures(args.folders):
+        identical &= run(file_name, data)
+    for size in args.sizes:
+        identical &= run("synthetic", generate_records(size, args.seed))
+    print("Outputs identical." if identical else "Outputs differ.")
+    return identical
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,208 @@
+"""
+Columnar (pandas) backend of process_data.data_processing_pipeline, used with `backend="pandas"`.
+
+The records are turned into one column per field, and each step of the pipeline runs on whole columns:
+schema coercion, strip, org_sort mapping, person_name filter, org_type, email and phone checks, and uppercase.
+String steps are run once per distinct value of a column (pd.factorize), then taken back to every row:
+scraped columns repeat the same few values (org_name, division_name, position_name...) over thousands of rows.
+The records are then sorted by (division_sort, position_sort_order), and position_sort is a groupby-rank over division_sort.
+
+The output (records, values and order) and the validation report counts are the same as the dict path.
+"""
+import logging
+import numpy as np
+import pandas as pd
+from directory_scraper.src.utils.file_utils import load_org_mapping
+from directory_scraper.src.data_processing.process_data import (
+    DATA_SCHEMA, UPPERCASE_KEYS, TITLECASE_KEYS, EMAIL_PATTERN, ALLOWED_ORG_TYPES, PHONE_NORMALISER, reorder_keys, coerce_required_value,
+)
+from directory_scraper.src.data_processing.phone_normaliser import UNKNOWN, INVALID
+from directory_scraper.src.data_processing.validation_report import (
+    ValidationReport, MISSING, UNMAPPED, NOT_ALLOWED, INVALID_FORMAT, UNKNOWN_PATTERN, INVALID_PATTERN, REMOVED,
+)
+
+OUTPUT_KEYS = list(reorder_keys({}))
+_MISSING = object()  # a key absent from the record, as opposed to a None value
+
+def _column(data, key):
+    values = np.empty(len(data), dtype=object)
+    values[:] = [record.get(key, _MISSING) for record in data]
+    return values
+
+class _Factorized:
+    """
+    A column split into codes and distinct values (None and NaN have code -1).
+    Only str values are transformed: a str is never equal to a non-str, so a distinct str stands exactly for its rows,
+    while distinct numbers may stand for equal values of other types (1, 1.0, True).
+    """
+    def __init__(self, values):
+        self.values = values
+        self.codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        self.uniques = uniques.tolist()
+        self.is_str = np.fromiter((isinstance(value, str) for value in self.uniques), dtype=bool, count=len(self.uniques))
+        self.str_rows = self.codes >= 0
+        self.str_rows[self.str_rows] = self.is_str[self.codes[self.str_rows]]
+
+    def map_str(self, func):
+        """Returns the uniques with `func` applied to the str ones (other uniques are None)."""
+        return [func(value) if is_str else None for value, is_str in zip(self.uniques, self.is_str)]
+
+    def take(self, mapped):
+        """Returns the column with each str row replaced by `mapped[code]`."""
+        rows = self.str_rows
+        values = self.values.copy()
+        if rows.any():
+            mapped_values = np.empty(len(mapped), dtype=object)
+            mapped_values[:] = mapped
+            values[rows] = mapped_values[self.codes[rows]]
+        return values
+
+    def rows_where(self, unique_flags):
+        """Boolean array of the str rows whose unique value has a True flag."""
+        flags = np.fromiter((bool(flag) for flag in unique_flags), dtype=bool, count=len(self.uniques))
+        rows = self.str_rows.copy()
+        rows[rows] = flags[self.codes[rows]]
+        return rows
+
+def _rows_to_coerce(values, meta):
+    """Boolean array of the rows validate_required_keys would change."""
+    if meta["type"] is str:
+        factorized = _Factorized(values)
+        rows = ~factorized.str_rows
+        if meta["nullable"] and rows.any():
+            rows[rows] = np.fromiter((value is not None for value in values[rows]), dtype=bool, count=int(rows.sum()))
+        return rows
+    if pd.api.types.infer_dtype(values, skipna=False) == "integer":
+        return np.zeros(len(values), dtype=bool)
+    return np.fromiter(
+        (not isinstance(value, meta["type"]) or (value is None and not meta["nullable"]) for value in values),
+        dtype=bool, count=len(values),
+    )
+
+def _report_rows(report, spider, field, rule, rows, values, data):
+    """Counts the issues of the selected `rows`, the first ones are kept as samples."""
+    count = int(rows.sum())
+    if count:
+        report.add(spider, field, rule, count=count)
+        for row in np.flatnonzero(rows)[:report.samples_per_rule]:
+            report.add_sample(spider, field, rule, values[row], data[row])
+
+def columnar_processing_pipeline(data, reset_per_division=True, org_mapping=None, report=None, spider=None):
+    """
+    Processes all records in the given data list, like data_processing_pipeline, on pandas columns.
+
+    Args:
+        data (list): Records (dicts) as scraped.
+        reset_per_division (bool): position_sort restarts at 1 in each division (otherwise it runs across the organisation).
+        org_mapping (dict): org_id -> org_sort, taken from the reference data cache if not given.
+        report (ValidationReport): Counts the validation issues (with the same counts as the dict path), under `spider`.
+
+    Returns:
+        list: The processed records, sorted, with their keys in the order of reorder_keys.
+    """
+    report = report if report is not None else ValidationReport()
+    spider = spider or "data"
+    report.add_records(spider, len(data))
+    if not data:
+        return []
+
+    # Schema coercion (validate_required_keys), only on the rows that need it
+    columns = {}
+    for key, meta in DATA_SCHEMA.items():
+        values = _column(data, key)
+        rows = _rows_to_coerce(values, meta)
+        if rows.any():
+            coerced = np.empty(int(rows.sum()), dtype=object)
+            for index, row in enumerate(np.flatnonzero(rows)):
+                value = values[row]
+                missing = value is _MISSING
+                coerced[index], rules = coerce_required_value(None if missing else value, meta, missing)
+                for rule in rules:
+                    report.add(spider, key, rule, None if missing else value, data[row])
+            values[rows] = coerced
+        columns[key] = values
+    position_sort = _column(data, "position_sort")
+    position_sort_order = _column(data, "position_sort_order")
+    has_position_sort = np.fromiter((value is not _MISSING for value in position_sort), dtype=bool, count=len(data))
+    # position_sort is renamed to position_sort_order (standardize_position_sort_key)
+    sort_order = np.where(has_position_sort, position_sort, position_sort_order)
+
+    # Records whose person_name is an office or counter are removed (validate_person_name).
+    # Like the dict path, the checks after the person_name one (org_type, email, phone) only count the records kept.
+    factorized = _Factorized(columns["person_name"])
+    faulty = factorized.rows_where([name.lower().startswith(("pejabat", "kaunter")) if name else False for name in factorized.map_str(str.strip)])
+    _report_rows(report, spider, "person_name", REMOVED, faulty, columns["person_name"], data)
+    keep = ~faulty
+
+    # Strip spaces of every str value, then the column specific steps on the distinct values
+    for key, values in columns.items():
+        if DATA_SCHEMA[key]["type"] is not str:
+            continue
+        factorized = _Factorized(values)
+        stripped = factorized.map_str(str.strip)
+
+        if key == "org_id":
+            if org_mapping is None:
+                org_mapping = load_org_mapping()
+            if org_mapping is None:
+                logging.error("Error: Could not load org_mapping.")
+            else:
+                # org_id is never None after coercion, so every row is a str row
+                org_sorts = [org_mapping.get(org_id, 999999) if org_id else 999999 for org_id in stripped]
+                columns["org_sort"] = factorized.take(org_sorts)
+                _report_rows(report, spider, "org_id", MISSING, factorized.rows_where([org_id == "" for org_id in stripped]), values, data)
+                _report_rows(report, spider, "org_id", UNMAPPED, factorized.rows_where([org_id and org_id not in org_mapping for org_id in stripped]), values, data)
+        elif key == "org_type":
+            rows = factorized.rows_where([org_type is not None and org_type.lower() not in ALLOWED_ORG_TYPES for org_type in stripped])
+            _report_rows(report, spider, "org_type", NOT_ALLOWED, rows & keep, values, data)
+        elif key == "person_email":
+            stripped = [email.replace(" ", "") if email else email for email in stripped]
+            rows = factorized.rows_where([email and not EMAIL_PATTERN.match(email) for email in stripped])
+            _report_rows(report, spider, "person_email", INVALID_FORMAT, rows & keep, values, data)
+        elif key == "person_phone":
+            results = [PHONE_NORMALISER.normalise(phone) if phone else None for phone in stripped]
+            stripped = [result.phone if result else phone for phone, result in zip(stripped, results)]
+            rows = factorized.rows_where([result and result.status == UNKNOWN for result in results])
+            _report_rows(report, spider, "person_phone", UNKNOWN_PATTERN, rows & keep, values, data)
+            rows = factorized.rows_where([result and result.status == INVALID for result in results])
+            _report_rows(report, spider, "person_phone", INVALID_PATTERN, rows & keep, values, data)
+
+        if key in UPPERCASE_KEYS:
+            stripped = [value.upper() if isinstance(value, str) else value for value in stripped]
+        if key in TITLECASE_KEYS:
+            stripped = [value.title() if isinstance(value, str) else value for value in stripped]
+        columns[key] = factorized.take(stripped)
+
+    factorized = _Factorized(sort_order)
+    sort_order = factorized.take(factorized.map_str(str.strip))
+    if any(value is _MISSING for value in sort_order[keep]):
+        raise KeyError("position_sort_order")
+
+    # Records removed by the person_name check
+    if not keep.all():
+        columns = {key: values[keep] for key, values in columns.items()}
+        sort_order = sort_order[keep]
+    divisions = columns["division_sort"]
+
+    # Sort by (division_sort, position_sort_order), stable like sorted()
+    order = None
+    if pd.api.types.infer_dtype(divisions, skipna=False) == "integer" and pd.api.types.infer_dtype(sort_order, skipna=False) == "integer":
+        try:
+            order = np.lexsort((sort_order.astype(np.int64), divisions.astype(np.int64)))
+        except OverflowError:
+            order = None
+    if order is None:
+        # Any other types are compared exactly as the dict path does
+        division_values, sort_values = divisions.tolist(), sort_order.tolist()
+        order = sorted(range(len(division_values)), key=lambda i: (division_values[i], sort_values[i]))
+    columns = {key: values[order] for key, values in columns.items()}
+
+    # position_sort: rank within each division (sort_person_by_division) or across the organisation
+    if reset_per_division:
+        divisions = pd.Series(columns["division_sort"], dtype=object)
+        columns["position_sort"] = (divisions.groupby(divisions, sort=False).cumcount() + 1).to_numpy()
+    else:
+        columns["position_sort"] = np.arange(1, len(order) + 1)
+
+    rows = zip(*(columns[key].tolist() for key in OUTPUT_KEYS))
+    return [dict(zip(OUTPUT_KEYS, row)) for row in rows]
@@ -1,6 +1,11 @@
+import heapq
 import json
 import os
+import sys
 import logging
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from directory_scraper.src.utils import json_codec
+from directory_scraper.src.data_processing.compile_manifest import CompileManifest, MANIFEST_SUFFIX, get_manifest_path, hash_file
 
 #logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -32,54 +37,258 @@ def validate_required_keys(record, json_file):
 
     return record
 
-def compile_json_files(input_folder):
+def list_json_files(input_folder, exclude=()):
+    """Paths of the JSON files in the input folder, sorted by name, without compile manifests and the `exclude` paths (e.g. the compiled output file)"""
+    exclude = {os.path.abspath(path) for path in exclude}
+    return [
+        os.path.join(input_folder, json_file)
+        for json_file in sorted(os.listdir(input_folder))
+        if json_file.endswith('.json') and not json_file.endswith(MANIFEST_SUFFIX) and os.path.abspath(os.path.join(input_folder, json_file)) not in exclude
+    ]
+
+def compile_json_files(input_folder, exclude=()):
     """Function to compile all JSON files from a folder into one list"""
     compiled_data = []
     
-    for json_file in os.listdir(input_folder):
-        if json_file.endswith('.json'):
-            json_file_path = os.path.join(input_folder, json_file)
-            with open(json_file_path, 'r') as f:
-                data = json.load(f)
-                for record in data:
-                    record = validate_required_keys(record, json_file)
-                    compiled_data.append(record)
+    for json_file_path in list_json_files(input_folder, exclude):
+        json_file = os.path.basename(json_file_path)
+        data = json_codec.load_file(json_file_path)
+        for record in data:
+            record = validate_required_keys(record, json_file)
+            compiled_data.append(record)
     
     return compiled_data
 
+def iter_json_array(file_path, chunk_size=1 << 16):
+    """
+    Yields the items of a JSON array file one by one, reading the file by chunks of `chunk_size` characters,
+    so only the current item (and one chunk) is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, started = "", 0, False
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            # Skip whitespace, the opening bracket and the separators
+            while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ',' or (buffer[position] == '[' and not started)):
+                started = started or buffer[position] == '['
+                position += 1
+            if position < len(buffer) and buffer[position] == ']' and started:
+                return
+            if position < len(buffer):
+                if not started:
+                    raise ValueError(f"{file_path} is not a JSON array")
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                    # A number may be cut by the end of the chunk ('1' of '1.5' or '1e5'): an item is only complete
+                    # once followed by whitespace, a separator or the closing bracket
+                    if end < len(buffer) and (buffer[end].isspace() or buffer[end] in ',]'):
+                        yield item
+                        position = end
+                        continue
+                except json.JSONDecodeError:
+                    pass  # incomplete item, read more
+            chunk = f.read(chunk_size)
+            if not chunk:
+                if position < len(buffer):
+                    raise ValueError(f"{file_path} ends with an incomplete JSON array")
+                raise ValueError(f"{file_path} is not a JSON array" if not started else f"{file_path} has no closing bracket")
+            buffer, position = buffer[position:] + chunk, 0
+
+def sort_key(record):
+    return (record['org_sort'], record['division_sort'], record['position_sort'])
+
+class UnsortedFileError(ValueError):
+    """A file read by the streaming compile isn't sorted by (org_sort, division_sort, position_sort)"""
+
+def iter_sorted_records(json_file_path):
+    """Yields the validated records of one file, checking they come in sort_key order"""
+    json_file = os.path.basename(json_file_path)
+    previous_key = None
+    for record in iter_json_array(json_file_path):
+        record = validate_required_keys(record, json_file)
+        key = sort_key(record)
+        if previous_key is not None and key < previous_key:
+            raise UnsortedFileError(f"{json_file} is not sorted by (org_sort, division_sort, position_sort): {key} after {previous_key}")
+        previous_key = key
+        yield record
+
+def merge_json_files(input_folder, exclude=()):
+    """
+    Streaming version of compile_json_files + sort_data: the files (each already sorted by process_data)
+    are read incrementally and merged with a heap on (org_sort, division_sort, position_sort).
+    Memory is bounded by the number of files, not the number of records. Equal keys keep the file order, like sort_data.
+    Raises UnsortedFileError while iterating if a file isn't sorted.
+    """
+    return heapq.merge(*(iter_sorted_records(path) for path in list_json_files(input_folder, exclude)), key=sort_key)
+
 def sort_data(data):
     """Function to sort the compiled data"""
-    return sorted(data, key=lambda x: (x['org_sort'], x['division_sort'], x['position_sort']))
+    return sorted(data, key=sort_key)
 
 def write_json_file(file_path, data):
     """Function to write data back to a JSON file"""
-    with open(file_path, 'w') as file:
-        json.dump(data, file, indent=4)
+    json_codec.dump_file(data, file_path, json_codec.PRETTY)
 
 def write_json_file_row_by_row(file_path, data):
     """
     Function to write data back to a JSON file in a row-by-row format,
     where each dictionary is written on its own line inside a valid JSON array.
+    `data` can be any iterable (e.g. the generator of merge_json_files), it is written as it's consumed.
+    Returns the number of records written.
     """
-    with open(file_path, 'w') as file:
+    count = 0
+    with open(file_path, 'wb') as file:
         # Write the opening bracket for the JSON array
-        file.write('[\n')
+        file.write(b'[\n')
         
-        # Loop through each record in data and write it on a new line
-        for index, record in enumerate(data):
-            json.dump(record, file, separators=(',', ':'), ensure_ascii=False)
-            # Add a comma after each object except the last one
-            if index < len(data) - 1:
-                file.write(',\n')
-            else:
-                file.write('\n')
+        # Loop through each record in data and write it on a new line, with a comma before each object except the first one
+        for record in data:
+            if count:
+                file.write(b',\n')
+            file.write(json_codec.dumps(record))
+            count += 1
+        if count:
+            file.write(b'\n')
         
         # Write the closing bracket for the JSON array
-        file.write(']')
+        file.write(b']')
+    return count
+
+def serialise_records(json_file_path):
+    """Yields the validated records of one file as the lines write_json_file_row_by_row writes (UTF-8 bytes, without separators)"""
+    json_file = os.path.basename(json_file_path)
+    for record in iter_json_array(json_file_path):
+        record = validate_required_keys(record, json_file)
+        yield json_codec.dumps(record)
+
+def scan_json_file(json_file_path):
+    """Returns the manifest entry of one input file (without its hash and byte range), and whether its records are in sort_key order"""
+    json_file = os.path.basename(json_file_path)
+    entry = {"sha256": None, "records": 0, "org_ids": set(), "first_key": None, "last_key": None, "offset": None, "length": 0}
+    is_sorted = True
+    for record in iter_json_array(json_file_path):
+        record = validate_required_keys(record, json_file)
+        key = list(sort_key(record))
+        if entry["last_key"] is not None and key < entry["last_key"]:
+            is_sorted = False
+        entry["first_key"] = entry["first_key"] or key
+        entry["last_key"] = key
+        entry["records"] += 1
+        entry["org_ids"].add(record.get("org_id"))
+    entry["org_ids"] = sorted(org_id for org_id in entry["org_ids"] if org_id is not None)
+    return entry, is_sorted
+
+def has_disjoint_segments(ordered):
+    """True if the (index, name, entry) files, ordered by first key, follow each other without their key ranges overlapping"""
+    for (index, _, entry), (next_index, _, next_entry) in zip(ordered, ordered[1:]):
+        if entry["last_key"] > next_entry["first_key"] or (entry["last_key"] == next_entry["first_key"] and index > next_index):
+            return False
+    return True
+
+def copy_byte_range(file_path, offset, length, out, chunk_size=1 << 20):
+    """Copies `length` bytes of a file, from `offset`, to the binary file object `out`"""
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        while length:
+            chunk = f.read(min(length, chunk_size))
+            if not chunk:
+                raise ValueError(f"{file_path} is shorter than its manifest, delete the manifest to compile from scratch")
+            out.write(chunk)
+            length -= len(chunk)
+
+def incremental_compile(input_folder, output_file):
+    """
+    Compiles the input folder like the other modes (the output bytes are the same), reusing the previous compile:
+    the segment of a file whose SHA-256 didn't change is copied straight from the previous output, only changed files are re-serialised.
+    This needs each file's records to be contiguous in the output (files with disjoint sort key ranges, e.g. one file per org),
+    otherwise the compile is done by the streaming mode and the manifest has no byte ranges.
+    The manifest is saved next to the output (compile_manifest.py) and returned.
+    """
+    manifest_path = get_manifest_path(output_file)
+    previous = CompileManifest.load(manifest_path)
+    reuse_output = previous is not None and previous.matches_output(output_file)
+    previous_files = previous.files if previous else {}
+
+    files, changes, reused, incremental = {}, {"added": [], "modified": [], "removed": [], "unchanged": []}, set(), True
+    paths = {}
+    for index, json_file_path in enumerate(list_json_files(input_folder, exclude=[output_file])):
+        json_file = os.path.basename(json_file_path)
+        paths[json_file] = (index, json_file_path)
+        sha256 = hash_file(json_file_path)
+        old_entry = previous_files.get(json_file)
+        if old_entry and old_entry["sha256"] == sha256:
+            changes["unchanged"].append(json_file)
+            if reuse_output:
+                files[json_file] = dict(old_entry)
+                reused.add(json_file)
+                continue
+        else:
+            changes["modified" if old_entry else "added"].append(json_file)
+        files[json_file], is_sorted = scan_json_file(json_file_path)
+        files[json_file]["sha256"] = sha256
+        incremental = incremental and is_sorted
+    changes["removed"] = sorted(set(previous_files) - set(files))
+    removed_org_ids = sorted({org_id for json_file in changes["removed"] for org_id in previous_files[json_file]["org_ids"]})
+
+    ordered = sorted(
+        ((index, json_file, files[json_file]) for json_file, (index, _) in paths.items() if files[json_file]["records"]),
+        key=lambda item: (item[2]["first_key"], item[0]),
+    )
+    incremental = incremental and has_disjoint_segments(ordered)
+
+    if incremental:
+        temp_file = output_file + '.tmp'
+        with open(temp_file, 'wb') as out:
+            out.write(b'[\n')
+            for position, (index, json_file, entry) in enumerate(ordered):
+                if position:
+                    out.write(b',\n')
+                offset = out.tell()
+                if json_file in reused:
+                    copy_byte_range(output_file, entry["offset"], entry["length"], out)
+                else:
+                    for line_index, line in enumerate(serialise_records(paths[json_file][1])):
+                        if line_index:
+                            out.write(b',\n')
+                        out.write(line)
+                entry["offset"], entry["length"] = offset, out.tell() - offset
+            if ordered:
+                out.write(b'\n')
+            out.write(b']')
+        os.replace(temp_file, output_file)
+        copied = sum(1 for _, json_file, _ in ordered if json_file in reused)
+        logging.info(f"Incrementally compiled {output_file}: {copied} segments copied, {len(ordered) - copied} re-serialised.")
+    else:
+        logging.warning(f"The input files of {output_file} can't be compiled as one segment per file, compiling all of them.")
+        data_compiling_pipeline(input_folder, output_file, streaming=True)
+        for entry in files.values():
+            entry["offset"], entry["length"] = None, 0
+
+    stat = os.stat(output_file)
+    manifest = CompileManifest(files, changes, removed_org_ids, stat.st_size, stat.st_mtime_ns, incremental)
+    manifest.save(manifest_path)
+    return manifest
+
+def data_compiling_pipeline(input_folder, output_file, streaming=False, incremental=False):
+    """
+    Main pipeline function.
+    streaming=True merges the files as they're read (merge_json_files) instead of loading and sorting all records.
+    If a file turns out not to be sorted, the compile is redone in memory.
+    incremental=True only re-serialises the files changed since the last compile (incremental_compile), and returns its manifest.
+    """
+    if incremental:
+        return incremental_compile(input_folder, output_file)
+
+    exclude = [output_file]
+    if streaming:
+        try:
+            count = write_json_file_row_by_row(output_file, merge_json_files(input_folder, exclude=exclude))
+            logging.info(f"Successfully compiled {count} records! Saved as {output_file}")
+            return
+        except UnsortedFileError as e:
+            logging.warning(f"{e}. Compiling in memory instead.")
 
-def data_compiling_pipeline(input_folder, output_file):
-    """Main pipeline function"""
-    compiled_data = compile_json_files(input_folder)
+    compiled_data = compile_json_files(input_folder, exclude=exclude)
     sorted_data = sort_data(compiled_data)
     write_json_file_row_by_row(output_file, sorted_data)
     
@@ -90,4 +299,4 @@ if __name__ == "__main__":
     input_folder = 'data/output'
     output_file = 'data/output/compiled.json'
 
-    data_compiling_pipeline(input_folder, output_file)
\ No newline at end of file
+    data_compiling_pipeline(input_folder, output_file, streaming=True)
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Manifest of an incremental compile (see compile_data.data_compiling_pipeline with incremental=True).
+
+For every input file it records the SHA-256 of the file, the org_ids it holds, its first and last sort keys,
+and the byte range (offset, length) of its segment in the compiled output. It also records which files were
+added, modified or removed by the last compile, so downstream jobs (ES upload, Sheets load) can ask which orgs changed:
+
+    python compile_manifest.py data/output/compiled.json.manifest.json --changed-orgs
+"""
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+def get_manifest_path(output_file):
+    return output_file + MANIFEST_SUFFIX
+
+def hash_file(file_path, chunk_size=1 << 20):
+    """SHA-256 of a file, read by chunks"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+class CompileManifest:
+    """
+    Args:
+        files (dict): input file name -> {"sha256", "records", "org_ids", "first_key", "last_key", "offset", "length"}
+            (offset and length are in bytes, in the compiled output).
+        changes (dict): {"added": [...], "modified": [...], "removed": [...], "unchanged": [...]} file names of the last compile.
+        removed_org_ids (list): org_ids of the removed files (their records are gone, even if the org has other files).
+        output_size (int), output_mtime_ns (int): the compiled output as written, to tell if it was changed since.
+        incremental (bool): False if the last compile couldn't be split into one segment per file (it then has no byte ranges).
+    """
+    def __init__(self, files=None, changes=None, removed_org_ids=None, output_size=None, output_mtime_ns=None, incremental=True, compiled_at=None):
+        self.files = files or {}
+        self.changes = changes or {"added": [], "modified": [], "removed": [], "unchanged": []}
+        self.removed_org_ids = removed_org_ids or []
+        self.output_size = output_size
+        self.output_mtime_ns = output_mtime_ns
+        self.incremental = incremental
+        self.compiled_at = compiled_at
+
+    @classmethod
+    def load(cls, path):
+        """Returns the manifest at `path`, or None if there is none (or it can't be read)"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(**json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError, TypeError):
+            return None
+
+    def save(self, path):
+        self.compiled_at = datetime.now().isoformat(timespec="seconds")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    def to_dict(self):
+        return {
+            "compiled_at": self.compiled_at,
+            "incremental": self.incremental,
+            "output_size": self.output_size,
+            "output_mtime_ns": self.output_mtime_ns,
+            "changes": self.changes,
+            "removed_org_ids": self.removed_org_ids,
+            "files": self.files,
+        }
+
+    def matches_output(self, output_file):
+        """True if the compiled output is still the file this manifest describes (its segments can be copied)"""
+        if not self.incremental or not os.path.exists(output_file):
+            return False
+        stat = os.stat(output_file)
+        return stat.st_size == self.output_size and stat.st_mtime_ns == self.output_mtime_ns
+
+    def changed_files(self):
+        """Input files added, modified or removed by the last compile"""
+        return self.changes["added"] + self.changes["modified"] + self.changes["removed"]
+
+    def changed_org_ids(self):
+        """org_ids whose records may have changed in the last compile (including the ones of removed files)"""
+        org_ids = set(self.removed_org_ids)
+        for file_name in self.changes["added"] + self.changes["modified"]:
+            org_ids.update(self.files[file_name]["org_ids"])
+        return sorted(org_ids)
+
+    def has_changes(self):
+        return bool(self.changed_files())
+
+def get_changed_org_ids(output_file):
+    """org_ids changed by the last compile of `output_file`, or None if it has no manifest (treat everything as changed)"""
+    manifest = CompileManifest.load(get_manifest_path(output_file))
+    return None if manifest is None else manifest.changed_org_ids()
+
+def main():
+    parser = argparse.ArgumentParser(description="Shows what the last compile changed.")
+    parser.add_argument("manifest", help="Path of the manifest (<compiled file>.manifest.json).")
+    parser.add_argument("--changed-orgs", action="store_true", help="Only print the changed org_ids, one per line.")
+    args = parser.parse_args()
+
+    manifest = CompileManifest.load(args.manifest)
+    if manifest is None:
+        parser.exit(1, f"No manifest at {args.manifest}\n")
+    if args.changed_orgs:
+        for org_id in manifest.changed_org_ids():
+            print(org_id)
+        return
+    print(f"Compiled at {manifest.compiled_at} ({'incremental' if manifest.incremental else 'full'})")
+    for change, file_names in manifest.changes.items():
+        print(f"{change}: {len(file_names)} {file_names if change != 'unchanged' else ''}")
+    print(f"Changed org_ids: {manifest.changed_org_ids()}")
+
+if __name__ == "__main__":
+    main()
@@ -21,4 +21,4 @@ if __name__ == "__main__":
 
     output_file = 'compiled.json' #define
 
-    data_compiling_pipeline(output_folder, output_file)
+    data_compiling_pipeline(output_folder, output_file, streaming=True)
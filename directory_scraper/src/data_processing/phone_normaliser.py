@@ -0,0 +1,180 @@
+"""
+Phone number normalisation used by process_data.validate_person_phone.
+
+All patterns are compiled once. The valid and invalid phone patterns are each combined into a single
+alternation with one named group per rule, so a number is checked with one regex call per set,
+and the rule that matched is reported. Results are memoised, since the same numbers (e.g. a division's
+main line) repeat across many records.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+PLACEHOLDER_PHONES = ["-", "0", "tiada", "."]
+
+# Result statuses
+PLACEHOLDER = "placeholder"  # a placeholder such as '-' or 'tiada', phone is None
+EMPTY = "empty"              # nothing left after cleaning, phone is None
+INVALID = "invalid"          # matched an invalid pattern, phone is None
+VALID = "valid"              # matched a valid pattern
+UNKNOWN = "unknown"          # cleaned but matched no pattern, phone is kept
+
+PhoneResult = namedtuple("PhoneResult", ["phone", "status", "rule"])
+
+# Cleaning steps, in order
+_LEADING_DASH_PLUS = re.compile(r'^-\+')
+_PARENTHESES = re.compile(r'\([a-zA-Z ]*\)$|\((?=ext.)|(?<=\d{4})\)', re.IGNORECASE) # Cleaning parentheses, keeps extension but removes text
+_EXTENSION = re.compile(r'ext(\.\s{0,1}|\s*:\s*){0,1}', re.IGNORECASE) # Ignores case to cover edge case '082-242257EXT102'
+_TRAILING_DOT = re.compile(r'(?<=\d)\.$') # Removes any standalone dots at the end of a phone number
+_TELEFON_PREFIX = re.compile(r'^Telefon.*?(?=[06\(]|\+\d|-$)|-$')
+_WHITESPACE = re.compile(r'\s+')  # Removes all spaces, tabs, newlines inside the string
+_MISPLACED_CLOSING = re.compile(r'\)(?!.*\()')  # Remove misplaced closing parenthesis e.g "03-29358989-ext.205)" or "03-29358989-ext.205)/03-88836407"
+_MISPLACED_OPENING = re.compile(r'\((?!.*\))')  # Remove misplaced opening parenthesis e.g '(+410227994044' or '09-5163251(128'
+_LEADING_DASH = re.compile(r'^-(?=03|08)')
+
+# Formatting steps, only the first one that applies is used
+_LANDLINE_03 = re.compile(r'^03\d{8}$')
+_COUNTRY_603 = re.compile(r'^603\d{7,8}$')
+_COUNTRY_PLUS_603 = re.compile(r'^\+603\d{7,8}$')
+_LANDLINE_EXT = re.compile(r'^0\d{7,8}-ext\.\d+$')
+_LANDLINE = re.compile(r'^0\d{7,8}$')
+_LANDLINE_03_LONG = re.compile(r'^03-\d{9}$')
+_LANDLINE_PARENTHESES_EXT = re.compile(r'^\d{2}-\d{7}\(\d{3}\)$')
+_LANDLINE_03_EXT = re.compile(r'^03\d{8}-ext.\d{4,5}')
+_REPEATED_PREFIX = re.compile(r'(^(?:03|087))[\-\s]+\1')
+_REPEATED_PREFIX_STRIP = {prefix: re.compile(rf'{prefix}[\-\s]*') for prefix in ("03", "087")}
+
+def _name_groups(pattern, prefix):
+    """
+    Renames the numbered groups of `pattern` to `<prefix><n>` (and `\\n` backreferences to `(?P=<prefix><n>)`),
+    so the pattern keeps working once embedded in a larger alternation.
+    """
+    out, i, group, in_class = [], 0, 0, False
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if not in_class and escaped.isdigit() and escaped != "0":
+                out.append(f"(?P={prefix}{escaped})")
+            else:
+                out.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(" and pattern[i + 1:i + 2] != "?":
+            group += 1
+            out.append(f"(?P<{prefix}{group}>")
+            i += 1
+            continue
+        out.append(char)
+        i += 1
+    return "".join(out)
+
+def _combine(patterns, name):
+    """Compiles `patterns` into one alternation, with the group `<name>_<index>` around each pattern."""
+    alternatives = [
+        f"(?P<{name}_{index}>{_name_groups(pattern, f'{name}_{index}_g')})"
+        for index, pattern in enumerate(patterns)
+    ]
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+class PhoneNormaliser:
+    """
+    Cleans and classifies phone numbers. `normalise(phone)` gives the same phone value as the original
+    step-by-step implementation of validate_person_phone, as a `PhoneResult(phone, status, rule)`,
+    where `rule` is the valid or invalid pattern that matched (None for the other statuses).
+
+    Args:
+        valid_patterns (list): Patterns of valid phone numbers (matched with re.IGNORECASE).
+        invalid_patterns (list): Patterns of invalid phone numbers, checked first (matched with re.IGNORECASE).
+        cache_size (int): Number of distinct phone strings whose result is memoised.
+    """
+    def __init__(self, valid_patterns, invalid_patterns, cache_size=65536):
+        self.valid_patterns = list(valid_patterns)
+        self.invalid_patterns = list(invalid_patterns)
+        self._valid_regex = _combine(self.valid_patterns, "valid")
+        self._invalid_regex = _combine(self.invalid_patterns, "invalid")
+        self.normalise = lru_cache(maxsize=cache_size)(self._normalise)
+
+    def cache_info(self):
+        return self.normalise.cache_info()
+
+    def _normalise(self, phone):
+        if phone in PLACEHOLDER_PHONES:
+            return PhoneResult(None, PLACEHOLDER, None)
+
+        phone = self.clean(phone)
+        if not phone:
+            return PhoneResult(None, EMPTY, None)
+        phone = self.format(phone)
+
+        # Check if the phone number matches any of the invalid patterns
+        match = self._invalid_regex.match(phone)
+        if match:
+            return PhoneResult(None, INVALID, self._matched_rule(match, self.invalid_patterns, "invalid"))
+        # Then, check if the phone number matches any valid patterns
+        match = self._valid_regex.match(phone)
+        if match:
+            return PhoneResult(phone, VALID, self._matched_rule(match, self.valid_patterns, "valid"))
+        return PhoneResult(phone, UNKNOWN, None)
+
+    @staticmethod
+    def _matched_rule(match, patterns, name):
+        for index, pattern in enumerate(patterns):
+            if match.group(f"{name}_{index}") is not None:
+                return pattern
+
+    @staticmethod
+    def clean(phone):
+        """Strips spaces, stray characters and labels, and normalises extensions."""
+        phone = phone.strip()
+        phone = _LEADING_DASH_PLUS.sub("+", phone)
+        phone = _PARENTHESES.sub(" ", phone)
+        phone = _EXTENSION.sub("-ext.", phone)
+        phone = phone.replace("--", "-")
+        phone = phone.replace("..", ".")
+        phone = _TRAILING_DOT.sub("", phone)
+        phone = phone.replace(" ", "")
+        phone = _TELEFON_PREFIX.sub("", phone)
+        phone = _WHITESPACE.sub("", phone)
+        phone = _MISPLACED_CLOSING.sub("", phone)
+        phone = _MISPLACED_OPENING.sub("", phone)
+        phone = _LEADING_DASH.sub("", phone)
+        return phone
+
+    @staticmethod
+    def format(phone):
+        """Adds the dash after the area code where it is missing, and removes repeated prefixes."""
+        # Add dash for numbers like '0362000591' -> '03-62000591'
+        if _LANDLINE_03.match(phone):
+            phone = f'{phone[:2]}-{phone[2:]}'
+        # Add dash for numbers like '60362000104' -> '603-62000104'
+        elif _COUNTRY_603.match(phone):
+            phone = f'{phone[:3]}-{phone[3:]}'
+        # Add dash for numbers like '+60362000104' -> '+603-62000104'
+        elif _COUNTRY_PLUS_603.match(phone):
+            phone = f'{phone[:4]}-{phone[4:]}'
+        # Add dash for numbers like '042625133-ext.101' -> '04-2625133-ext.101'
+        elif _LANDLINE_EXT.match(phone):
+            phone = f'{phone[:2]}-{phone[2:]}'
+        # Add dash for numbers like '042625133' -> '04-2625133'
+        elif _LANDLINE.match(phone):
+            phone = f'{phone[:2]}-{phone[2:]}'
+        # Numbers like '03-0388721983' or '04-7314957(117)' are already formatted correctly
+        elif _LANDLINE_03_LONG.match(phone) or _LANDLINE_PARENTHESES_EXT.match(phone):
+            pass
+        # Add dash for numbers like '0313415437-ext.32845' -> '03-13415437-ext.32845
+        elif _LANDLINE_03_EXT.match(phone):
+            phone = f"{phone[:2]}-{phone[2:]}"
+        # Removes dash from the front of the phone number to after the prefix
+        elif _LEADING_DASH.match(phone):
+            phone = f"{phone[1:3]}-{phone[3:]}"
+        # Removes repeated prefixes if exists e.g. '03-03-9236500' -> '03-9236500' or '087-087211415' -> '087-211415'
+        elif pattern_lst := _REPEATED_PREFIX.findall(phone):
+            trunc_pos = len(pattern_lst[0])
+            clean_phone = _REPEATED_PREFIX_STRIP[pattern_lst[0]].sub("", phone, count=1).replace("-", "")
+            phone = f"{clean_phone[:trunc_pos]}-{clean_phone[trunc_pos:]}"
+        return phone
@@ -1,12 +1,24 @@
 import os
 import json
+import hashlib
 import re
 import uuid
 import shutil
 import logging
+import multiprocessing
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from directory_scraper.src.utils.file_utils import load_org_mapping
+from directory_scraper.src.utils.ref_data import REF_DATA
+from directory_scraper.src.utils import json_codec
+from directory_scraper.src.utils.record_hash import hash_records, write_sidecar
+from directory_scraper.src.data_processing.phone_normaliser import PhoneNormaliser, UNKNOWN, INVALID
+from directory_scraper.src.data_processing.validation_report import (
+    ValidationReport, SAMPLES_PER_RULE, MISSING, INVALID_TYPE, UNCONVERTIBLE, NULL_DEFAULT, UNMAPPED, NOT_ALLOWED, INVALID_FORMAT,
+    UNKNOWN_PATTERN, INVALID_PATTERN, REMOVED,
+)
 
 PATH_ROOT = Path(__file__).parents[3]
 sys.path.append(str(PATH_ROOT))
@@ -35,6 +47,7 @@ UPPERCASE_KEYS = ["org_name", "division_name", "subdivision_name", "person_name"
 TITLECASE_KEYS = [""]
 
 EMAIL_REGEX = r'^[a-zA-Z0-9_.+\'\`-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
+EMAIL_PATTERN = re.compile(EMAIL_REGEX)
 
 ALLOWED_ORG_TYPES = ["ministry", "agency"]
 
@@ -128,23 +141,27 @@ INVALID_PHONE_REGEX = [
     r'(^\d{3})[ -]+\1',           # 011-011 (Numbers that consists of three number digits repeated twice)
 ]
 
+PHONE_NORMALISER = PhoneNormaliser(VALID_PHONE_REGEX, INVALID_PHONE_REGEX)
+
 def load_json(file_path):
     """
     Loads and returns the JSON data from the provided file path.
     """
-    with open(file_path, 'r', encoding='utf-8') as file:
-        return json.load(file)
+    return json_codec.load_file(file_path)
 
-def save_json(data, file_name, output_folder):
+def save_json(data, file_name, output_folder, record_hashes=None):
     """
     Saves the processed data to the provided output folder.
+    With `record_hashes` (from data_processing_pipeline), they are saved with the file SHA-256 in a sidecar (see record_hash.py).
     """
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+    os.makedirs(output_folder, exist_ok=True)  # several workers may save at the same time
 
     output_path = os.path.join(output_folder, file_name)
-    with open(output_path, 'w', encoding='utf-8') as file:
-        json.dump(data, file, indent=4)
+    data_bytes = json_codec.dumps_rows(data)  # one record per line, see json_codec.py
+    with open(output_path, 'wb') as file:
+        file.write(data_bytes)
+    if record_hashes is not None:
+        write_sidecar(output_path, record_hashes, hashlib.sha256(data_bytes).hexdigest())
 
     logging.info(f"Processed and saved to {output_path}")
 
@@ -156,9 +173,14 @@ def add_uuid(record):
     record["id"] = str(uuid.uuid4())
     return record
 
-def map_org_id_to_org_sort(record):
-    """Map org_id to org_sort for each record using org_mapping.json"""
-    org_mapping = load_org_mapping()  # oad org_mapping from file_utils.json
+def map_org_id_to_org_sort(record, org_mapping=None, report=None, spider=None):
+    """
+    Map org_id to org_sort for each record using org_mapping.json.
+    `org_mapping` can be passed when mapping many records, otherwise it is taken from the reference data cache.
+    Issues are counted in `report` (see validation_report.py) if given, otherwise logged.
+    """
+    if org_mapping is None:
+        org_mapping = load_org_mapping()  # load org_mapping from file_utils.json
 
     if org_mapping is None:
         logging.error("Error: Could not load org_mapping.")
@@ -167,107 +189,61 @@ def map_org_id_to_org_sort(record):
     org_id = record.get('org_id')
 
     if not org_id:
-        logging.warning(f"'org_id' missing in record: {record}")
+        if report is None:
+            logging.warning(f"'org_id' missing in record: {record}")
+        else:
+            report.add(spider, "org_id", MISSING, org_id, record)
         record['org_sort'] = 999999
         return
 
     if org_id in org_mapping:
         record['org_sort'] = org_mapping[org_id]
     else:
-        logging.warning(f"'org_id' '{org_id}' not found in org_mapping.")
+        if report is None:
+            logging.warning(f"'org_id' '{org_id}' not found in org_mapping.")
+        else:
+            report.add(spider, "org_id", UNMAPPED, org_id, record)
         record['org_sort'] = 999999
 
-def validate_org_type(record):
+def validate_org_type(record, report=None, spider=None):
     """Check the "org_type" field for validity"""
     org_type = record.get("org_type", "").lower()
     if org_type not in ALLOWED_ORG_TYPES:
-        logging.warning(f"Invalid 'org_type' '{org_type}' in record: {record}")
+        if report is None:
+            logging.warning(f"Invalid 'org_type' '{org_type}' in record: {record}")
+        else:
+            report.add(spider, "org_type", NOT_ALLOWED, org_type, record)
     return record
 
-def validate_person_email(record):
+def validate_person_email(record, report=None, spider=None):
     """Validate the email format for the "person_email" field, including cleaning spaces"""
     email = record.get("person_email")
     if email and isinstance(email, str):
         email = email.replace(" ", "")
         record["person_email"] = email
-        if not re.match(EMAIL_REGEX, email):
-            logging.warning(f"Invalid 'person_email' '{email}' in record: {record}")
+        if not EMAIL_PATTERN.match(email):
+            if report is None:
+                logging.warning(f"Invalid 'person_email' '{email}' in record: {record}")
+            else:
+                report.add(spider, "person_email", INVALID_FORMAT, email, record)
     return record
 
-def validate_person_phone(record):
+def validate_person_phone(record, report=None, spider=None):
     """
     Validates the person_phone format based on the allowed patterns.
-    Cleans up spaces and checks for valid patterns.
+    Cleans up spaces and checks for valid patterns (see phone_normaliser.py).
     """
     phone = record.get("person_phone")
     if phone and isinstance(phone, str):
-    
-        if phone in ["-", "0", "tiada", "."]:
-            record["person_phone"] = None
-            return record
-        
-        # Normalize phone number
-        phone = phone.strip()
-        phone = re.sub(r'^-\+', "+", phone)
-        phone = re.sub(r'\([a-zA-Z ]*\)$|\((?=ext.)|(?<=\d{4})\)', " ", phone, flags=re.IGNORECASE) # Cleaning parentheses, keeps extension but removes text
-        phone = re.sub(r'ext(\.\s{0,1}|\s*:\s*){0,1}', "-ext.", phone, flags=re.IGNORECASE) # Ignores case to cover edge case '082-242257EXT102'
-        phone = phone.replace("--", "-")
-        phone = phone.replace("..", ".")
-        phone = re.sub(r'(?<=\d)\.$', "", phone) # Removes any standalone dots at the end of a phone number
-        phone = phone.replace(" ", "")
-        phone = re.sub(r'^Telefon.*?(?=[06\(]|\+\d|-$)|-$', "", phone)
-        phone = re.sub(r'\s+', "", phone)  # Removes all spaces, tabs, newlines inside the string
-        phone = re.sub(r'\)(?!.*\()', "", phone)  # Remove misplaced closing parenthesis e.g "03-29358989-ext.205)" or "03-29358989-ext.205)/03-88836407"
-        phone = re.sub(r'\((?!.*\))', "", phone)  # Remove misplaced opening parenthesis e.g '(+410227994044' or '09-5163251(128'
-        phone = re.sub(r'^-(?=03|08)', "", phone) 
-
-        # Return record if phone number is empty after normalization
-        if not phone:
-            record["person_phone"] = None
-            return record
-
-        # Add dash for numbers like '0362000591' -> '03-62000591'
-        if re.match(r'^03\d{8}$', phone):  # If it's a 10-digit number starting with '03'
-            phone = f'{phone[:2]}-{phone[2:]}'
-        # Add dash for numbers like '60362000104' -> '603-62000104'
-        elif re.match(r'^603\d{7,8}$', phone):  # If it's 7 or 8 digits starting with '603'
-            phone = f'{phone[:3]}-{phone[3:]}'
-        # Add dash for numbers like '+60362000104' -> '+603-62000104'
-        elif re.match(r'^\+603\d{7,8}$', phone):  # If it's 7 or 8 digits starting with '+603'
-            phone = f'{phone[:4]}-{phone[4:]}'
-        # Add dash for numbers like '042625133-ext.101' -> '04-2625133-ext.101'
-        elif re.match(r'^0\d{7,8}-ext\.\d+$', phone):
-            phone = f'{phone[:2]}-{phone[2:]}'
-        # Add dash for numbers like '042625133' -> '04-2625133'
-        elif re.match(r'^0\d{7,8}$', phone):
-            phone = f'{phone[:2]}-{phone[2:]}'
-        # Add dash for numbers like '03-0388721983' -> '03-0388721983'
-        elif re.match(r'^03-\d{9}$', phone):
-            pass  # Number is already formatted correctly
-        # Add dash and parentheses for numbers like '04-7314957(117)'
-        elif re.match(r'^\d{2}-\d{7}\(\d{3}\)$', phone):
-            pass  # Number is already formatted correctly
-        # Add dash for numbers like '0313415437-ext.32845' -> '03-13415437-ext.32845
-        elif re.match(r'^03\d{8}-ext.\d{4,5}', phone):
-            phone = f"{phone[:2]}-{phone[2:]}"
-        # Removes dash from the front of the phone number to after the prefix
-        elif re.match(r'^-(?=03|08)', phone):
-            phone = f"{phone[1:3]}-{phone[3:]}"
-        # Removes repeated prefixes if exists e.g. '03-03-9236500' -> '03-9236500' or '087-087211415' -> '087-211415'
-        elif pattern_lst := re.findall(r'(^(?:03|087))[\-\s]+\1', phone):
-            trunc_pos = len(pattern_lst[0])
-            clean_phone = re.sub(rf'{pattern_lst[0]}[\-\s]*', "", phone, count=1).replace("-", "")
-            phone = f"{clean_phone[:trunc_pos]}-{clean_phone[trunc_pos:]}"
-
-        record["person_phone"] = phone
-        
-        # Check if the phone number matches any of the invalid patterns
-        if any(re.match(pattern, phone, re.IGNORECASE) for pattern in INVALID_PHONE_REGEX):
-            record["person_phone"] = None
-        else:
-            # Then, check if the phone number matches any valid patterns
-            if not any(re.match(pattern, phone, re.IGNORECASE) for pattern in VALID_PHONE_REGEX):
-                logging.warning(f"Invalid 'person_phone' '{phone}' in record: {record}")
+        result = PHONE_NORMALISER.normalise(phone)
+        record["person_phone"] = result.phone
+        if result.status == UNKNOWN:
+            if report is None:
+                logging.warning(f"Invalid 'person_phone' '{result.phone}' in record: {record}")
+            else:
+                report.add(spider, "person_phone", UNKNOWN_PATTERN, result.phone, record)
+        elif result.status == INVALID and report is not None:
+            report.add(spider, "person_phone", INVALID_PATTERN, phone, record)
 
     return record
 
@@ -282,31 +258,54 @@ def validate_person_name(record):
 
     return record
 
-def validate_required_keys(record):
+def coerce_required_value(value, meta, missing=False):
+    """
+    Returns the value validate_required_keys gives to a schema key (`missing`: the key is absent from the record),
+    and the list of validation rules it broke (see validation_report.py).
+    """
+    rules = []
+    if missing:
+        rules.append(MISSING)
+        value = None
+    elif not isinstance(value, meta["type"]) and not (meta["nullable"] and value is None):
+        # Try to convert if possible, otherwise set to None
+        try:
+            value = meta["type"](value)
+            rules.append(INVALID_TYPE)
+        except (ValueError, TypeError):
+            value = None
+            rules.append(UNCONVERTIBLE)
+
+    # Check if the field must not be None (i.e., nullable is False)
+    if value is None and not meta["nullable"]:
+        rules.append(NULL_DEFAULT)
+        value = 999999 if meta["type"] == int else "TIADA"  # Set default for int or str
+    return value, rules
+
+REQUIRED_KEY_MESSAGES = {
+    MISSING: "'{key}' missing in record {record}, adding with default value None.",
+    INVALID_TYPE: "'{key}' has invalid data type. Expected {type}, got {value_type} from record: {record}",
+    UNCONVERTIBLE: "Unable to convert '{key}' to {type}, setting value to None.",
+    NULL_DEFAULT: "'{key}' should not be None, setting default value.",
+}
+
+def validate_required_keys(record, report=None, spider=None):
     """
     Ensure that the given record contains all required keys and their values are of the correct data types.
     If a key is missing, has an incorrect data type, or is None when it shouldn't be, it will print a warning and attempt to fix it.
+    Issues are counted in `report` (see validation_report.py) if given, otherwise logged.
     """
     for key, meta in DATA_SCHEMA.items():
-        if key not in record:
-            logging.warning(f"'{key}' missing in record {record}, adding with default value None.")
-            record[key] = None  # Set missing keys to None
-        elif not isinstance(record[key], meta["type"]) and not (meta["nullable"] and record[key] is None):
-            logging.warning(f"'{key}' has invalid data type. Expected {meta['type']}, got {type(record[key])} from record: {record}")
-            # Try to convert if possible, otherwise set to None
-            try:
-                record[key] = meta["type"](record[key])
-            except (ValueError, TypeError):
-                logging.warning(f"Unable to convert '{key}' to {meta['type']}, setting value to None.")
-                record[key] = None
-
-        # Check if the field must not be None (i.e., nullable is False)
-        if record[key] is None and not meta["nullable"]:
-            logging.warning(f"'{key}' should not be None, setting default value.")
-            if meta["type"] == int:
-                record[key] = 999999  # Set default for int
+        missing = key not in record
+        value = record.get(key)
+        if not missing and (isinstance(value, meta["type"]) or (value is None and meta["nullable"])):
+            continue
+        record[key], rules = coerce_required_value(value, meta, missing)
+        for rule in rules:
+            if report is None:
+                logging.warning(REQUIRED_KEY_MESSAGES[rule].format(key=key, record=record, type=meta["type"], value_type=type(value)))
             else:
-                record[key] = "TIADA"  # Set default for str
+                report.add(spider, key, rule, value, record)
 
 def strip_spaces(record):
     """Function to strip leading and trailing spaces from all string properties in a record"""
@@ -415,27 +414,51 @@ def sort_division_person(data, reset_per_division=True):
     else:
         return sort_person_by_organisation(data)  # Option 2: Global position_sort by organisation
 
-def data_processing_pipeline(data):
+def data_processing_pipeline(data, backend="dict", report=None, spider=None, record_hashes=None):
     """
     Processes all records in the given data list.
     Cleans, validates, and optionally sorts the records, then returns the processed data.
+
+    backend="pandas" runs the same steps on pandas columns (see columnar_pipeline.py), with the same output.
+    Validation issues are counted in `report` under `spider` (see validation_report.py). Without a report,
+    a summary of the issues (one line per field and rule) is logged at the end.
+    If a `record_hashes` list is given, the hash of each processed record (the ES `sha_256_hash`, see record_hash.py)
+    is appended to it, in order.
     """
+    log_report = report is None
+    if log_report:
+        report = ValidationReport()
+    spider = spider or "data"
+
+    if backend == "pandas":
+        from directory_scraper.src.data_processing.columnar_pipeline import columnar_processing_pipeline
+        data = columnar_processing_pipeline(data, report=report, spider=spider)
+        if record_hashes is not None:
+            record_hashes.extend(hash_records(data))
+        if log_report:
+            report.log_summary()
+        return data
+    elif backend != "dict":
+        raise ValueError(f"Unknown backend '{backend}', expected 'dict' or 'pandas'.")
+
     # Step 1: Process each record individually
+    report.add_records(spider, len(data))
+    org_mapping = load_org_mapping()  # once per run, not once per record
     faulty_record_index = []
     for idx, record in enumerate(data):
         try:
-            validate_required_keys(record)
+            validate_required_keys(record, report, spider)
             strip_spaces(record)
-            map_org_id_to_org_sort(record)
+            map_org_id_to_org_sort(record, org_mapping, report, spider)
             validate_person_name(record)
-            validate_org_type(record)
-            validate_person_email(record)
-            validate_person_phone(record)
+            validate_org_type(record, report, spider)
+            validate_person_email(record, report, spider)
+            validate_person_phone(record, report, spider)
             capitalize_values(record)
             standardize_position_sort_key(record)
-        except ValueError as err:
+        except ValueError:
             faulty_record_index.append(idx)
-            logging.warning(str(err))
+            report.add(spider, "person_name", REMOVED, record.get("person_name"), record)
             continue
 
     # Step 1.5: Remove invalid records
@@ -453,20 +476,35 @@ def data_processing_pipeline(data):
         remove_keys(record)
         reordered_record = reorder_keys(record)
         data[idx] = reordered_record  # Replace the original record with the reordered one
-    
+
+    # Step 4: Hash the final records, once (in batches)
+    if record_hashes is not None:
+        record_hashes.extend(hash_records(data))
+
+    if log_report:
+        report.log_summary()
     return data
 
-def process_json_file(json_file_path, output_folder):
-    """Function to process a single JSON file and save the result"""
+def process_json_file(json_file_path, output_folder, backend="dict", report=None):
+    """
+    Function to process a single JSON file and save the result.
+    Returns the number of records saved, or None if the file was skipped.
+    Validation issues are counted in `report` under the file name (the spider name), and summarised in the log.
+    """
     json_file_name = os.path.basename(json_file_path)
     
     try:
         data = load_json(json_file_path)
         
         if isinstance(data, list):
-            processed_data = data_processing_pipeline(data)
+            spider = os.path.splitext(json_file_name)[0]
+            record_hashes = []
+            processed_data = data_processing_pipeline(data, backend=backend, report=report, spider=spider, record_hashes=record_hashes)
+            if report is not None:
+                report.log_summary(spider)
             
-            save_json(processed_data, json_file_name, output_folder)
+            save_json(processed_data, json_file_name, output_folder, record_hashes)
+            return len(processed_data)
         else:
             logging.warning(f"Invalid JSON format in {json_file_name}, skipping file.")
             return
@@ -476,19 +514,117 @@ def process_json_file(json_file_path, output_folder):
         logging.error(f"An error occurred while processing {json_file_name}: {str(e)}")
         raise e
 
-def process_all_json_files(input_folder, output_folder):
+def process_json_file_with_result(json_file_path, output_folder, backend="dict", report=None):
+    """
+    Processes a single JSON file (see process_json_file) and never raises.
+
+    Returns:
+        dict: `file`, `status` ('processed', 'skipped' or 'failed'), `records` (number saved), `seconds` and `error`.
+    """
+    start = time.perf_counter()
+    result = {"file": os.path.basename(json_file_path), "status": "processed", "records": None, "seconds": None, "error": None}
+    try:
+        result["records"] = process_json_file(json_file_path, output_folder, backend, report)
+        if result["records"] is None:
+            result["status"] = "skipped"
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+class LogCollector(logging.Handler):
+    """Keeps the log records emitted in a worker process, so that the parent can replay them in file order."""
+    FIELDS = ("name", "levelno", "levelname", "pathname", "filename", "module", "lineno", "funcName", "created", "msecs", "process", "processName")
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # Only the fields used by formatters are kept (rebuilt with logging.makeLogRecord), the message is formatted now
+        fields = {field: getattr(record, field) for field in self.FIELDS}
+        fields["msg"] = record.getMessage()
+        if record.exc_info:
+            fields["exc_text"] = logging.Formatter().formatException(record.exc_info)
+        self.records.append(fields)
+
+def process_json_file_in_worker(json_file_path, output_folder, backend="dict", samples_per_rule=SAMPLES_PER_RULE):
+    """
+    Runs process_json_file_with_result in a pool worker.
+    Returns its result, the log records it emitted, and its validation report (as a dict, merged by the parent).
+    """
+    collector = LogCollector()
+    # The worker doesn't write to the handlers inherited from the parent (e.g. process_data.log), the parent replays the records
+    logging.getLogger().handlers = [collector]
+    report = ValidationReport(samples_per_rule)
+    result = process_json_file_with_result(json_file_path, output_folder, backend, report)
+    return result, collector.records, report.to_dict()
+
+def process_all_json_files(input_folder, output_folder, workers=0, backend="dict", report=None):
     """
     Processes all JSON files in the input folder individually.
     Each file is processed using the pipeline and then saved to the output folder.
+    A file that fails is reported and doesn't stop the other files.
+
+    Args:
+        input_folder (str): Folder of the spiders output.
+        output_folder (str): Folder the clean files are saved to.
+        workers (int): Number of processes to spread the files over. 0 or 1 processes the files one by one in this process.
+            The log records of the workers are written by this process, in file order.
+        backend (str): 'dict' or 'pandas' (see data_processing_pipeline).
+        report (ValidationReport): Collects the validation issues of all files (a new one if not given).
+            It is written to logs/validation_reports/ at the end, its path is kept in `report.path`.
+
+    Returns:
+        list: The result of each file, in file order (see process_json_file_with_result).
     """
     if not os.path.exists(input_folder):
         logging.error(f"The folder '{input_folder}' does not exist.")
         return
 
-    for json_file in os.listdir(input_folder):
-        if json_file.endswith('.json'):
-            json_file_path = os.path.join(input_folder, json_file)
-            process_json_file(json_file_path, output_folder)
+    json_file_paths = [
+        os.path.join(input_folder, json_file)
+        for json_file in sorted(os.listdir(input_folder))
+        if json_file.endswith('.json')
+    ]
+
+    if report is None:
+        report = ValidationReport()
+    start = time.perf_counter()
+    results = []
+    use_pool = bool(workers and workers > 1 and len(json_file_paths) > 1)
+    if use_pool:
+        load_org_mapping()  # cached before forking, so the workers don't each read it
+        # fork: the workers inherit the loaded module instead of re-importing it (which would truncate process_data.log)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+            futures = [executor.submit(process_json_file_in_worker, path, output_folder, backend, report.samples_per_rule) for path in json_file_paths]
+            for json_file_path, future in zip(json_file_paths, futures):
+                try:
+                    result, log_records, file_report = future.result()
+                    report.merge(file_report)
+                except Exception as e:  # e.g. the worker process died
+                    result, log_records = {"file": os.path.basename(json_file_path), "status": "failed", "records": None, "seconds": None, "error": str(e)}, []
+                for fields in log_records:
+                    logging.getLogger(fields["name"]).handle(logging.makeLogRecord(fields))
+                results.append(result)
+    else:
+        for json_file_path in json_file_paths:
+            results.append(process_json_file_with_result(json_file_path, output_folder, backend, report))
+
+    for result in results:
+        message = f"{result['file']}: {result['status']}, {result['records']} records in {result['seconds']}s"
+        if result["status"] == "failed":
+            logging.error(f"{message} ({result['error']})")
+        else:
+            logging.info(message)
+    failed = [result["file"] for result in results if result["status"] == "failed"]
+    logging.info(f"Processed {len(results)} files in {time.perf_counter() - start:.2f}s with {workers if use_pool else 1} worker(s), {len(failed)} failed: {failed}")
+
+    report.path = report.write()
+    logging.info(f"Validation report ({report.total_issues()} issues) written to {report.path}")
+    REF_DATA.log_stats()
+    return results
 
 if __name__ == "__main__":
     input_folder = 'data/spiders_output'
@@ -1,4 +1,3 @@
-import json
 import os
 import shutil
 import logging
@@ -8,12 +7,22 @@ import argparse
 from scrapy.crawler import CrawlerProcess
 from scrapy.utils.project import get_project_settings
 from scrapy.spiderloader import SpiderLoader
+from scrapy import signals
+from itemadapter import ItemAdapter
 import inspect
 import sys
+import multiprocessing
+import queue
+import time
+from collections import deque
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
 from directory_scraper.path_config import DEFAULT_SPIDERS_OUTPUT_FOLDER, DEFAULT_LOG_DIR, DEFAULT_BACKUP_FOLDER
 from directory_scraper.src.utils.discord_bot import send_discord_notification
-from threading import Timer
+from directory_scraper.src.utils import json_codec
+from directory_scraper.handlers import get_blocking_metrics, get_request_counts
+from directory_scraper.browser import get_browser_metrics
+from directory_scraper.src.data_processing.spider_history import append_run, get_spider_budgets
+from directory_scraper.src.data_processing.spider_scheduler import MAX_PLAYWRIGHT_SPIDERS, next_spider, plan_run
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -48,6 +57,10 @@ success_count = 0
 fail_count = 0
 success_spiders, fail_spiders, timed_out_spiders = set(), set(), set()
 total_items_scraped = 0
+run_id = None  # start time of the current run, shared by all its records in the spider history
+
+WORKER_GRACE_PERIOD = 180  # seconds a --workers subprocess gets past its timeout before it is killed
+DEADLINE_GRACE_PERIOD = 120  # seconds spiders get to close after their deadline before they are given up on
 
 def setup_folders():
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
@@ -98,7 +111,8 @@ def setup_output_folder(folder_path, spider_names):
     """
     - Prepares the output folder for storing spider results.
     - Creates the output folder if it doesn't exist.
-    - Deletes any files or directories in the folder that match the spider names.
+    - Deletes any files or directories in the folder that match the spider names
+      (including `.tmp` and `.partial` files left by unfinished or timed-out runs).
 
     Args:
     folder_path (str): The path to the folder where spider output will be stored.
@@ -109,7 +123,7 @@ def setup_output_folder(folder_path, spider_names):
     else:
         for f in os.listdir(folder_path):
             file_path = os.path.join(folder_path, f)
-            file_name, file_ext = os.path.splitext(f)
+            file_name, file_ext = os.path.splitext(f.removesuffix(".tmp").removesuffix(".partial"))
             try:
                 if file_name in spider_names and os.path.isfile(file_path):
                     os.remove(file_path)
@@ -157,13 +171,14 @@ def backup_spider_outputs(output_folder, spider_names, backup_folder, max_backup
                     os.remove(os.path.join(spider_backup_folder, backup))
                     logger.info(f"Removed old backup: {backup}")
 
-def setup_crawler(spiders):
+def setup_crawler(spiders, log_file=LOG_FILE_PATH):
     """
     Sets up and configures the Scrapy crawler with custom settings.
     Configures retry attempts, timeouts, logging, and integrates custom pipelines.
 
     Args:
     spiders (list): List of spiders for crawling.
+    log_file (str): File Scrapy writes its logs to (defaults to LOG_FILE_PATH).
 
     Returns:
     CrawlerProcess: A Scrapy CrawlerProcess instance with configured settings.
@@ -173,7 +188,7 @@ def setup_crawler(spiders):
     settings.set('RETRY_TIMES', 3)
     settings.set('DOWNLOAD_TIMEOUT', 60)
     settings.set('DOWNLOAD_DELAY', 1)
-    settings.set('LOG_FILE', LOG_FILE_PATH)
+    settings.set('LOG_FILE', log_file)
     settings.set('LOG_LEVEL', 'INFO')
 
     set_playwright_settings(settings, spiders)
@@ -183,35 +198,85 @@ def setup_crawler(spiders):
 
 def set_playwright_settings(settings, spiders):
     """
-    If any spider has Playwright enabled, the function sets the Playwright 
-    to run in headless mode (True).
+    Logs which spiders need Playwright (spiders declaring `playwright_enabled = True`), 
+    and sets Playwright to run in headless mode (True) if any of them is in the run.
+    Chromium itself is only launched on the first Playwright request (see directory_scraper/browser.py),
+    so runs without Playwright spiders never start a browser.
 
     Args:
     settings (Settings): Scrapy settings object to configure.
     spiders (list): List of spider names (to check for Playwright support)
     """
-    spider_loader = SpiderLoader.from_settings(settings)
-    for spider_name in spiders:
-        spider_cls = spider_loader.load(spider_name)
-        if hasattr(spider_cls, 'playwright_enabled') and spider_cls.playwright_enabled:
-            settings.set('PLAYWRIGHT_LAUNCH_OPTIONS', {"headless": True})
-            logger.info(f"Playwright detected for spider '{spider_name}', forcing headless mode.")
-            break
+    playwright_spiders = get_playwright_spiders(spiders, SpiderLoader.from_settings(settings))
+    if playwright_spiders:
+        launch_options = {**settings.getdict('PLAYWRIGHT_LAUNCH_OPTIONS'), "headless": True}
+        settings.set('PLAYWRIGHT_LAUNCH_OPTIONS', launch_options)
+        logger.info(f"Playwright detected for spiders {playwright_spiders}, forcing headless mode.")
+    else:
+        logger.info("No Playwright spiders in this run, Chromium will not be started.")
+
+def get_playwright_spiders(spiders, spider_loader):
+    """Returns the spiders (by name) that declare `playwright_enabled = True`."""
+    all_spiders = spider_loader.list()
+    return [
+        spider_name for spider_name in spiders
+        if spider_name in all_spiders and getattr(spider_loader.load(spider_name), 'playwright_enabled', False)
+    ]
+
+class JsonArrayWriter:
+    """
+    Writes items to a JSON array file as they arrive, so a spider's items are never all held in memory.
+    The output is in the ROWS layout of json_codec (one compact item per line), like compiled.json.
+
+    Items are written to `<path>.tmp`, which is only renamed (atomically) to `path` by `commit()`,
+    so other steps never read a half-written file. `keep_partial()` moves it to `<path>.partial` instead.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.count = 0
+        self.file = open(self.tmp_path, "wb")
+        self.file.write(b"[\n")
+
+    def write(self, item):
+        self.file.write((b",\n" if self.count else b"") + json_codec.dumps(item))
+        self.count += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.write(b"\n]" if self.count else b"]")
+            self.file.close()
+
+    def commit(self):
+        self.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def keep_partial(self):
+        self.close()
+        partial_path = f"{self.path}.partial"
+        os.replace(self.tmp_path, partial_path)
+        return partial_path
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
 
 class RunSpiderPipeline:
     """
     Pipeline to collect and store the results when a spider crawls website.
 
     Attributes:
-        results (dict): Stores scraped items for each spider.
+        writers (dict): Streams the scraped items of each spider to its output file (see JsonArrayWriter).
 
     Methods:
-        open_spider(spider): Initializes results for the spider and logs its start.
-        process_item(item, spider): Appends scraped items to the spider's results.
-        close_spider(spider): Writes results to a JSON file if data was collected, or logs a failure.
+        open_spider(spider): Opens the spider's output file and logs its start.
+        process_item(item, spider): Appends the item to the spider's output file.
+        close_spider(spider): Publishes the output file if data was collected, keeps it as `.partial` on timeout, or logs a failure.
     """
     def __init__(self, output_folder):
-        self.results = {}
+        self.writers = {}
         self.output_folder = output_folder
 
     @classmethod
@@ -223,11 +288,11 @@ class RunSpiderPipeline:
     def open_spider(self, spider):
         self.start_time = datetime.now()
         global success_count, fail_count, success_spiders, fail_spiders, timed_out_spiders
-        self.results[spider.name] = []
+        self.writers[spider.name] = JsonArrayWriter(os.path.join(self.output_folder, f"{spider.name}.json"))
         logger.info(f"Running spider '{spider.name}' ...")
 
     def process_item(self, item, spider):
-        self.results[spider.name].append(item)
+        self.writers[spider.name].write(ItemAdapter(item).asdict())
         return item
 
     def close_spider(self, spider):
@@ -238,56 +303,174 @@ class RunSpiderPipeline:
         logger.info(f"Finished spider '{spider.name}'. Duration: {duration}")
 
         item_count = spider.crawler.stats.get_value('item_scraped_count', 0)
+        request_counts = get_request_counts(spider.crawler.stats)
+        logger.info(f"Spider '{spider.name}' requests: {request_counts['http_requests']} via HTTP, {request_counts['playwright_requests']} via Playwright.")
 
         datetime_created = end_time.isoformat()
 
         spider_run_data = {
+            "run_id": run_id,
             "spider_name": spider.name,
             "total_records": item_count,
             "duration": str(duration),
-            "datetime_created": datetime_created
+            "datetime_created": datetime_created,
+            "timed_out": spider.name in timed_out_spiders,
+            **request_counts,
+            **get_browser_metrics(spider.crawler.stats),
+            **get_blocking_metrics(spider.crawler.stats)
         }
 
-        summary_file = os.path.join(LOG_DIR, f"spider_summary.json")
-
-        if os.path.exists(summary_file):
-            try:
-                with open(summary_file, "r") as f:
-                    existing_data = json.load(f)
-            except json.JSONDecodeError:
-                existing_data = []
-        else:
-            existing_data = []
-
-        existing_data.append(spider_run_data)
-        with open(summary_file, "w") as f:
-            json.dump(existing_data, f, indent=4)
+        append_run(spider_run_data)
 
+        writer = self.writers.pop(spider.name)
         if spider.name in timed_out_spiders:
-            # Ensure timed-out spiders are not processed further
-            logger.warning(f"Spider '{spider.name}' was previously timed out. No data saved.")
-            f"🟢 Spider '{spider.name}' timed out. Scraped {item_count} records. [Duration: {duration}]"
+            # Ensure timed-out spiders are not processed further: their partial output is kept aside for inspection only
+            if writer.count:
+                partial_file = writer.keep_partial()
+                logger.warning(f"Spider '{spider.name}' was previously timed out after scraping {item_count} records. Partial data kept in {partial_file}.")
+            else:
+                writer.discard()
+                logger.warning(f"Spider '{spider.name}' was previously timed out. No data saved.")
             if DISCORD_WEBHOOK_URL:
-                send_discord_notification(f"🟡 Spider '{spider.name}' timed out. Scraped {item_count} records. [Duration: {duration}] (no data saved)", DISCORD_WEBHOOK_URL, THREAD_ID)
+                send_discord_notification(f"🟡 Spider '{spider.name}' timed out. Scraped {item_count} records. [Duration: {duration}] (partial data not published)", DISCORD_WEBHOOK_URL, THREAD_ID)
             return
 
-        if self.results[spider.name]: # Spider successful
+        if writer.count: # Spider successful
             total_items_scraped += item_count # sum only if successful
-            output_file = os.path.join(self.output_folder, f"{spider.name}.json")
-            with open(output_file, 'w') as f:
-                json.dump(self.results[spider.name], f, indent=4)
+            writer.commit()
             success_spiders.add(spider.name)
             logger.info(f"Spider '{spider.name}' finished successfully.")
             print(f"🟢 Spider '{spider.name}' finished successfully. Scraped {item_count} records. [Duration: {duration}]")
             if DISCORD_WEBHOOK_URL:
                 send_discord_notification(f"🟢 Spider '{spider.name}' finished successfully. Scraped {item_count} records. [Duration: {duration}]", DISCORD_WEBHOOK_URL, THREAD_ID)
         else: # Spider failed
+            writer.discard()
             fail_spiders.add(spider.name)
             logger.warning(f"Spider '{spider.name}' finished without results.")
             print(f"🔴 Spider '{spider.name}' finished without results. Scraped {item_count} records. [Duration: {duration}]")
             if DISCORD_WEBHOOK_URL:
                 send_discord_notification(f"🔴 Spider '{spider.name}' finished without results. Scraped {item_count} records. [Duration: {duration}]", DISCORD_WEBHOOK_URL, THREAD_ID)
 
+class SpiderDeadline:
+    """
+    Closes one spider once its time budget (seconds since the spider opened) is spent.
+
+    The deadline is a `reactor.callLater` on the crawl's reactor, and only the overrunning spider is
+    closed (through `crawler.engine.close_spider`), the other spiders in the process keep running.
+    The spider goes through the normal close path, so its partial item count and duration are still recorded.
+    If it hasn't closed DEADLINE_GRACE_PERIOD seconds later, `on_stuck(spider_name)` is called.
+    """
+    def __init__(self, crawler, budget, on_stuck):
+        self.crawler = crawler
+        self.budget = budget
+        self.on_stuck = on_stuck
+        self.call = None
+        crawler.signals.connect(self.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    def spider_opened(self, spider):
+        from twisted.internet import reactor
+        self.call = reactor.callLater(self.budget, self.expire, spider)
+
+    def spider_closed(self, spider):
+        if self.call is not None and self.call.active():
+            self.call.cancel()
+
+    def expire(self, spider):
+        from twisted.internet import reactor
+        item_count = self.crawler.stats.get_value('item_scraped_count', 0)
+        print(f"Spider '{spider.name}' reached its deadline ({self.budget} seconds) with {item_count} records. Closing it.")
+        logger.error(f"Spider '{spider.name}' reached its deadline ({self.budget} seconds) with {item_count} records. Closing it.")
+        if DISCORD_WEBHOOK_URL:
+            send_discord_notification(f"Spider '{spider.name}' reached its deadline ({self.budget} seconds)", DISCORD_WEBHOOK_URL, THREAD_ID)
+        timed_out_spiders.add(spider.name)
+        fail_spiders.add(spider.name)  # Mark as failed
+        self.crawler.engine.close_spider(spider, "deadline_exceeded")
+        self.call = reactor.callLater(DEADLINE_GRACE_PERIOD, self.on_stuck, spider.name)
+
+def crawl_spiders(spider_names, output_folder, timeout, log_file=LOG_FILE_PATH, max_playwright=MAX_PLAYWRIGHT_SPIDERS):
+    """
+    Runs one crawl attempt of `spider_names` in a single CrawlerProcess.
+
+    - Spiders start longest first (by past durations, see spider_scheduler.py), and at most `max_playwright`
+      Playwright spiders run at the same time. The next spider starts as soon as a slot is free.
+    - Each spider is closed on its own deadline (see `SpiderDeadline`), with budgets from past runs capped at `timeout`.
+    - Outcomes are recorded in the global success/fail/timed out sets.
+
+    Args:
+        spider_names (list): List of spider names to run.
+        output_folder (str): Path to the output folder for spider results.
+        timeout (int): Maximum time (in seconds) for any spider.
+        log_file (str): File Scrapy writes its logs to.
+        max_playwright (int): Maximum number of Playwright spiders running at the same time.
+    """
+    spider_loader = SpiderLoader.from_settings(get_project_settings())
+    all_spiders = spider_loader.list()
+
+    process = setup_crawler(spider_names, log_file=log_file)
+    process.settings.set('ITEM_PIPELINES', {'directory_scraper.src.data_processing.run_spiders.RunSpiderPipeline': 1})
+    process.settings.set('OUTPUT_FOLDER', output_folder)
+
+    for spider_name in spider_names:
+        if spider_name not in all_spiders:
+            logger.warning(f"Spider '{spider_name}' not found. Skipping...")
+            fail_spiders.add(spider_name)
+    spider_names = [spider_name for spider_name in spider_names if spider_name in all_spiders]
+
+    playwright_spiders = set(get_playwright_spiders(spider_names, spider_loader))
+    budgets = get_spider_budgets(spider_names, timeout)
+    plan = plan_run(spider_names, playwright_spiders, max_playwright=max_playwright)
+    if len(spider_names) > 1:
+        logger.info(f"Spider order (longest first): {plan['order']}. Predicted duration: {plan['predicted_seconds']:.0f} seconds.")
+        print(f"Predicted duration: {plan['predicted_seconds']:.0f} seconds (at most {max_playwright} Playwright spiders at a time).")
+
+    pending = list(plan["order"])
+    running = set()
+    deadlines = []
+
+    def stop_reactor():
+        from twisted.internet import reactor
+        if reactor.running:
+            reactor.stop()
+
+    def start_next_spiders():
+        while (spider_name := next_spider(pending, running, playwright_spiders, max_playwright)) is not None:
+            pending.remove(spider_name)
+            try:
+                crawler = process.create_crawler(spider_loader.load(spider_name))
+                deadlines.append(SpiderDeadline(crawler, budgets[spider_name], on_stuck=give_up_on_spider))
+                running.add(spider_name)
+                logger.info(f"Starting spider '{spider_name}' (time budget: {budgets[spider_name]} seconds).")
+                process.crawl(crawler).addBoth(crawl_finished, spider_name)
+            except Exception as e:
+                logger.error(f"Error while setting up spider '{spider_name}': {e}")
+                fail_spiders.add(spider_name)
+                running.discard(spider_name)
+        if not running:
+            stop_reactor()
+
+    def crawl_finished(result, spider_name):
+        if result is not None:  # a Failure
+            logger.error(f"Error during crawling of spider '{spider_name}': {result.getErrorMessage()}")
+            fail_spiders.add(spider_name)
+        if spider_name in running:
+            running.discard(spider_name)
+            start_next_spiders()
+
+    def give_up_on_spider(spider_name):
+        # The spider didn't close after its deadline (e.g. a request or callback that never returns), stop waiting for it
+        print(f"Spider '{spider_name}' did not close {DEADLINE_GRACE_PERIOD} seconds after its deadline. Giving up on it.")
+        logger.error(f"Spider '{spider_name}' did not close {DEADLINE_GRACE_PERIOD} seconds after its deadline. Giving up on it.")
+        crawl_finished(None, spider_name)
+
+    try:
+        start_next_spiders()
+        if running:
+            process.start(stop_after_crawl=False)  # The reactor is stopped once the last spider is done
+    except Exception as e:
+        logger.error(f"Error during crawling: {e}")
+        fail_spiders.update(running - success_spiders)  # If the process fails, all remaining are considered failed
+
 def run_spiders(spider_list, output_folder, backup_folder, max_retries=0, timeout=900): # timeout (seconds)
     """
     Run spiders with retry logic for failures and enforce a timeout for all spiders.
@@ -297,16 +480,15 @@ def run_spiders(spider_list, output_folder, backup_folder, max_retries=0, timeou
         output_folder (str): Path to the output folder for spider results.
         backup_folder (str): Path to the folder for backing up spider outputs.
         max_retries (int): Maximum number of retry attempts for failed spiders.
-        timeout (int): Maximum time (in seconds) for the entire process.
+        timeout (int): Maximum time (in seconds) for each spider.
     """
-    global success_count, fail_count, success_spiders, fail_spiders, timed_out_spiders, total_items_scraped
+    global success_count, fail_count, success_spiders, fail_spiders, timed_out_spiders, total_items_scraped, run_id
     success_count, fail_count = 0, 0
+    run_id = datetime.now().isoformat(timespec="seconds")
     success_spiders, fail_spiders, timed_out_spiders = set(), set(), set()
 
     retries = 0
     remaining_spiders = spider_list
-    spider_loader = SpiderLoader.from_settings(get_project_settings())
-    all_spiders = spider_loader.list()
 
     # backup_spider_outputs(output_folder=output_folder, spider_names=remaining_spiders, backup_folder=backup_folder)
     setup_output_folder(folder_path=output_folder, spider_names=remaining_spiders)
@@ -315,59 +497,7 @@ def run_spiders(spider_list, output_folder, backup_folder, max_retries=0, timeou
         logger.info(f"\nRunning attempt {retries + 1} with {len(remaining_spiders)} spiders: {remaining_spiders}")
         print(f"\nRunning attempt {retries + 1} with {len(remaining_spiders)} spiders: {remaining_spiders}")
 
-        process = setup_crawler(remaining_spiders)
-        process.settings.set('ITEM_PIPELINES', {'directory_scraper.src.data_processing.run_spiders.RunSpiderPipeline': 1})
-        process.settings.set('OUTPUT_FOLDER', output_folder)
-        process.settings.set('CLOSESPIDER_TIMEOUT', timeout)  # spider timeout
-        process.settings.set('DOWNLOAD_TIMEOUT', timeout)  # spider's per-request timeout
-
-        spiders_to_time_out = set(remaining_spiders)  # Track all spiders for timeout
-
-        def timeout_handler():
-            nonlocal spiders_to_time_out
-            still_running = spiders_to_time_out - success_spiders - fail_spiders 
-            if still_running:
-                print(f"Timeout reached ({timeout} seconds). Stopping these spiders: {still_running}")
-                logger.error(f"Timeout reached ({timeout} seconds). Stopping these spiders: {still_running}")
-                if DISCORD_WEBHOOK_URL:
-                    send_discord_notification(f"Timeout reached ({timeout} seconds)", DISCORD_WEBHOOK_URL, THREAD_ID)
-                timed_out_spiders.update(still_running)
-
-                # Manually invoke close_spider for timed-out spiders
-                for spider_name in still_running:
-                    logger.warning(f"Manually closing spider '{spider_name}' due to timeout.")
-                    fail_spiders.add(spider_name)  # Mark as failed
-                    # if DISCORD_WEBHOOK_URL:
-                    #     send_discord_notification(f"⏳ Spider '{spider_name}' timed out.", DISCORD_WEBHOOK_URL, THREAD_ID)
-
-                process.stop()
-
-        timer = Timer(timeout, timeout_handler)
-        try:
-            timer.start()
-            for spider_name in remaining_spiders:
-                if spider_name in all_spiders:
-                    try:
-                        spider_cls = spider_loader.load(spider_name)
-                        process.crawl(spider_cls)
-                    except Exception as e:
-                        logger.error(f"Error while setting up spider '{spider_name}': {e}")
-                        fail_spiders.add(spider_name)
-                        spiders_to_time_out.discard(spider_name)
-                else:
-                    logger.warning(f"Spider '{spider_name}' not found. Skipping...")
-                    fail_spiders.add(spider_name)
-                    spiders_to_time_out.discard(spider_name)
-
-            process.start()  # Runs all spiders concurrently
-        except Exception as e:
-            logger.error(f"Error during crawling: {e}")
-            fail_spiders.update(spiders_to_time_out)  # If the process fails, all remaining are considered failed
-        finally:
-            timer.cancel()  # Cancel the timer after process ends
-
-        # Clean up spiders_to_time_out
-        spiders_to_time_out.difference_update(success_spiders, fail_spiders)
+        crawl_spiders(remaining_spiders, output_folder, timeout)
 
         # Update remaining spiders
         remaining_spiders = [spider for spider in remaining_spiders if spider not in success_spiders and spider not in timed_out_spiders]
@@ -387,6 +517,10 @@ def run_spiders(spider_list, output_folder, backup_folder, max_retries=0, timeou
     else:
         logger.info("All spiders ran successfully.")
 
+    report_run_summary()
+
+def report_run_summary():
+    """Prints (and sends to Discord) the final successful / failed / timed out spiders of the run."""
     fail_spiders.difference_update(success_spiders, timed_out_spiders)  # Remove successful and timeout spiders from failures list
     print(f"\nTotal records scraped by successful spiders: {total_items_scraped}")
     print(f"\n✅ SUCCESSFUL: {len(success_spiders)} spiders. Spiders: {list(success_spiders)}")
@@ -402,6 +536,166 @@ def run_spiders(spider_list, output_folder, backup_folder, max_retries=0, timeou
         if timed_out_spiders:
             send_discord_notification(f"⏳ TIMED OUT: {len(timed_out_spiders)} spiders. Spiders: {list(timed_out_spiders)}", DISCORD_WEBHOOK_URL, THREAD_ID)
 
+#========= WORKER MODE (--workers N): one subprocess per spider ===============
+
+def get_worker_log_path(spider_name):
+    return os.path.join(LOG_DIR, f"run_spiders_{spider_name}.log")
+
+def run_spider_worker(spider_name, output_folder, timeout, result_queue):
+    """
+    Entry point of a `--workers` subprocess: crawls a single spider in its own reactor and
+    puts its outcome on `result_queue` for the parent to collect.
+    Scrapy logs go to a per-spider log file, which the parent appends to LOG_FILE_PATH once the worker exits.
+    """
+    global success_spiders, fail_spiders, timed_out_spiders, total_items_scraped
+    success_spiders, fail_spiders, timed_out_spiders = set(), set(), set()
+    total_items_scraped = 0
+
+    # The forked logger still points at the parent's log file
+    logger.removeHandler(file_handler)
+
+    crawl_spiders([spider_name], output_folder, timeout, log_file=get_worker_log_path(spider_name))
+
+    if spider_name in success_spiders:
+        status = "success"
+    elif spider_name in timed_out_spiders:
+        status = "timed_out"
+    else:
+        status = "failed"
+    result_queue.put({
+        "spider_name": spider_name,
+        "status": status,
+        "item_count": total_items_scraped,
+    })
+
+def collect_worker_log(spider_name):
+    """Appends a finished worker's log to the main log file and removes it."""
+    worker_log_path = get_worker_log_path(spider_name)
+    if not os.path.exists(worker_log_path):
+        return
+    with open(worker_log_path, "r") as infile, open(LOG_FILE_PATH, "a") as outfile:
+        shutil.copyfileobj(infile, outfile)
+    os.remove(worker_log_path)
+
+def stop_worker(process):
+    process.terminate()
+    process.join(10)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+def run_spiders_in_workers(spider_list, output_folder, backup_folder, workers, max_retries=0, timeout=900): # timeout (seconds)
+    """
+    Run each spider in its own subprocess, with at most `workers` subprocesses running at a time.
+
+    Every spider gets a fresh Twisted reactor, so a slow spider only occupies its own worker and a
+    failed spider can really be retried (a reactor can't be restarted within one process).
+    Spiders start longest first, with at most MAX_PLAYWRIGHT_SPIDERS Playwright spiders at a time (see spider_scheduler.py).
+    Each worker stops its spider after `timeout` seconds, and is killed if it is still alive
+    WORKER_GRACE_PERIOD seconds later. Outcomes and logs are collected here.
+
+    Args:
+        spider_list (list): List of spider names to run.
+        output_folder (str): Path to the output folder for spider results.
+        backup_folder (str): Path to the folder for backing up spider outputs.
+        workers (int): Maximum number of spiders running at the same time.
+        max_retries (int): Maximum number of retry attempts for failed spiders.
+        timeout (int): Maximum time (in seconds) for each spider.
+    """
+    global success_count, fail_count, success_spiders, fail_spiders, timed_out_spiders, total_items_scraped, run_id
+    success_count, fail_count = 0, 0
+    run_id = datetime.now().isoformat(timespec="seconds")
+    success_spiders, fail_spiders, timed_out_spiders = set(), set(), set()
+
+    all_spiders = get_all_spiders()
+    setup_output_folder(folder_path=output_folder, spider_names=spider_list)
+
+    pending = deque()
+    for spider_name in spider_list:
+        if spider_name in all_spiders:
+            pending.append(spider_name)
+        else:
+            logger.warning(f"Spider '{spider_name}' not found. Skipping...")
+            fail_spiders.add(spider_name)
+
+    playwright_spiders = set(get_playwright_spiders(pending, SpiderLoader.from_settings(get_project_settings())))
+    plan = plan_run(list(pending), playwright_spiders, workers=workers)
+    pending = deque(plan["order"])
+
+    # Fork, so workers don't re-import this module (and truncate the log file); no reactor exists in this process yet
+    context = multiprocessing.get_context("fork")
+    result_queue = context.Queue()
+    attempts = {spider_name: 0 for spider_name in pending}
+    running = {}  # spider name -> (process, deadline)
+    results = {}
+
+    logger.info(f"Running {len(pending)} spiders with {workers} workers, longest first: {list(pending)}")
+    logger.info(f"Predicted duration: {plan['predicted_seconds']:.0f} seconds (at most {MAX_PLAYWRIGHT_SPIDERS} Playwright spiders at a time).")
+    print(f"Running {len(pending)} spiders with {workers} workers, longest first: {list(pending)}")
+    print(f"Predicted duration: {plan['predicted_seconds']:.0f} seconds (at most {MAX_PLAYWRIGHT_SPIDERS} Playwright spiders at a time).")
+
+    def collect_results(wait=0):
+        while True:
+            try:
+                result = result_queue.get(timeout=wait) if wait else result_queue.get_nowait()
+            except queue.Empty:
+                return
+            results[result["spider_name"]] = result
+            wait = 0
+
+    while pending or running:
+        while len(running) < workers:
+            spider_name = next_spider(pending, running, playwright_spiders)
+            if spider_name is None:
+                break
+            pending.remove(spider_name)
+            attempts[spider_name] += 1
+            process = context.Process(target=run_spider_worker, args=(spider_name, output_folder, timeout, result_queue), name=f"spider-{spider_name}")
+            process.start()
+            running[spider_name] = (process, time.monotonic() + timeout + WORKER_GRACE_PERIOD)
+            logger.info(f"Started worker for spider '{spider_name}' (attempt {attempts[spider_name]}, pid {process.pid}).")
+
+        collect_results(wait=1)
+
+        for spider_name, (process, deadline) in list(running.items()):
+            if process.is_alive() and time.monotonic() > deadline:
+                logger.error(f"Worker for spider '{spider_name}' did not stop after {timeout} seconds. Killing it.")
+                stop_worker(process)
+                results.setdefault(spider_name, {"spider_name": spider_name, "status": "timed_out", "item_count": 0})
+            if process.is_alive():
+                continue
+
+            process.join()
+            del running[spider_name]
+            collect_results()  # The result may arrive after the process is seen as exited
+            collect_worker_log(spider_name)
+            result = results.pop(spider_name, None) or {"spider_name": spider_name, "status": "failed", "item_count": 0}
+            if result["status"] == "failed" and process.exitcode:
+                logger.error(f"Worker for spider '{spider_name}' exited with code {process.exitcode}.")
+
+            if result["status"] == "success":
+                success_spiders.add(spider_name)
+                total_items_scraped += result["item_count"]
+            elif result["status"] == "timed_out":
+                timed_out_spiders.add(spider_name)
+            elif attempts[spider_name] <= max_retries:
+                logger.info(f"Retrying spider '{spider_name}' (attempt {attempts[spider_name] + 1}).")
+                pending.append(spider_name)
+            else:
+                fail_spiders.add(spider_name)
+
+    result_queue.close()
+
+    logger.info(f"SUCCESSFUL: {len(success_spiders)} spiders. Spiders: {list(success_spiders)}")
+    logger.info(f"FAILED: {len(fail_spiders)} spiders. Spiders: {list(fail_spiders)}")
+    logger.info(f"TIMED OUT: {len(timed_out_spiders)} spiders. Spiders: {list(timed_out_spiders)}")
+    if fail_spiders:
+        logger.error(f"\nSpiders failed after {max_retries} retries: {list(fail_spiders)}")
+    else:
+        logger.info("All spiders ran successfully.")
+
+    report_run_summary()
+
 #========= SPIDER TREE FUNCTIONS based on spiders/ folder hierarchy ===============
 
 def validate_path(spider_tree, *path_parts):
@@ -520,7 +814,7 @@ def validate_extra_args(name, org_name, subcategory, all_spiders):
 
 #========== END OF ARG VALIDATION FUNCTION =============
 
-def main(spider_list=None, output_folder=None, backup_folder=None):
+def main(spider_list=None, output_folder=None, backup_folder=None, workers=0):
 
     global OUTPUT_FOLDER, BACKUP_FOLDER
     OUTPUT_FOLDER = output_folder or OUTPUT_FOLDER
@@ -573,6 +867,9 @@ def main(spider_list=None, output_folder=None, backup_folder=None):
 
         To run a predefined list of spiders:
         python run_spiders.py list
+
+        To run every spider in its own subprocess, 4 at a time:
+        python run_spiders.py ministry --workers 4
         """,
             formatter_class=argparse.RawTextHelpFormatter 
 
@@ -580,8 +877,10 @@ def main(spider_list=None, output_folder=None, backup_folder=None):
         parser.add_argument("name", help="Specify the spider name, category, or use 'all' for all spiders. See above for options.")
         parser.add_argument("org_name", nargs="?", default=None, help="(Optional) Specify the organisation name if applicable. (e.g. 'jpm', or 'mohr')")
         parser.add_argument("subcategory", nargs="?", default=None, help="(Optional) Specify the subcategory if applicable. (e.g 'jabatan', or 'agensi')")
+        parser.add_argument("--workers", type=int, default=0, help="(Optional) Run each spider in its own subprocess, with at most N spiders at a time. (default: all spiders in one process)")
 
         args = parser.parse_args()
+        workers = args.workers
         spider_tree = build_spider_tree()
         all_spiders = get_all_spiders()
         logger.debug(f"Spider tree: {spider_tree}")
@@ -622,8 +921,13 @@ def main(spider_list=None, output_folder=None, backup_folder=None):
     else:
         print("Discord webhook URL not provided. Skipping notifications.")
 
-    run_spiders(spider_list, output_folder=OUTPUT_FOLDER, backup_folder=BACKUP_FOLDER)
+    if workers:
+        run_spiders_in_workers(spider_list, output_folder=OUTPUT_FOLDER, backup_folder=BACKUP_FOLDER, workers=workers)
+    else:
+        run_spiders(spider_list, output_folder=OUTPUT_FOLDER, backup_folder=BACKUP_FOLDER)
     filter_custom_logs()
 
 if __name__ == "__main__":
+    # Go through the importable module, so the pipeline (which Scrapy loads by its dotted path) shares its globals
+    from directory_scraper.src.data_processing.run_spiders import main
     main()
@@ -0,0 +1,183 @@
+"""
+Run history of the spiders: one record per spider per run, appended to `logs/spider_summary.ndjson`
+by RunSpiderPipeline (run_spiders.py).
+
+- Records are only ever appended, one JSON object per line, with a single write per record.
+  Spiders closing at the same time (in one process or in `--workers` subprocesses) never rewrite each other's data.
+- The old `spider_summary.json` (a JSON array rewritten on every spider close) is migrated on first use.
+- Query helpers give the latest run, duration percentiles and trends, and a time budget for each spider.
+"""
+import json
+import math
+import os
+import logging
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from directory_scraper.path_config import DEFAULT_LOG_DIR
+
+logger = logging.getLogger(__name__)
+
+SPIDER_SUMMARY_FILE = os.path.join(DEFAULT_LOG_DIR, "spider_summary.ndjson")
+LEGACY_SPIDER_SUMMARY_FILE = os.path.join(DEFAULT_LOG_DIR, "spider_summary.json")
+
+HISTORY_RUNS = 5  # number of most recent completed runs looked at per spider
+BUDGET_MULTIPLIER = 2  # a spider may take this many times its slowest recent run
+MIN_BUDGET = 120  # seconds
+
+def parse_duration(duration):
+    """
+    Converts a duration written by `str(timedelta)` (e.g. '0:03:12.123456' or '1 day, 0:00:01') to seconds.
+    Returns None if the value can't be parsed.
+    """
+    try:
+        days = 0
+        if "day" in duration:
+            day_part, duration = duration.split(",", 1)
+            days = int(day_part.split()[0])
+        hours, minutes, seconds = duration.strip().split(":")
+        return days * 86400 + int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except (AttributeError, ValueError):
+        return None
+
+#========================= Store ==============================
+
+def migrate_legacy_summary(summary_file=SPIDER_SUMMARY_FILE, legacy_file=LEGACY_SPIDER_SUMMARY_FILE):
+    """
+    Moves the records of the old JSON array file into the NDJSON store (before any newer record),
+    and renames the old file to `<legacy_file>.migrated`. Does nothing if there is no old file.
+    """
+    if not os.path.exists(legacy_file):
+        return
+    try:
+        with open(legacy_file, "r") as f:
+            legacy_records = json.load(f)
+    except json.JSONDecodeError:
+        logger.warning(f"Could not decode '{legacy_file}', it was not migrated.")
+        return
+
+    existing_lines = []
+    if os.path.exists(summary_file):
+        with open(summary_file, "r") as f:
+            existing_lines = f.readlines()
+
+    tmp_file = f"{summary_file}.tmp"
+    with open(tmp_file, "w") as f:
+        for record in legacy_records:
+            f.write(json.dumps(record) + "\n")
+        f.writelines(existing_lines)
+    os.replace(tmp_file, summary_file)
+    os.replace(legacy_file, f"{legacy_file}.migrated")
+    logger.info(f"Migrated {len(legacy_records)} records from '{legacy_file}' to '{summary_file}'.")
+
+def append_run(record, summary_file=SPIDER_SUMMARY_FILE):
+    """Appends one spider run record to the store."""
+    os.makedirs(os.path.dirname(summary_file) or ".", exist_ok=True)
+    line = json.dumps(record) + "\n"
+    # O_APPEND and a single write keep concurrent appends from different processes whole
+    fd = os.open(summary_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+def load_spider_summary(summary_file=SPIDER_SUMMARY_FILE, legacy_file=LEGACY_SPIDER_SUMMARY_FILE):
+    """Loads all run records, oldest first, or an empty list if there is no history. Unreadable lines are skipped."""
+    if legacy_file:
+        migrate_legacy_summary(summary_file, legacy_file)
+    if not os.path.exists(summary_file):
+        return []
+    records = []
+    with open(summary_file, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # e.g. the last line of a run that was killed mid-write
+                logger.warning(f"Skipping unreadable line {line_number} of '{summary_file}'.")
+    return records
+
+#========================= Queries ==============================
+
+def get_latest_run(history):
+    """
+    Returns the records of the most recent run (records sharing the latest `run_id`).
+    Records migrated from the old file have no `run_id`; for those, the latest record of each spider is returned.
+    """
+    run_ids = [record["run_id"] for record in history if record.get("run_id")]
+    if run_ids:
+        latest_run_id = max(run_ids)
+        return [record for record in history if record.get("run_id") == latest_run_id]
+    latest = {}
+    for record in history:
+        latest[record.get("spider_name")] = record
+    return list(latest.values())
+
+def get_past_durations(history, spider_name, last_n=HISTORY_RUNS):
+    """
+    Returns the durations (seconds) of the last `last_n` completed runs of `spider_name`, oldest first.
+    Runs that timed out or scraped nothing are skipped, their duration says nothing about how long the spider needs.
+    """
+    durations = []
+    for entry in history:
+        if entry.get("spider_name") != spider_name or entry.get("timed_out") or not entry.get("total_records"):
+            continue
+        seconds = parse_duration(entry.get("duration"))
+        if seconds is not None:
+            durations.append(seconds)
+    return durations[-last_n:] if last_n else durations
+
+def get_duration_percentiles(history, spider_name, percentiles=(50, 90, 99)):
+    """
+    Returns the given percentiles (nearest-rank) of all completed run durations (seconds) of `spider_name`,
+    e.g. {50: 41.2, 90: 63.0, 99: 70.1}, or an empty dict if the spider has no completed run.
+    """
+    durations = sorted(get_past_durations(history, spider_name, last_n=None))
+    if not durations:
+        return {}
+    return {
+        percentile: durations[max(0, math.ceil(percentile / 100 * len(durations)) - 1)]
+        for percentile in percentiles
+    }
+
+def get_trend(history, spider_name, field="total_records", last_n=HISTORY_RUNS):
+    """
+    Returns how `field` (`duration` or any numeric field, e.g. `total_records`) evolved over the last `last_n` runs of `spider_name`.
+
+    Returns:
+        dict: `values` (oldest first) and `change` (last value minus first value), or None if the spider has no such runs.
+    """
+    values = []
+    for record in history:
+        if record.get("spider_name") != spider_name:
+            continue
+        value = parse_duration(record.get(field)) if field == "duration" else record.get(field)
+        if isinstance(value, (int, float)):
+            values.append(value)
+    values = values[-last_n:]
+    if not values:
+        return None
+    return {"values": values, "change": values[-1] - values[0]}
+
+def get_spider_budgets(spider_names, timeout, history=None):
+    """
+    Returns the time budget (seconds) of each spider: BUDGET_MULTIPLIER times its slowest recent run,
+    at least MIN_BUDGET and never more than `timeout`. Spiders without history get the full `timeout`.
+
+    Args:
+        spider_names (list): Spiders to compute a budget for.
+        timeout (int): Maximum budget (seconds) of any spider.
+        history (list): Run records (loaded from the store if not given).
+    """
+    if history is None:
+        history = load_spider_summary()
+    budgets = {}
+    for spider_name in spider_names:
+        durations = get_past_durations(history, spider_name)
+        if durations:
+            budget = max(MIN_BUDGET, math.ceil(BUDGET_MULTIPLIER * max(durations)))
+            budgets[spider_name] = min(timeout, budget)
+        else:
+            budgets[spider_name] = timeout
+    return budgets
@@ -0,0 +1,81 @@
+"""
+Orders spiders by how long they took in past runs (see spider_history.py), and predicts the wall-clock time of a run.
+
+- Spiders are started longest first, so the slowest spiders don't end up starting last.
+- At most `max_playwright` Playwright spiders run at the same time, the others wait for a free Playwright slot.
+- The same rules are replayed on the estimated durations to predict how long the whole run will take.
+"""
+import statistics
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from directory_scraper.src.data_processing.spider_history import load_spider_summary, get_past_durations
+
+DEFAULT_ESTIMATE = 60  # seconds, for spiders without history when no other spider has any
+MAX_PLAYWRIGHT_SPIDERS = 2
+
+def estimate_durations(spider_names, history=None):
+    """
+    Returns the expected duration (seconds) of each spider: the median of its recent completed runs.
+    Spiders without history are given the median estimate of the spiders that have one.
+    """
+    if history is None:
+        history = load_spider_summary()
+    estimates = {}
+    for spider_name in spider_names:
+        durations = get_past_durations(history, spider_name)
+        if durations:
+            estimates[spider_name] = statistics.median(durations)
+    default = statistics.median(estimates.values()) if estimates else DEFAULT_ESTIMATE
+    return {spider_name: estimates.get(spider_name, default) for spider_name in spider_names}
+
+def next_spider(pending, running, playwright_spiders, max_playwright=MAX_PLAYWRIGHT_SPIDERS):
+    """
+    Returns the first spider of `pending` (ordered longest first) that can start now, or None.
+    Playwright spiders can only start while fewer than `max_playwright` of them are running.
+    """
+    playwright_running = sum(1 for spider_name in running if spider_name in playwright_spiders)
+    for spider_name in pending:
+        if spider_name not in playwright_spiders or playwright_running < max(max_playwright, 1):
+            return spider_name
+    return None
+
+def predict_wall_clock(order, estimates, playwright_spiders, workers=None, max_playwright=MAX_PLAYWRIGHT_SPIDERS):
+    """
+    Replays the scheduling rules on the estimated durations and returns the predicted run time (seconds).
+
+    Args:
+        order (list): Spiders in the order they are started.
+        estimates (dict): Expected duration (seconds) of each spider.
+        playwright_spiders (set): Spiders that use Playwright.
+        workers (int): Maximum number of spiders running at once (None for no limit).
+        max_playwright (int): Maximum number of Playwright spiders running at once.
+    """
+    pending = list(order)
+    running = {}  # spider name -> predicted end time
+    now = 0.0
+    while pending or running:
+        while not workers or len(running) < workers:
+            spider_name = next_spider(pending, running, playwright_spiders, max_playwright)
+            if spider_name is None:
+                break
+            pending.remove(spider_name)
+            running[spider_name] = now + estimates[spider_name]
+        finished = min(running, key=running.get)
+        now = running.pop(finished)
+    return now
+
+def plan_run(spider_names, playwright_spiders, workers=None, max_playwright=MAX_PLAYWRIGHT_SPIDERS, history=None):
+    """
+    Plans a run from the spider history.
+
+    Returns:
+        dict: `order` (spiders, longest first), `estimates` (seconds per spider) and `predicted_seconds` (wall-clock time of the run).
+    """
+    estimates = estimate_durations(spider_names, history=history)
+    order = sorted(spider_names, key=lambda spider_name: estimates[spider_name], reverse=True)
+    return {
+        "order": order,
+        "estimates": estimates,
+        "predicted_seconds": predict_wall_clock(order, estimates, playwright_spiders, workers=workers, max_playwright=max_playwright),
+    }
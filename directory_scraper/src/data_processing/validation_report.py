@@ -0,0 +1,156 @@
+"""
+Validation report of process_data: the issues found while cleaning the spiders output, counted per spider, per field and per rule.
+
+- Only the first `samples_per_rule` records of each (spider, field, rule) are kept as samples.
+- One compact JSON report is written per run to `logs/validation_reports/`.
+- Two reports can be compared (`get_deltas`), e.g. to show in the Discord summary how the data quality changed since the previous run.
+"""
+import json
+import os
+import logging
+import sys
+from datetime import datetime
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from directory_scraper.path_config import DEFAULT_LOG_DIR
+
+VALIDATION_REPORT_DIR = os.path.join(DEFAULT_LOG_DIR, "validation_reports")
+SAMPLES_PER_RULE = 3
+
+# Rules
+MISSING = "missing"                    # required key absent, added with None (or the default value)
+INVALID_TYPE = "invalid_type"          # value converted to the schema type
+UNCONVERTIBLE = "unconvertible"        # value could not be converted, set to None (or the default value)
+NULL_DEFAULT = "null_default"          # None in a non nullable field, set to the default value
+UNMAPPED = "unmapped"                  # org_id not in org_mapping.json
+NOT_ALLOWED = "not_allowed"            # org_type not in ALLOWED_ORG_TYPES
+INVALID_FORMAT = "invalid_format"      # person_email doesn't match EMAIL_REGEX
+UNKNOWN_PATTERN = "unknown_pattern"    # person_phone matched no valid nor invalid pattern, kept
+INVALID_PATTERN = "invalid_pattern"    # person_phone matched an invalid pattern, set to None
+REMOVED = "removed"                    # record removed (person_name is an office or counter)
+
+class ValidationReport:
+    """
+    Collects validation issues. `add` is called once per issue (or once per group of issues with `count`).
+
+    Args:
+        samples_per_rule (int): Number of sample records kept per (spider, field, rule).
+    """
+    def __init__(self, samples_per_rule=SAMPLES_PER_RULE):
+        self.samples_per_rule = samples_per_rule
+        self.path = None  # set once written
+        self.spiders = {}  # spider -> {"records": int, "issues": {field: {rule: count}}, "samples": {field: {rule: [sample]}}}
+
+    def _spider(self, spider):
+        return self.spiders.setdefault(spider, {"records": 0, "issues": {}, "samples": {}})
+
+    def add_records(self, spider, count):
+        """Counts `count` records processed for `spider`."""
+        self._spider(spider)["records"] += count
+
+    def add(self, spider, field, rule, value=None, record=None, count=1):
+        """Counts `count` issues of `rule` on `field`, keeping `record` (and the offending `value`) as a sample if there is room."""
+        rules = self._spider(spider)["issues"].setdefault(field, {})
+        rules[rule] = rules.get(rule, 0) + count
+        if record is not None:
+            self.add_sample(spider, field, rule, value, record)
+
+    def add_sample(self, spider, field, rule, value, record):
+        """Keeps a copy of `record` as a sample of (spider, field, rule), unless there are already `samples_per_rule` of them."""
+        samples = self._spider(spider)["samples"].setdefault(field, {}).setdefault(rule, [])
+        if len(samples) < self.samples_per_rule:
+            samples.append({"value": value, "record": dict(record)})
+
+    def merge(self, other):
+        """Adds the counts and samples of another report (a dict from `to_dict` or a ValidationReport)."""
+        spiders = other.spiders if isinstance(other, ValidationReport) else other["spiders"]
+        for spider, other_entry in spiders.items():
+            entry = self._spider(spider)
+            entry["records"] += other_entry["records"]
+            for field, other_rules in other_entry["issues"].items():
+                rules = entry["issues"].setdefault(field, {})
+                for rule, count in other_rules.items():
+                    rules[rule] = rules.get(rule, 0) + count
+            for field, rules in other_entry["samples"].items():
+                for rule, other_samples in rules.items():
+                    samples = entry["samples"].setdefault(field, {}).setdefault(rule, [])
+                    samples.extend(other_samples[:self.samples_per_rule - len(samples)])
+
+    def total_issues(self, spider=None):
+        spiders = [self.spiders.get(spider, {"issues": {}})] if spider else self.spiders.values()
+        return sum(count for entry in spiders for rules in entry["issues"].values() for count in rules.values())
+
+    def to_dict(self, run_id=None):
+        return {
+            "run_id": run_id,
+            "samples_per_rule": self.samples_per_rule,
+            "total_records": sum(entry["records"] for entry in self.spiders.values()),
+            "total_issues": self.total_issues(),
+            "spiders": self.spiders,
+        }
+
+    def summary_lines(self, spider=None):
+        """One line per (spider, field, rule) with its count, e.g. "kpdn person_phone unknown_pattern: 12"."""
+        lines = []
+        for name, entry in sorted(self.spiders.items()):
+            if spider and name != spider:
+                continue
+            for field, rules in entry["issues"].items():
+                for rule, count in rules.items():
+                    lines.append(f"{name} {field} {rule}: {count}")
+        return lines
+
+    def log_summary(self, spider=None, logger=logging):
+        for line in self.summary_lines(spider):
+            logger.warning(f"Validation: {line}")
+
+    def write(self, report_dir=VALIDATION_REPORT_DIR, run_id=None):
+        """Writes the report as compact JSON to `<report_dir>/validation_report_<run_id>.json` and returns its path."""
+        run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, f"validation_report_{run_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(run_id), f, separators=(",", ":"), default=str)
+        return path
+
+def list_reports(report_dir=VALIDATION_REPORT_DIR):
+    """Paths of the reports in `report_dir`, oldest first."""
+    if not os.path.isdir(report_dir):
+        return []
+    return [os.path.join(report_dir, name) for name in sorted(os.listdir(report_dir)) if name.startswith("validation_report_") and name.endswith(".json")]
+
+def load_report(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_previous_report(current_path, report_dir=VALIDATION_REPORT_DIR):
+    """Returns the report written just before `current_path`, or None if there is none."""
+    earlier = [path for path in list_reports(report_dir) if os.path.basename(path) < os.path.basename(current_path)]
+    return load_report(earlier[-1]) if earlier else None
+
+def get_deltas(current, previous):
+    """
+    Compares two reports (dicts from `to_dict` or loaded from disk).
+
+    Returns:
+        dict: spider -> {"issues": current count, "change": difference with the previous report (None if the spider is new),
+              "rate": issues per record}, sorted by decreasing change.
+    """
+    deltas = {}
+    for spider, entry in current["spiders"].items():
+        issues = sum(count for rules in entry["issues"].values() for count in rules.values())
+        previous_entry = previous["spiders"].get(spider) if previous else None
+        previous_issues = None if previous_entry is None else sum(count for rules in previous_entry["issues"].values() for count in rules.values())
+        deltas[spider] = {
+            "issues": issues,
+            "change": None if previous_issues is None else issues - previous_issues,
+            "rate": round(issues / entry["records"], 3) if entry["records"] else None,
+        }
+    return dict(sorted(deltas.items(), key=lambda item: -(item[1]["change"] or 0)))
+
+def format_deltas(deltas, limit=10):
+    """Short text for the Discord summary: the spiders whose issue count changed the most."""
+    lines = []
+    for spider, delta in list(deltas.items())[:limit]:
+        change = "new" if delta["change"] is None else f"{delta['change']:+d}"
+        lines.append(f"- {spider}: {delta['issues']} issues ({change}), {delta['rate']} per record")
+    return "\n".join(lines)
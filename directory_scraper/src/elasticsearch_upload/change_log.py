@@ -0,0 +1,203 @@
+"""
+Change log of the ES uploads (data_to_es.py): one JSON object per line, appended to `logs/es_changes_log.ndjson`
+as the orgs are uploaded, instead of a JSON document built in memory and written at the end.
+
+- Added and deleted documents are logged with their _id and sha_256_hash only, updated ones with the fields that changed
+  (`{"field": [before, after]}`), which keeps the log small when many documents change (e.g. a reshuffle of position_sort).
+- The file is rotated once it reaches `max_bytes`: `es_changes_log.ndjson.1` is the previous one, up to `backup_count` files.
+- With `compress=True` (ES_CHANGE_LOG_GZIP=true) the files are gzipped (`es_changes_log.ndjson.gz`, `.1.gz`, ...).
+
+Record types, all with the `run_id` of the upload:
+    {"type": "run", "files": [...]}
+    {"type": "added", "org_id", "_id", "sha_256_hash"}
+    {"type": "updated", "org_id", "_id", "sha_256_hash", "previous_sha_256_hash", "changes": {field: [before, after]}}
+    {"type": "migrated", "org_id", "_id", "previous_id", "sha_256_hash", "previous_sha_256_hash", "changes"}  (legacy _id moved to the stable one)
+    {"type": "deleted", "org_id", "_id", "sha_256_hash"}
+    {"type": "failed", "org_id", "op", "_id", "status", "error"}
+    {"type": "org", "org_id", "file_name", "added", "updated", "reordered", "migrated", "deleted", "failed"}
+
+Usage (reader):
+    python change_log.py [--file logs/es_changes_log.ndjson] [--run latest|all|<run_id>] [--org ORG] [--type updated] [--summary]
+"""
+import argparse
+import gzip
+import logging
+import os
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from directory_scraper.path_config import DEFAULT_LOG_DIR
+from directory_scraper.src.utils import json_codec
+from directory_scraper.src.utils.record_hash import HASH_FIELD
+
+logger = logging.getLogger(__name__)
+
+CHANGE_LOG_FILE = os.path.join(DEFAULT_LOG_DIR, "es_changes_log.ndjson")
+CHANGE_LOG_MAX_BYTES = 10 * 1024 * 1024
+CHANGE_LOG_BACKUP_COUNT = 5
+CHANGE_LOG_GZIP = (os.getenv('ES_CHANGE_LOG_GZIP') or "").lower() in ("1", "true", "yes")
+GZIP_SUFFIX = ".gz"
+CHANGE_TYPES = ["added", "updated", "migrated", "deleted", "failed"]  # the records counted by summarise
+
+def diff_fields(before, after, ignore=(HASH_FIELD,)):
+    """Returns {field: [before, after]} for the fields of two documents that differ, a missing field being None."""
+    before = before or {}
+    changes = {}
+    for field in sorted(set(before) | set(after)):
+        if field not in ignore and before.get(field) != after.get(field):
+            changes[field] = [before.get(field), after.get(field)]
+    return changes
+
+def get_log_files(file_path=CHANGE_LOG_FILE):
+    """The existing files of the log (rotated ones included, gzipped or not), oldest first."""
+    folder = os.path.dirname(file_path) or "."
+    if not os.path.isdir(folder):
+        return []
+    pattern = re.compile(re.escape(os.path.basename(file_path)) + r"(?:\.(\d+))?(?:" + re.escape(GZIP_SUFFIX) + r")?")
+    files = []
+    for file_name in os.listdir(folder):
+        match = pattern.fullmatch(file_name)
+        if match:
+            files.append((int(match.group(1) or 0), file_name))
+    # .N is older than .N-1, the current file (no number) is the newest
+    return [os.path.join(folder, file_name) for _, file_name in sorted(files, reverse=True)]
+
+class ChangeLogWriter:
+    """
+    Appends records to the change log, rotating it by size. Safe to share between threads:
+    the records of one `write` call are written together.
+    """
+
+    def __init__(self, file_path=CHANGE_LOG_FILE, max_bytes=CHANGE_LOG_MAX_BYTES, backup_count=CHANGE_LOG_BACKUP_COUNT, compress=CHANGE_LOG_GZIP):
+        self.file_path = file_path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.run_id = None
+        self._lock = threading.Lock()
+        self._raw = None
+        self._stream = None
+
+    def get_path(self, number=0):
+        return f"{self.file_path}{f'.{number}' if number else ''}{GZIP_SUFFIX if self.compress else ''}"
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        self._raw = open(self.get_path(), "ab")
+        self._stream = gzip.GzipFile(fileobj=self._raw, mode="ab") if self.compress else self._raw
+
+    def _close_stream(self):
+        if self._stream is not None:
+            if self._stream is not self._raw:
+                self._stream.close()  # writes the gzip trailer, doesn't close the raw file
+            self._raw.close()
+            self._raw = self._stream = None
+
+    def _rotate(self):
+        """Shifts `.N` to `.N+1` (dropping the oldest) and the current file to `.1`, like logging's RotatingFileHandler."""
+        self._close_stream()
+        for number in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(self.get_path(number)):
+                os.replace(self.get_path(number), self.get_path(number + 1))
+        if self.backup_count > 0:
+            os.replace(self.get_path(), self.get_path(1))
+        else:
+            os.remove(self.get_path())
+
+    def start_run(self, files, run_id=None):
+        """
+        Writes the "run" record of an upload, the records written after it get its run_id.
+        The default run_id is the start time to the microsecond and a short random suffix: unique, and sorted by time.
+        """
+        self.run_id = run_id or f"{datetime.now().isoformat(timespec='microseconds')}-{uuid.uuid4().hex[:6]}"
+        self.write([{"type": "run", "files": files}])
+
+    def write(self, records):
+        """
+        Appends `records` (dicts with a "type"), one line each, with the run_id of the current run.
+        The file is rotated after the write if it's over `max_bytes`.
+        """
+        data = b"".join(json_codec.dumps({"type": record["type"], "run_id": self.run_id, **record}) + b"\n" for record in records)
+        if not data:
+            return
+        with self._lock:
+            if self._stream is None:
+                self._open()
+            self._stream.write(data)
+            self._stream.flush()
+            # The compressed size for a gzipped log
+            if self.max_bytes and self._raw.tell() >= self.max_bytes:
+                self._rotate()
+
+    def close(self):
+        with self._lock:
+            self._close_stream()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def iter_change_log(file_path=CHANGE_LOG_FILE):
+    """Yields the records of the log, oldest first. Unreadable lines (e.g. of a run killed mid-write) are skipped."""
+    for log_file in get_log_files(file_path):
+        opener = gzip.open if log_file.endswith(GZIP_SUFFIX) else open
+        try:
+            with opener(log_file, "rb") as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json_codec.loads(line)
+                    except ValueError:
+                        logger.warning(f"Skipping unreadable line {line_number} of '{log_file}'.")
+        except (EOFError, gzip.BadGzipFile) as e:
+            logger.warning(f"'{log_file}' is truncated, the rest of it is skipped: {e}")
+
+def filter_records(records, run_id=None, org_id=None, record_type=None):
+    for record in records:
+        if run_id and record.get("run_id") != run_id:
+            continue
+        if org_id and record.get("org_id") != org_id:
+            continue
+        if record_type and record.get("type") != record_type:
+            continue
+        yield record
+
+def get_latest_run_id(file_path=CHANGE_LOG_FILE):
+    run_ids = [record["run_id"] for record in iter_change_log(file_path) if record.get("type") == "run"]
+    return max(run_ids) if run_ids else None
+
+def summarise(records):
+    """Returns {(run_id, org_id): Counter of record types} of the change records."""
+    summary = {}
+    for record in records:
+        if record.get("type") in CHANGE_TYPES:
+            summary.setdefault((record.get("run_id"), record.get("org_id")), Counter())[record["type"]] += 1
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Read the ES change log (data_to_es.py).")
+    parser.add_argument("--file", default=CHANGE_LOG_FILE, help="Log file, its rotated files are read too.")
+    parser.add_argument("--run", default="latest", help="'latest' (default), 'all' or a run_id.")
+    parser.add_argument("--org", help="Only the records of this org_id.")
+    parser.add_argument("--type", choices=["run"] + CHANGE_TYPES + ["org"], help="Only the records of this type.")
+    parser.add_argument("--summary", action="store_true", help="Print the number of changes per run and org_id instead of the records.")
+    args = parser.parse_args()
+
+    run_id = {"latest": get_latest_run_id(args.file), "all": None}.get(args.run, args.run)
+    records = filter_records(iter_change_log(args.file), run_id, args.org, args.type)
+    if args.summary:
+        for (record_run_id, org_id), counts in sorted(summarise(records).items(), key=lambda item: tuple(map(str, item[0]))):
+            print(f"{record_run_id} {org_id}: " + ", ".join(f"{record_type} {counts[record_type]}" for record_type in CHANGE_TYPES))
+    else:
+        for record in records:
+            sys.stdout.write(json_codec.dumps(record).decode("utf-8") + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,25 @@ import os
 import sys
 import json
 import hashlib
+import threading
 from io import BytesIO
 from datetime import datetime
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import streaming_bulk
 from dotenv import load_dotenv
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
 from directory_scraper.path_config import DEFAULT_CLEAN_DATA_FOLDER
 from directory_scraper.src.utils.discord_bot import send_discord_notification
+from directory_scraper.src.utils import json_codec
+from directory_scraper.src.utils.record_hash import COLUMNS_TO_HASH, HASH_FIELD, hash_record, hash_records, get_record_hashes, get_file_sha256
+from directory_scraper.src.utils.record_identity import (
+    IDENTITY_FIELDS, SORT_FIELDS, ID_ALIASES_FIELD, get_fingerprint, get_stable_id_pattern, iter_document_ids
+)
+from directory_scraper.src.elasticsearch_upload.change_log import ChangeLogWriter, diff_fields
 
 load_dotenv()
 
@@ -25,13 +34,20 @@ ES_LOG_INDEX = os.getenv('ES_LOG_INDEX')
 ES_SHA_INDEX = os.getenv('ES_SHA_INDEX')
 ES_API_KEY = os.getenv('ES_API_KEY') #""
 DATA_FOLDER = os.path.join(BASE_DIR, DEFAULT_CLEAN_DATA_FOLDER)
-
-COLUMNS_TO_HASH = [
-    "org_sort", "org_id", "org_name", "org_type", "division_sort",
-    "division_name", "subdivision_name", "position_sort", "position_name",
-    "person_name", "person_email", "person_phone", "person_fax",
-    "parent_org_id"
-]
+EXISTING_DOCS_PAGE_SIZE = 5000  # hits per page when listing the existing documents of an org
+PIT_KEEP_ALIVE = "2m"
+MGET_BATCH_SIZE = 1000
+
+# Bulk indexing, see index_actions
+BULK_CHUNK_SIZE = int(os.getenv('ES_BULK_CHUNK_SIZE') or 500)  # actions per bulk request
+BULK_MAX_CHUNK_BYTES = int(os.getenv('ES_BULK_MAX_CHUNK_BYTES') or 10 * 1024 * 1024)  # bytes per bulk request
+BULK_THREAD_COUNT = int(os.getenv('ES_BULK_THREAD_COUNT') or 2)  # bulk requests in flight per org
+BULK_MAX_RETRIES = 5  # retries of the actions rejected with 429 (Too Many Requests)
+BULK_INITIAL_BACKOFF = 2  # seconds before the first retry, doubled on each retry
+BULK_MAX_BACKOFF = 60
+ORG_CONCURRENCY = int(os.getenv('ES_ORG_CONCURRENCY') or 4)  # orgs uploaded at the same time
+MAX_FAILURES_IN_SUMMARY = 3  # failed actions detailed in the summary of an org
+SHA_HASH_WORKERS = min(8, os.cpu_count() or 1)  # files hashed at the same time
 
 mapping = {
     "properties": {
@@ -71,6 +87,7 @@ mapping = {
         "position_sort": {"type": "integer"},
         "parent_org_id": {"type": "keyword", "null_value": "NULL"},
         "sha_256_hash": {"type": "keyword"},
+        "id_aliases": {"type": "keyword"},
     }
 }
 
@@ -86,35 +103,62 @@ logs_mapping = {
     }
 }
 
-api_key_info = ES_API_KEY
-es = Elasticsearch(
-    ES_URL,
-    api_key=api_key_info if api_key_info else None,
-    timeout=30,
-    max_retries=3,
-    retry_on_timeout=True
-)
+def create_es_client():
+    """Default client factory: the cluster at ES_URL, with ES_API_KEY."""
+    api_key_info = ES_API_KEY
+    return Elasticsearch(
+        ES_URL,
+        api_key=api_key_info if api_key_info else None,
+        timeout=30,
+        max_retries=3,
+        retry_on_timeout=True
+    )
+
+# The client is built by the factory on first use, not at import (e.g. fake_es.create_fake_client for offline runs)
+_es_client_factory = create_es_client
+_es_client = None
+_es_client_lock = threading.Lock()
+
+def set_es_client_factory(factory):
+    """Replaces the client factory (a callable returning an Elasticsearch client). The next call builds a new client."""
+    global _es_client_factory, _es_client
+    with _es_client_lock:
+        _es_client_factory, _es_client = factory, None
+
+def get_es_client():
+    global _es_client
+    if _es_client is None:
+        with _es_client_lock:
+            if _es_client is None:
+                _es_client = _es_client_factory()
+    return _es_client
+
+def __getattr__(name):
+    # `data_to_es.es` / `from data_to_es import es`, as when the client was a module global
+    if name == "es":
+        return get_es_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def calculate_sha256_for_document(doc):
     """
-    Calculate SHA-256 hash based on specific columns of a document.
+    Calculate SHA-256 hash based on specific columns of a document (see record_hash.py).
     """
-    filtered_doc = {col: doc.get(col, "") for col in COLUMNS_TO_HASH if col in doc}
-    doc_str = json.dumps(filtered_doc, sort_keys=True)
-    return hashlib.sha256(doc_str.encode("utf-8")).hexdigest()
+    return hash_record(doc)
 
 def calculate_sha256_for_file(file_path):
     """
     Calculate SHA-256 hash for the entire file content.
     Handles on-disk files and in-memory files differently.
+    On-disk files saved by process_data have their SHA-256 in their sidecar (see record_hash.py).
     """
     sha256 = hashlib.sha256()
     if isinstance(file_path, (str,)):
-        f = open(file_path, "rb")
+        return get_file_sha256(file_path)
 
     elif isinstance(file_path, (list,)):
-        data_txt = "[\n" + ",\n".join([json.dumps(row, separators=(",", ":"), ensure_ascii=False) for row in file_path]) + "\n]"
-        f = BytesIO(data_txt.encode("utf-8"))
+        # Same bytes as a file written in the json_codec ROWS layout
+        data_txt = b"[\n" + b",\n".join([json_codec.dumps(row) for row in file_path]) + b"\n]"
+        f = BytesIO(data_txt)
 
     try:
         while chunk := f.read(8192):
@@ -126,56 +170,81 @@ def calculate_sha256_for_file(file_path):
 
     return sha256.hexdigest()
 
-def check_and_update_file_sha(file_path):
+def get_file_id_and_sha(file_path):
     """
-    Calculate SHA-256 for a file and compares it to the version in ElasticSearch.
-    Handles on-disk files and in-memory files differently.
+    Returns (file_id, SHA-256) of a file: the file name and SHA-256 of an on-disk file,
+    or the "file_name" and the SHA-256 of the "file_data" of an in-memory file.
     """
     if isinstance(file_path, (str,)):
-        file_id = os.path.basename(file_path)
+        return os.path.basename(file_path), calculate_sha256_for_file(file_path)
     elif isinstance(file_path, (dict,)):
-        file_id = file_path.get("file_name", None)
+        return file_path.get("file_name", None), calculate_sha256_for_file(file_path.get("file_data", []))
 
-    new_sha = calculate_sha256_for_file(file_path)
-    response = es.options(ignore_status=404).get(index=ES_SHA_INDEX, id=file_id)
-    stored_sha = response["_source"]["sha"] if response.get("found") else None
-
-    task_id = f"{file_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+def list_files_to_check(data_folder):
+    """The .json files of `data_folder` (a path), or the in-memory files of `data_folder` (a list) that have a name and data."""
+    if isinstance(data_folder, (str,)):
+        return [os.path.join(data_folder, file_name) for file_name in sorted(os.listdir(data_folder)) if file_name.endswith(".json")]
+    elif isinstance(data_folder, (list,)):
+        return [file for file in data_folder if file.get("file_name", None) and file.get("file_data", None)]
+    return []
 
-    if new_sha != stored_sha:
-        # Store the updated SHA in Elasticsearch
-        es.index(index=ES_SHA_INDEX, id=file_id, document={"sha": new_sha, "task_id": task_id})
-        print(f'Status index "{ES_SHA_INDEX}" | {file_id}: UPDATED')
-        return True  # Data has changed
-    else:
-        print(f'Status index "{ES_SHA_INDEX}" | {file_id}: NO CHANGES')
-    return False  # No changes
+def get_stored_shas(file_ids):
+    """Returns {file_id: sha} of the files in ES_SHA_INDEX, in one mget."""
+    es = get_es_client()
+    if not file_ids:
+        return {}
+    response = es.mget(index=ES_SHA_INDEX, ids=list(file_ids))
+    return {doc["_id"]: doc["_source"]["sha"] for doc in response["docs"] if doc.get("found")}
 
 def check_sha_and_update(data_folder):
     """
     Check if there are any changes in the files' SHA-256 hashes.
-    Returns a list of files with changed SHAs.
-    Handles on-disk files and in-memory files differently.
-    """    
-    changed_files = []
-    if isinstance(data_folder, (str,)):
-        for file_name in os.listdir(data_folder):
-            file_path = os.path.join(data_folder, file_name)
-            if file_name.endswith(".json") and check_and_update_file_sha(file_path):
-                # print(f'Status file | {file_name}: CHANGES DETECTED')
-                changed_files.append(file_path)
-
-    elif isinstance(data_folder, (list,)):
-        for file in data_folder:
-            file_name = file.get("file_name", None)
-            file_data = file.get("file_data", None)
-            if file_name and file_data and check_and_update_file_sha(file):
-                changed_files.append(file)
+    Returns the list of (file, file_id, new_sha) of the files with changed SHAs, `file` being a path or an in-memory file.
+    The files are hashed in parallel and compared with ES_SHA_INDEX in one mget. The new SHAs are not stored here: call
+    store_file_shas once the files are uploaded, so a failed upload is detected again on the next run.
+    """
+    files = list_files_to_check(data_folder)
+    with ThreadPoolExecutor(max_workers=SHA_HASH_WORKERS) as executor:
+        file_shas = list(executor.map(get_file_id_and_sha, files))
+    stored_shas = get_stored_shas([file_id for file_id, _ in file_shas])
 
+    changed_files = []
+    for file, (file_id, new_sha) in zip(files, file_shas):
+        if new_sha != stored_shas.get(file_id):
+            print(f'Status index "{ES_SHA_INDEX}" | {file_id}: CHANGES DETECTED')
+            changed_files.append((file, file_id, new_sha))
+        else:
+            print(f'Status index "{ES_SHA_INDEX}" | {file_id}: NO CHANGES')
     return changed_files
 
+def store_file_shas(file_shas):
+    """
+    Stores the (file_id, sha) of the uploaded files in ES_SHA_INDEX, in one bulk request.
+    Returns the file_ids that couldn't be stored.
+    """
+    es = get_es_client()
+    if not file_shas:
+        return []
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    operations = []
+    for file_id, sha in file_shas:
+        operations.append({"index": {"_index": ES_SHA_INDEX, "_id": file_id}})
+        operations.append({"sha": sha, "task_id": f"{file_id}_{timestamp}"})
+    response = es.bulk(operations=operations)
+
+    failed_ids = []
+    for item in response["items"]:
+        info = item["index"]
+        if 200 <= info.get("status", 500) < 300:
+            print(f'Status index "{ES_SHA_INDEX}" | {info["_id"]}: UPDATED')
+        else:
+            print(f'Status index "{ES_SHA_INDEX}" | {info["_id"]}: NOT UPDATED ({info.get("error")})')
+            failed_ids.append(info["_id"])
+    return failed_ids
+
 def delete_documents_by_org_id(org_id):
     """Delete all documents in Elasticsearch with the specified org_id."""
+    es = get_es_client()
     delete_query = {
         "query": {
             "term": {
@@ -189,156 +258,368 @@ def delete_documents_by_org_id(org_id):
     except Exception as e:
         print(f"Error deleting documents with org_id {org_id}: {e}")
 
-def upload_clean_data_to_es(files_to_upload, log_changes=True):
-    """Upload JSON documents to Elasticsearch, using new files as the source of truth."""
-    all_summaries = [] 
-    changes_log = {
-        "metadata": {
-            "timestamp": datetime.now().isoformat() + "Z", 
-            "description": "Logs of data changes uploaded to Elasticsearch",
-            "files_processed": files_to_upload
-        },
-        "changes": {}
-    } if log_changes else None
-         
-    for file_path in files_to_upload:
+def iter_existing_docs(org_id, page_size=EXISTING_DOCS_PAGE_SIZE):
+    """
+    Yields (_id, _source) of every document of `org_id` in ES_INDEX, the _source only having the fields the diff needs
+    (sha_256_hash, id_aliases, the sort fields and the identity fields). Pages through all of them (no 10k limit) with a point in time and search_after, so the pages are consistent.
+    """
+    es = get_es_client()
+    pit_id = es.open_point_in_time(index=ES_INDEX, keep_alive=PIT_KEEP_ALIVE)["id"]
+    try:
+        search_after = None
+        while True:
+            response = es.search(
+                pit={"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+                query={"term": {"org_id": org_id}},
+                sort=[{"_shard_doc": "asc"}],
+                size=page_size,
+                source_includes=[HASH_FIELD, ID_ALIASES_FIELD] + SORT_FIELDS + IDENTITY_FIELDS,
+                search_after=search_after,
+                track_total_hits=False,
+            )
+            pit_id = response.get("pit_id", pit_id)
+            hits = response["hits"]["hits"]
+            for hit in hits:
+                yield hit["_id"], hit.get("_source", {})
+            if len(hits) < page_size:
+                break
+            search_after = hits[-1]["sort"]
+    finally:
+        es.close_point_in_time(id=pit_id)
+
+def get_existing_docs(org_id):
+    """Returns {_id: partial _source} of the documents of `org_id` in ES_INDEX (see iter_existing_docs)."""
+    return dict(iter_existing_docs(org_id))
+
+def get_doc_sources(doc_ids):
+    """Returns {_id: _source} of the given documents of ES_INDEX (only loaded for the change log)."""
+    es = get_es_client()
+    response = es.mget(index=ES_INDEX, ids=list(doc_ids))
+    return {doc["_id"]: doc["_source"] for doc in response["docs"] if doc.get("found")}
+
+def is_reordered(doc, existing_doc):
+    """True if `doc` only differs from the `existing_doc` (its partial _source in ES) by its sort fields."""
+    if all(doc.get(field) == existing_doc.get(field) for field in SORT_FIELDS):
+        return False
+    previous_sorts = {field: existing_doc[field] for field in SORT_FIELDS if field in existing_doc}
+    return hash_record({**doc, **previous_sorts}) == existing_doc.get(HASH_FIELD)
+
+def diff_org_docs(org_id, docs, existing_docs):
+    """
+    Compares the new (doc, sha_256_hash) of an org with its documents in ES ({_id: partial _source}, see get_existing_docs).
+    Documents are matched on their stable _id (record_identity.py). A document still under its legacy _id is matched on its
+    fingerprint, moved to the stable _id and the legacy _id is kept in its id_aliases.
+    Returns (changed, stale_ids, retired_ids):
+    - changed: (_id, doc, change, previous_id) in the order of `docs`, change being "added", "updated", "reordered"
+      (only the sort fields changed) or "migrated" (previous_id being the legacy _id)
+    - stale_ids: the _ids in ES that are not in the new data
+    - retired_ids: the legacy _ids of the migrated documents
+    """
+    stable_id_pattern = get_stable_id_pattern(org_id)
+    # Documents still under a legacy _id, by fingerprint, in the order of their _id (their sort fields)
+    legacy_ids = {}
+    for existing_id in sorted(existing_docs):
+        if not stable_id_pattern.fullmatch(existing_id):
+            legacy_ids.setdefault(get_fingerprint(existing_docs[existing_id]), []).append(existing_id)
+
+    changed, retired_ids = [], []
+    processed_ids = set()
+    for (doc, sha_256_hash), document_id in zip(docs, iter_document_ids(doc for doc, _ in docs)):
+        doc[HASH_FIELD] = sha_256_hash
+        # Mark this document as processed, even if unchanged
+        processed_ids.add(document_id)
+        existing_doc = existing_docs.get(document_id)
+        if existing_doc is None:
+            candidates = legacy_ids.get(get_fingerprint(doc))
+            if candidates:
+                legacy_id = candidates.pop(0)
+                processed_ids.add(legacy_id)
+                retired_ids.append(legacy_id)
+                doc[ID_ALIASES_FIELD] = existing_docs[legacy_id].get(ID_ALIASES_FIELD, []) + [legacy_id]
+                changed.append((document_id, doc, "migrated", legacy_id))
+            else:
+                changed.append((document_id, doc, "added", None))
+        elif existing_doc.get(HASH_FIELD) != sha_256_hash:
+            if is_reordered(doc, existing_doc):
+                changed.append((document_id, doc, "reordered", document_id))
+            else:
+                if existing_doc.get(ID_ALIASES_FIELD):
+                    doc[ID_ALIASES_FIELD] = existing_doc[ID_ALIASES_FIELD]
+                changed.append((document_id, doc, "updated", document_id))
+    # Stale documents: in Elasticsearch but not in the new data
+    stale_ids = sorted(set(existing_docs) - processed_ids)
+    return changed, stale_ids, retired_ids
+
+def iter_org_actions(changed, stale_ids, retired_ids=()):
+    """
+    Yields the bulk actions of an org: the added and updated documents (a partial update of the sort fields for the
+    reordered ones), then the deletions of the stale and retired _ids.
+    """
+    for document_id, doc, change, _ in changed:
+        if change == "reordered":
+            partial_doc = {field: doc[field] for field in SORT_FIELDS + [HASH_FIELD] if field in doc}
+            yield {"_op_type": "update", "_index": ES_INDEX, "_id": document_id, "doc": partial_doc}
+        else:
+            yield {"_index": ES_INDEX, "_id": document_id, "_source": doc}
+    for stale_id in list(stale_ids) + list(retired_ids):
+        yield {"_op_type": "delete", "_index": ES_INDEX, "_id": stale_id}
+
+def get_action_failure(item):
+    """The op, _id, status and error of a failed bulk item ({op_type: {...}}), or None if it didn't fail."""
+    op_type, info = next(iter(item.items()))
+    if op_type == "delete" and info.get("status") == 404:
+        return None  # already deleted
+    error = info.get("error")
+    return {"op": op_type, "_id": info.get("_id"), "status": info.get("status"), "error": error if isinstance(error, dict) else str(error)}
+
+def send_actions(actions, chunk_size=BULK_CHUNK_SIZE, max_chunk_bytes=BULK_MAX_CHUNK_BYTES):
+    """
+    Sends `actions` (any iterable) with streaming_bulk, which retries the actions rejected with 429 with an exponential backoff.
+    Never raises on failed actions: returns (success_count, failures).
+    """
+    es = get_es_client()
+    success_count, failures = 0, []
+    for ok, item in streaming_bulk(
+        es, actions,
+        chunk_size=chunk_size,
+        max_chunk_bytes=max_chunk_bytes,
+        max_retries=BULK_MAX_RETRIES,
+        initial_backoff=BULK_INITIAL_BACKOFF,
+        max_backoff=BULK_MAX_BACKOFF,
+        raise_on_error=False,
+        raise_on_exception=False,
+    ):
+        failure = None if ok else get_action_failure(item)
+        if failure:
+            failures.append(failure)
+        else:
+            success_count += 1
+    return success_count, failures
+
+def index_actions(actions, chunk_size=BULK_CHUNK_SIZE, max_chunk_bytes=BULK_MAX_CHUNK_BYTES, thread_count=BULK_THREAD_COUNT):
+    """
+    Indexes the actions of a generator, `thread_count` bulk requests at a time.
+    Like parallel_bulk, but parallel_bulk can't retry the 429s: the actions are cut in blocks of `chunk_size`, each sent by
+    send_actions in a thread pool. At most 2 blocks per thread are read ahead from `actions`.
+    Returns (success_count, failures).
+    """
+    if thread_count <= 1:
+        return send_actions(actions, chunk_size, max_chunk_bytes)
+
+    success_count, failures = 0, []
+    actions = iter(actions)
+    pending = set()
+    with ThreadPoolExecutor(max_workers=thread_count) as executor:
+        while True:
+            block = list(islice(actions, chunk_size))
+            if block:
+                pending.add(executor.submit(send_actions, block, chunk_size, max_chunk_bytes))
+            if pending and (not block or len(pending) >= 2 * thread_count):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    block_success, block_failures = future.result()
+                    success_count += block_success
+                    failures.extend(block_failures)
+            if not block and not pending:
+                break
+    return success_count, failures
+
+def format_failures(failures, limit=MAX_FAILURES_IN_SUMMARY):
+    lines = [f"    - {failure['op']} {failure['_id']}: {failure['status']} {failure['error']}" for failure in failures[:limit]]
+    if len(failures) > limit:
+        lines.append(f"    - ... and {len(failures) - limit} more")
+    return "\n".join(lines)
+
+def log_org_changes(change_log, org_id, changed, stale_ids, existing_docs, batch_size=MGET_BATCH_SIZE):
+    """
+    Writes the changes of an org to the change log, before they are indexed: the ids and hashes of the added and deleted
+    documents, and the fields that changed in the others. The previous versions of the updated and migrated documents
+    are loaded by batches with mget, the reordered ones only changed their sort fields.
+    """
+    change_log.write([
+        {"type": "added", "org_id": org_id, "_id": document_id, HASH_FIELD: doc[HASH_FIELD]}
+        for document_id, doc, change, _ in changed if change == "added"
+    ])
+    reordered = []
+    for document_id, doc, change, _ in changed:
+        if change == "reordered":
+            previous_sorts = {field: existing_docs[document_id].get(field) for field in SORT_FIELDS}
+            reordered.append({
+                "type": "updated", "org_id": org_id, "_id": document_id, HASH_FIELD: doc[HASH_FIELD],
+                f"previous_{HASH_FIELD}": existing_docs[document_id].get(HASH_FIELD),
+                "changes": diff_fields(previous_sorts, {field: doc.get(field) for field in SORT_FIELDS}),
+            })
+    change_log.write(reordered)
+    updated = [(document_id, doc, change, previous_id) for document_id, doc, change, previous_id in changed if change in ("updated", "migrated")]
+    for start in range(0, len(updated), batch_size):
+        batch = updated[start:start + batch_size]
+        previous_sources = get_doc_sources([previous_id for _, _, _, previous_id in batch])
+        change_log.write([
+            {
+                "type": change, "org_id": org_id, "_id": document_id, **({"previous_id": previous_id} if change == "migrated" else {}),
+                HASH_FIELD: doc[HASH_FIELD], f"previous_{HASH_FIELD}": existing_docs[previous_id].get(HASH_FIELD),
+                "changes": diff_fields(previous_sources.get(previous_id), doc, ignore=(HASH_FIELD, ID_ALIASES_FIELD)),
+            }
+            for document_id, doc, change, previous_id in batch
+        ])
+    change_log.write([
+        {"type": "deleted", "org_id": org_id, "_id": stale_id, HASH_FIELD: existing_docs[stale_id].get(HASH_FIELD)}
+        for stale_id in stale_ids
+    ])
+
+def upload_org(org_id, docs, file_name, change_log=None):
+    """
+    Uploads the documents of one org_id: indexes the new and changed ones and deletes the stale ones.
+    The changes are written to `change_log` (a ChangeLogWriter) if given.
+    Returns (summary, failures).
+    """
+    # Load the ids, hashes and identity fields of the existing documents for this org_id (the whole documents are only loaded for the change log)
+    existing_docs = get_existing_docs(org_id)
+    changed, stale_ids, retired_ids = diff_org_docs(org_id, docs, existing_docs)
+    counts = {change: 0 for change in ("added", "updated", "reordered", "migrated")}
+    for _, _, change, _ in changed:
+        counts[change] += 1
+    updated_count = counts["updated"] + counts["reordered"]
+    deleted_count = len(stale_ids)
+
+    if change_log:
+        # Before indexing, the change log needs the previous versions
+        log_org_changes(change_log, org_id, changed, stale_ids, existing_docs)
+
+    # Execute bulk actions for this org_id
+    success, failures = 0, []
+    if changed or stale_ids:
+        success, failures = index_actions(iter_org_actions(changed, stale_ids, retired_ids))
+    if change_log:
+        change_log.write([{"type": "failed", "org_id": org_id, **failure} for failure in failures] + [{
+            "type": "org", "org_id": org_id, "file_name": file_name, **counts, "deleted": deleted_count, "failed": len(failures),
+        }])
+
+    # Print summary for each org_id in the file (in one print, the orgs are uploaded concurrently)
+    lines = [
+        f"\nSummary for org_id {org_id} in file: {file_name}:",
+        f"  - Added: {counts['added']}",
+        f"  - Updated: {updated_count} (sort fields only: {counts['reordered']})",
+        f"  - Deleted: {deleted_count}",
+        f"  - Migrated to stable _id: {counts['migrated']}",
+        f"  - Actions processed: {success}, failed: {len(failures)}",
+    ]
+    summary = f"🛢️ {org_id} - Added: {counts['added']}, Updated: {updated_count}, Deleted: {deleted_count}"
+    if counts["migrated"]:
+        summary += f", Migrated: {counts['migrated']}"
+    if failures:
+        lines.append(format_failures(failures, limit=len(failures)))
+        summary = f"❗{summary}, Failed: {len(failures)}\n{format_failures(failures)}"
+    print("\n".join(lines))
+    return summary, failures
+
+def upload_org_after(previous, org_id, docs, file_name, change_log=None):
+    """
+    Runs upload_org once `previous` (the future of the upload of an earlier group with the same org_id, or None) is done.
+    The groups of one org_id are diffed one after the other, as each one deletes the documents of the org_id missing from it.
+    """
+    if previous is not None:
+        wait([previous])
+    return upload_org(org_id, docs, file_name, change_log)
+
+def iter_org_groups(files_to_upload):
+    """
+    Yields (file_index, org_id, docs, file_name) for each org_id of each file, docs being a list of (doc, sha_256_hash).
+    For a file that can't be processed, yields (file_index, None, None, error summary).
+    """
+    for file_index, file_path in enumerate(files_to_upload):
         try:
             if isinstance(file_path, str):
                 file_name = os.path.basename(file_path)
                 try:
-                    with open(file_path, 'r') as f:
-                        new_data = json.load(f)
+                    new_data = json_codec.load_file(file_path)
                 except json.JSONDecodeError as e:
-                    print(f"Invalid JSON in file {file_path}: {e}")
-                    continue  # Skip to the next file
+                    raise ValueError(f"Invalid JSON: {e}")
                 except FileNotFoundError as e:
-                    print(f"File not found: {file_path}: {e}")
-                    continue
-                except Exception as e:
-                    print(f"Error reading file {file_path}: {e}")
-                    continue
+                    raise ValueError(f"File not found: {e}")
 
-            elif isinstance(files_to_upload, (dict,)):
+                record_hashes = get_record_hashes(file_path, new_data)  # from the sidecar written by process_data
+
+            elif isinstance(file_path, (dict,)):
                 file_name = file_path.get("file_name", None)
                 new_data = file_path.get("file_data", None)
                 if not file_name or not new_data:
                     raise ValueError("Warning - files_to_upload is neither a path or a dictionary. Check the input and rerun the function")
+                record_hashes = file_path.get("record_hashes") or hash_records(new_data)
+                if len(record_hashes) != len(new_data):
+                    raise ValueError(f"{file_name}: {len(record_hashes)} record hashes for {len(new_data)} records.")
 
-            # Group documents by org_id
+            # Group documents (and their hashes) by org_id
             org_id_groups = {}
-            for doc in new_data:
+            for doc, sha_256_hash in zip(new_data, record_hashes):
                 org_id = doc.get("org_id")
                 if org_id not in org_id_groups:
                     org_id_groups[org_id] = []
-                org_id_groups[org_id].append(doc)
-
-            # Process each org_id group separately
-            for org_id, docs in org_id_groups.items():
-                try:
-                    print(f"\nChecking org_id: {org_id} in file: {file_name}")
-
-                    if log_changes:
-                        changes_log["changes"][org_id] = {"added": [], "updated": [], "deleted": []}
-
-                    # Load existing documents for this org_id
-                    existing_docs_query = {"query": {"term": {"org_id": org_id}}, "size": 10000}
-                    existing_docs = es.search(index=ES_INDEX, body=existing_docs_query)
-                    existing_docs_by_id = {hit['_id']: hit['_source'] for hit in existing_docs['hits']['hits']}
-                    
-                    actions = []
-                    processed_ids = set()
-
-                    # Initialize counters for added, updated, and deleted documents
-                    added_count = 0
-                    updated_count = 0
-                    deleted_count = 0
-
-                    for doc in docs:
-                        sha_256_hash = calculate_sha256_for_document(doc)
-                        doc['sha_256_hash'] = sha_256_hash
-                        document_id = f"{doc.get('org_id', '')}_{str(doc.get('division_sort', '')).zfill(3)}_{str(doc.get('position_sort', '')).zfill(6)}"
-
-                        # Mark this document as processed, even if unchanged
-                        processed_ids.add(document_id)
-
-                        if document_id in existing_docs_by_id:
-                            # Update if SHA differs
-                            existing_doc = existing_docs_by_id[document_id]
-                            if existing_doc['sha_256_hash'] != sha_256_hash:
-                                # print(f"Updating document: {document_id}")
-                                actions.append({
-                                    "_index": ES_INDEX,
-                                    "_id": document_id,
-                                    "_source": doc
-                                })
-                                if log_changes:
-                                    changes_log["changes"][org_id]["updated"].append({
-                                        "_id": document_id,
-                                        "before": existing_doc,
-                                        "after": doc
-                                    })
-                                updated_count += 1
-                        else:
-                            # Add new document
-                            # print(f"Adding new document: {document_id}")
-                            actions.append({
-                                "_index": ES_INDEX,
-                                "_id": document_id,
-                                "_source": doc
-                            })
-                            if log_changes:
-                                changes_log["changes"][org_id]["added"].append({
-                                    "_id": document_id,
-                                    "doc": doc
-                                })
-                            added_count += 1
-
-                    # Identify and delete stale documents (those in Elasticsearch but not in new_data)
-                    stale_docs = set(existing_docs_by_id.keys()) - processed_ids
-                    for stale_id in stale_docs:
-                        # print(f"Deleting stale document: {stale_id}")
-                        actions.append({
-                            "_op_type": "delete",
-                            "_index": ES_INDEX,
-                            "_id": stale_id
-                        })
-                        if log_changes:
-                            changes_log["changes"][org_id]["deleted"].append({
-                                "_id": stale_id,
-                                "doc": existing_docs_by_id[stale_id]
-                            })
-                        deleted_count += 1
-
-                    # Execute bulk actions for this org_id
-                    if actions:
-                        print(f"Processing {len(actions)} actions for org_id {org_id}...")
-                        success, failed = bulk(es, actions)
-                        print(f"Successfully processed {success} actions.")
-                        if failed:
-                            print("\nSome actions failed:", failed)
-
-                    # Print summary for each org_id in the file
-                    print(f"Summary for org_id {org_id}:")
-                    print(f"  - Added: {added_count}")
-                    print(f"  - Updated: {updated_count}")
-                    print(f"  - Deleted: {deleted_count}")
-                    summary = (f"🛢️ {org_id} - Added: {added_count}, Updated: {updated_count}, Deleted: {deleted_count}")
-                    all_summaries.append(summary)
-
-                except Exception as e:
-                    print(f"❗Error processing org_id {org_id} in file {file_name}: {e}")
-                    all_summaries.append(f"❗🛢️ {org_id} - Failed: {e}")
-                    continue  # Skip to the next org_id
+                org_id_groups[org_id].append((doc, sha_256_hash))
 
         except Exception as e:
             print(f"Error processing file {file_path}: {e}")
-            all_summaries.append(f"❗-- {file_path} - Failed: {e}")
+            yield file_index, None, None, f"❗-- {file_path} - Failed: {e}"
             continue  # Skip to the next file
 
-    # Save the changes log to a JSON file
-    if log_changes and changes_log:
-        with open("es_changes_log.json", "w") as log_file:
-            json.dump(changes_log, log_file, indent=4)
+        for org_id, docs in org_id_groups.items():
+            yield file_index, org_id, docs, file_name
+
+def upload_clean_data_to_es(files_to_upload, log_changes=True, org_concurrency=ORG_CONCURRENCY, uploaded_files=None):
+    """
+    Upload JSON documents to Elasticsearch, using new files as the source of truth.
+    Up to `org_concurrency` org_ids are uploaded at the same time. The groups of an org_id found in several files
+    (e.g. kpdn.json and kpdn_negeri.json) are uploaded one after the other, in the order of the files, the last one winning
+    as when the files were uploaded sequentially. The summaries keep the order of the files.
+    With `log_changes`, the changes are appended to the change log (change_log.py) as each org_id is uploaded.
+    If `uploaded_files` (a list) is given, the files whose org_ids were all uploaded without any failed action are appended to it.
+    """
+    all_summaries = [] 
+    change_log = ChangeLogWriter() if log_changes else None
+    if change_log:
+        change_log.start_run([file if isinstance(file, str) else file.get("file_name") for file in files_to_upload])
+
+    org_concurrency = max(1, org_concurrency)
+    uploads = []  # (file_index, org_id, file_name, future), or (file_index, None, None, error summary), in the order of the files
+    pending = set()
+    org_futures = {}  # org_id: future of the last group of the org_id submitted
+    with ThreadPoolExecutor(max_workers=org_concurrency) as executor:
+        for file_index, org_id, docs, file_name in iter_org_groups(files_to_upload):
+            if docs is None:
+                uploads.append((file_index, None, None, file_name))  # file_name is the error summary of the file here
+                continue
+            print(f"\nChecking org_id: {org_id} in file: {file_name}")
+            # At most 2 orgs per worker submitted ahead, so the files aren't all loaded at once
+            while len(pending) >= 2 * org_concurrency:
+                _, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # A worker waiting on an earlier group never blocks it: that group was queued (and started) before
+            future = executor.submit(upload_org_after, org_futures.get(org_id), org_id, docs, file_name, change_log)
+            org_futures[org_id] = future
+            pending.add(future)
+            uploads.append((file_index, org_id, file_name, future))
+
+    failed_file_indexes = set()
+    for file_index, org_id, file_name, future in uploads:
+        if org_id is None and file_name is None:
+            all_summaries.append(future)  # the error summary of a file
+            failed_file_indexes.add(file_index)
+            continue
+        try:
+            summary, failures = future.result()
+        except Exception as e:
+            print(f"❗Error processing org_id {org_id} in file {file_name}: {e}")
+            all_summaries.append(f"❗🛢️ {org_id} - Failed: {e}")
+            failed_file_indexes.add(file_index)
+            continue  # Skip to the next org_id
+        if failures:
+            failed_file_indexes.add(file_index)
+        all_summaries.append(summary)
+
+    if change_log:
+        change_log.close()
+
+    if uploaded_files is not None:
+        uploaded_files.extend(file for file_index, file in enumerate(files_to_upload) if file_index not in failed_file_indexes)
 
     return all_summaries
 
@@ -346,6 +627,7 @@ def upload_clean_data_to_es(files_to_upload, log_changes=True):
 def get_elasticsearch_info():
     """Get Elasticsearch cluster info for debugging connection issues."""
     try:
+        es = get_es_client()  # raises here if the client can't be built (e.g. ES_URL not set)
         resp = es.info()
         #print("Elasticsearch Info:")
         #print(json.dumps(resp.body, indent=2))
@@ -356,9 +638,16 @@ def get_elasticsearch_info():
 
 def create_index_if_not_exists():
     """Create the Elasticsearch index if it does not exist."""
+    es = get_es_client()
     try:
         if es.indices.exists(index=ES_INDEX):
             print(f'Index "{ES_INDEX}" already exists.')
+            # Fields added to `mapping` after the index was created, mapped before ES maps them dynamically
+            # (id_aliases as analysed text would not match a term lookup of a legacy _id)
+            try:
+                es.indices.put_mapping(index=ES_INDEX, properties={ID_ALIASES_FIELD: mapping["properties"][ID_ALIASES_FIELD]})
+            except Exception as e:
+                print(f'Warning: could not map "{ID_ALIASES_FIELD}" in "{ES_INDEX}" (already mapped with another type? reindex to fix): {e}')
         else:
             es.indices.create(index=ES_INDEX, body={"mappings": mapping})
             print(f'Index "{ES_INDEX}" created with the provided mapping.')
@@ -369,6 +658,7 @@ def create_index_if_not_exists():
 
 def create_logs_if_not_exists():
     """Create the Elasticsearch edit logs index if it does not exist."""
+    es = get_es_client()
     try:
         if es.indices.exists(index=ES_LOG_INDEX):
             print(f'Index "{ES_LOG_INDEX}" already exists.')
@@ -400,7 +690,18 @@ def main(data_folder=None):
     if create_index_if_not_exists() and create_logs_if_not_exists():
         changed_files = check_sha_and_update(data_folder)
         if changed_files:
-            all_summaries = upload_clean_data_to_es(changed_files)
+            uploaded_files = []
+            all_summaries = upload_clean_data_to_es([file for file, _, _ in changed_files], uploaded_files=uploaded_files)
+            # Only the SHAs of the uploaded files are stored, the others are uploaded again on the next run
+            uploaded_ids = {id(file) for file in uploaded_files}
+            sha_updates = [(file_id, new_sha) for file, file_id, new_sha in changed_files if id(file) in uploaded_ids]
+            try:
+                not_stored = store_file_shas(sha_updates)
+            except Exception as e:
+                print(f"Error storing the file SHAs in {ES_SHA_INDEX}: {e}")
+                not_stored = [file_id for file_id, _ in sha_updates]
+            if not_stored:
+                all_summaries.append(f"❗-- SHA not stored (uploaded again next run): {', '.join(not_stored)}")
             # Consolidate and send a single Discord notification
             if all_summaries:
                 final_summary_message = "\n".join(all_summaries)
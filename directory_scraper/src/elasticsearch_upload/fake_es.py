@@ -0,0 +1,515 @@
+"""
+In-process stand-in for Elasticsearch, to run and profile the upload (data_to_es.py) without a cluster.
+
+FakeElasticsearch keeps indices, aliases and points in time in memory and answers the REST requests of the real client:
+create_fake_client() returns an `Elasticsearch` client whose node (FakeNode) hands each request to the fake instead of
+sending it over HTTP. The client code (serialisation, streaming_bulk chunking and 429 retries) is the one used against
+a real cluster, and the fake counts the round trips and the bytes of the requests.
+
+Supported, well enough for upload_clean_data_to_es, check_sha_and_update, rebuild_index and the API logs:
+    info, get, index, search (term/terms/match/match_all/bool, sort, search_after, point in time, _source includes),
+    count, mget, bulk (index/create/update/delete), delete_by_query, open/close_point_in_time,
+    indices.exists/create/delete/get/get_settings/put_settings/get_mapping/put_mapping/refresh/forcemerge/exists_alias/get_alias/update_aliases
+Not a search engine: full-text queries are plain equality on the field value.
+
+Usage:
+    from directory_scraper.src.elasticsearch_upload import data_to_es, fake_es
+    fake = fake_es.FakeElasticsearch()
+    data_to_es.set_es_client_factory(lambda: fake_es.create_fake_client(fake))
+    ...
+    print(fake.stats)
+"""
+import fnmatch
+import random
+from bisect import bisect_right
+from itertools import islice
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from elasticsearch import Elasticsearch
+from elastic_transport import BaseNode, ApiResponseMeta, HttpHeaders
+from elastic_transport._node import NodeApiResponse
+from directory_scraper.src.utils import json_codec
+
+FAKE_ES_URL = "http://fake-es:9200"
+RESPONSE_HEADERS = {"content-type": "application/json", "x-elastic-product": "Elasticsearch"}
+
+class FakeElasticsearchError(Exception):
+    def __init__(self, status, error_type, reason):
+        super().__init__(reason)
+        self.status = status
+        self.body = {"error": {"type": error_type, "reason": reason}, "status": status}
+
+def not_found(error_type, reason):
+    return FakeElasticsearchError(404, error_type, reason)
+
+class FakeIndex:
+    def __init__(self, mappings=None, settings=None):
+        self.mappings = mappings or {}
+        self.settings = {"number_of_shards": "1", "number_of_replicas": "1"}
+        self.settings.update({key: str(value) for key, value in (settings or {}).items() if value is not None})
+        self.docs = {}  # _id: _source, in insertion order (the _shard_doc order)
+
+class Snapshot:
+    """The documents of a point in time, [(index, _id, _source)], with the positions of the values of the fields used in term queries."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self._positions = {}  # field: {value: [positions]}, built on the first term query on the field
+
+    def get_positions(self, field, value):
+        if field not in self._positions:
+            getter = get_field_getter(field)
+            positions = {}
+            for position, (_, _, source) in enumerate(self.docs):
+                field_value = getter(source)
+                if isinstance(field_value, (str, int, float, bool)) or field_value is None:
+                    positions.setdefault(field_value, []).append(position)
+            self._positions[field] = positions
+        return self._positions[field].get(value, [])
+
+def get_term_query(query):
+    """(field, value) of a single term/match query on a field of the _source, else None."""
+    if not query or len(query) != 1:
+        return None
+    (query_type, body), = query.items()
+    if query_type not in ("term", "match", "match_phrase") or len(body) != 1:
+        return None
+    (field, condition), = body.items()
+    value = get_query_value(condition)
+    if field == "_id" or not (isinstance(value, (str, int, float, bool))):
+        return None
+    return field, value
+
+def get_field(source, field):
+    """Value of a field of a _source, dotted names allowed ('org_name.keyword' is 'org_name')."""
+    if field.endswith(".keyword"):
+        field = field[:-len(".keyword")]
+    value = source
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def get_query_value(condition):
+    return condition.get("value", condition.get("query")) if isinstance(condition, dict) else condition
+
+def get_field_getter(field):
+    """A function returning the value of a field of a _source, dotted names allowed ('org_name.keyword' is 'org_name')."""
+    if field.endswith(".keyword"):
+        field = field[:-len(".keyword")]
+    if "." not in field:
+        return lambda source: source.get(field)
+    return lambda source: get_field(source, field)
+
+def compile_query(query):
+    """Returns a function (doc_id, source) -> bool evaluating the supported subset of the query DSL."""
+    if not query or "match_all" in query:
+        return lambda doc_id, source: True
+    (query_type, body), = query.items()
+    if query_type in ("term", "match", "match_phrase", "terms"):
+        (field, condition), = body.items()
+        if query_type == "terms":
+            values = set(condition)
+            test = values.__contains__
+        else:
+            value = get_query_value(condition)
+            test = lambda candidate: candidate == value
+        if field == "_id":
+            return lambda doc_id, source: test(doc_id)
+        getter = get_field_getter(field)
+        return lambda doc_id, source: test(getter(source))
+    if query_type == "ids":
+        values = set(body.get("values", []))
+        return lambda doc_id, source: doc_id in values
+    if query_type == "exists":
+        getter = get_field_getter(body["field"])
+        return lambda doc_id, source: getter(source) is not None
+    if query_type == "bool":
+        as_list = lambda clauses: clauses if isinstance(clauses, list) else [clauses]
+        required = [compile_query(clause) for clause in as_list(body.get("must", [])) + as_list(body.get("filter", []))]
+        excluded = [compile_query(clause) for clause in as_list(body.get("must_not", []))]
+        optional = [compile_query(clause) for clause in as_list(body.get("should", []))]
+        return lambda doc_id, source: (
+            all(test(doc_id, source) for test in required)
+            and not any(test(doc_id, source) for test in excluded)
+            and (not optional or any(test(doc_id, source) for test in optional))
+        )
+    raise FakeElasticsearchError(400, "parsing_exception", f"fake_es doesn't support the '{query_type}' query")
+
+def filter_source(source, includes):
+    if not includes:
+        return source
+    return {field: source[field] for field in includes if field in source}
+
+class FakeElasticsearch:
+    """
+    The state of the fake cluster and the handling of the REST requests. Thread-safe (one lock).
+    `bulk_reject_rate` makes that share of the bulk items fail with 429, to exercise the retries.
+    """
+
+    def __init__(self, bulk_reject_rate=0.0, seed=0):
+        self.indices = {}
+        self.aliases = {}  # alias: set of index names
+        self.pits = {}  # pit id: Snapshot of the documents at the time it was opened
+        self.generation = 0  # incremented by every write, points in time opened between two writes share their Snapshot
+        self._snapshot = None  # (generation, index names, Snapshot) of the last point in time
+        self.bulk_reject_rate = bulk_reject_rate
+        self.random = random.Random(seed)
+        self.stats = Counter()  # round trips per API, "requests", "request_bytes", "response_bytes", "seconds" (spent in the fake)
+        self._lock = threading.Lock()
+
+    #========================= Names ==============================
+
+    def resolve(self, expression, must_exist=True):
+        """Index names of an index name, alias, wildcard pattern or comma separated list of those."""
+        names = []
+        for part in expression.split(","):
+            if part in self.indices:
+                names.append(part)
+            elif part in self.aliases:
+                names.extend(sorted(self.aliases[part]))
+            elif "*" in part:
+                names.extend(sorted(name for name in self.indices if fnmatch.fnmatchcase(name, part)))
+            elif must_exist:
+                raise not_found("index_not_found_exception", f"no such index [{part}]")
+        return names
+
+    def get_write_index(self, name, create=True):
+        """The index written to through `name` (created, like ES, when it doesn't exist)."""
+        if name in self.aliases:
+            return self.indices[sorted(self.aliases[name])[-1]]
+        if name not in self.indices:
+            if not create:
+                raise not_found("index_not_found_exception", f"no such index [{name}]")
+            self.indices[name] = FakeIndex()
+            self.generation += 1
+        return self.indices[name]
+
+    #========================= Documents ==============================
+
+    def index_doc(self, index_name, doc_id, source, op_type="index"):
+        index = self.get_write_index(index_name)
+        doc_id = doc_id or uuid.uuid4().hex
+        if op_type == "create" and doc_id in index.docs:
+            raise FakeElasticsearchError(409, "version_conflict_engine_exception", f"[{doc_id}]: version conflict, document already exists")
+        result = "updated" if doc_id in index.docs else "created"
+        index.docs.pop(doc_id, None)
+        index.docs[doc_id] = source
+        self.generation += 1
+        return doc_id, result, 200 if result == "updated" else 201
+
+    def update_doc(self, index_name, doc_id, body):
+        index = self.get_write_index(index_name)
+        if doc_id not in index.docs:
+            if body.get("doc_as_upsert") or "upsert" in body:
+                index.docs[doc_id] = dict(body.get("doc") if body.get("doc_as_upsert") else body["upsert"])
+                self.generation += 1
+                return "created", 201
+            raise not_found("document_missing_exception", f"[{doc_id}]: document missing")
+        index.docs[doc_id] = {**index.docs[doc_id], **body.get("doc", {})}
+        self.generation += 1
+        return "updated", 200
+
+    def delete_doc(self, index_name, doc_id):
+        index = self.get_write_index(index_name, create=False)
+        if index.docs.pop(doc_id, None) is None:
+            return "not_found", 404
+        self.generation += 1
+        return "deleted", 200
+
+    def iter_docs(self, index_names):
+        for index_name in index_names:
+            for doc_id, source in self.indices[index_name].docs.items():
+                yield index_name, doc_id, source
+
+    #========================= Search ==============================
+
+    def search(self, index_expression, body, params):
+        body = body or {}
+        includes = (params.get("_source_includes") or params.get("_source") or "")
+        includes = [field for field in includes.split(",") if field] if isinstance(includes, str) else includes
+        if isinstance(body.get("_source"), dict):
+            includes = body["_source"].get("includes", includes)
+        elif isinstance(body.get("_source"), list):
+            includes = body["_source"]
+
+        pit = body.get("pit")
+        if pit:
+            if pit["id"] not in self.pits:
+                raise not_found("search_context_missing_exception", "No search context found for the point in time")
+            snapshot = self.pits[pit["id"]]
+            candidates = snapshot.docs
+        else:
+            candidates = list(self.iter_docs(self.resolve(index_expression or "*", must_exist=False)))
+
+        query = compile_query(body.get("query"))
+        sort = body.get("sort") or []
+        sort = [sort] if isinstance(sort, (str, dict)) else sort
+        sort_fields = []
+        for item in sort:
+            field, order = (item, "asc") if isinstance(item, str) else next(iter(item.items()))
+            order = order.get("order", "asc") if isinstance(order, dict) else order
+            sort_fields.append((field, order))
+
+        start = int(body.get("from", params.get("from", 0)))
+        size = int(body.get("size", params.get("size", 10)))
+        search_after = body.get("search_after")
+        if str(body.get("track_total_hits", params.get("track_total_hits"))).lower() == "false" and sort_fields in ([], [("_shard_doc", "asc")], [("_doc", "asc")]):
+            # In document order without total (the pages of iter_existing_docs): stop once the page is full
+            first = search_after[0] + 1 if search_after else 0
+            term_query = get_term_query(body.get("query")) if pit else None
+            if term_query:
+                positions = snapshot.get_positions(*term_query)
+                positions = positions[bisect_right(positions, first - 1):][:start + size]
+                hits = [(position, *candidates[position]) for position in positions]
+            else:
+                hits = list(islice(((position, index_name, doc_id, source) for position, (index_name, doc_id, source) in enumerate(islice(candidates, first, None), first)
+                                    if query(doc_id, source)), start + size))
+            search_after = None
+        else:
+            hits = [(position, index_name, doc_id, source) for position, (index_name, doc_id, source) in enumerate(candidates)
+                    if query(doc_id, source)]
+        for field, order in reversed(sort_fields):
+            if field in ("_shard_doc", "_doc"):
+                key = lambda hit: hit[0]
+            elif field == "_id":
+                key = lambda hit: hit[2]
+            else:
+                key = lambda hit, field=field: (get_field(hit[3], field) is None, get_field(hit[3], field) or 0)
+            hits.sort(key=key, reverse=order == "desc")
+
+        def sort_values(hit):
+            values = []
+            for field, _ in sort_fields:
+                values.append(hit[0] if field in ("_shard_doc", "_doc") else hit[2] if field == "_id" else get_field(hit[3], field))
+            return values
+
+        if search_after is not None:
+            position = next((i for i, hit in enumerate(hits) if sort_values(hit) == list(search_after)), None)
+            hits = hits[position + 1:] if position is not None else [hit for hit in hits if sort_values(hit) > list(search_after)]
+        total = len(hits)
+        response = {
+            "took": 0, "timed_out": False,
+            "hits": {
+                "total": {"value": total, "relation": "eq"},
+                "hits": [
+                    {"_index": index_name, "_id": doc_id, "_score": None, "_source": filter_source(source, includes),
+                     **({"sort": sort_values((position, index_name, doc_id, source))} if sort_fields else {})}
+                    for position, index_name, doc_id, source in hits[start:start + size]
+                ],
+            },
+        }
+        if pit:
+            response["pit_id"] = pit["id"]
+        return response
+
+    #========================= Requests ==============================
+
+    def handle(self, method, target, body):
+        """Returns (status, response body) for a REST request, `body` being the raw request bytes."""
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        api = self.get_api_name(method, parts)
+        with self._lock:
+            start = time.perf_counter()
+            self.stats["requests"] += 1
+            self.stats[api] += 1
+            self.stats["request_bytes"] += len(body or b"")
+            try:
+                if api == "bulk":
+                    status, response = 200, self.bulk(parts, body)
+                else:
+                    document = json_codec.loads(body) if body else None
+                    status, response = self.dispatch(api, method, parts, params, document)
+            except FakeElasticsearchError as e:
+                status, response = e.status, e.body
+            data = json_codec.dumps(response) if response is not None else b""
+            self.stats["response_bytes"] += len(data)
+            self.stats["seconds"] += time.perf_counter() - start
+        return status, data
+
+    @staticmethod
+    def get_api_name(method, parts):
+        if not parts:
+            return "info"
+        endpoint = next((part for part in parts if part.startswith("_")), None)
+        if endpoint == "_doc":
+            return {"GET": "get", "HEAD": "exists", "DELETE": "delete"}.get(method, "index")
+        if endpoint in ("_alias", "_aliases"):
+            return {"HEAD": "indices.exists_alias", "GET": "indices.get_alias"}.get(method, "indices.update_aliases")
+        if endpoint in ("_settings", "_refresh", "_forcemerge"):
+            return f"indices.{'put' if method == 'PUT' else 'get'}_settings" if endpoint == "_settings" else f"indices.{endpoint[1:]}"
+        if endpoint == "_mapping":
+            return "indices.put_mapping" if method in ("PUT", "POST") else "indices.get_mapping"
+        if endpoint == "_pit":
+            return "close_point_in_time" if method == "DELETE" else "open_point_in_time"
+        if endpoint:
+            return endpoint[1:]
+        return {"HEAD": "indices.exists", "PUT": "indices.create", "DELETE": "indices.delete", "GET": "indices.get"}.get(method, "unknown")
+
+    def dispatch(self, api, method, parts, params, body):
+        if api == "info":
+            return 200, {"name": "fake-es", "cluster_name": "fake", "version": {"number": "8.15.0"}, "tagline": "You Know, for Search"}
+        if api == "get":
+            index_name, doc_id = parts[0], parts[2]
+            for name in self.resolve(index_name, must_exist=False):
+                if doc_id in self.indices[name].docs:
+                    return 200, {"_index": name, "_id": doc_id, "found": True, "_source": self.indices[name].docs[doc_id]}
+            return 404, {"_index": index_name, "_id": doc_id, "found": False}
+        if api == "index":
+            doc_id, result, status = self.index_doc(parts[0], parts[2] if len(parts) > 2 else None, body)
+            return status, {"_index": parts[0], "_id": doc_id, "result": result}
+        if api == "delete":
+            result, status = self.delete_doc(parts[0], parts[2])
+            return status, {"_index": parts[0], "_id": parts[2], "result": result}
+        if api in ("search", "count", "delete_by_query"):
+            index_expression = parts[0] if parts[0] != f"_{api}" else None
+            if api == "search":
+                return 200, self.search(index_expression, body, params)
+            names = self.resolve(index_expression or "*")
+            query = compile_query((body or {}).get("query"))
+            hits = [(name, doc_id) for name, doc_id, source in self.iter_docs(names) if query(doc_id, source)]
+            if api == "count":
+                return 200, {"count": len(hits)}
+            for name, doc_id in hits:
+                del self.indices[name].docs[doc_id]
+            self.generation += 1
+            return 200, {"deleted": len(hits), "total": len(hits), "failures": []}
+        if api == "mget":
+            default_index = parts[0] if parts[0] != "_mget" else None
+            requested = [{"_index": default_index, "_id": doc_id} for doc_id in body.get("ids", [])] + body.get("docs", [])
+            docs = []
+            for item in requested:
+                names = self.resolve(item.get("_index") or default_index, must_exist=False)
+                found = next(((name, self.indices[name].docs[item["_id"]]) for name in names if item["_id"] in self.indices[name].docs), None)
+                docs.append({"_index": found[0], "_id": item["_id"], "found": True, "_source": found[1]} if found
+                            else {"_index": item.get("_index") or default_index, "_id": item["_id"], "found": False})
+            return 200, {"docs": docs}
+        if api == "open_point_in_time":
+            pit_id = uuid.uuid4().hex
+            names = tuple(self.resolve(parts[0]))
+            if not self._snapshot or self._snapshot[:2] != (self.generation, names):
+                self._snapshot = (self.generation, names, Snapshot(list(self.iter_docs(names))))
+            self.pits[pit_id] = self._snapshot[2]
+            return 200, {"id": pit_id}
+        if api == "close_point_in_time":
+            found = self.pits.pop((body or {}).get("id"), None) is not None
+            return (200 if found else 404), {"succeeded": found, "num_freed": int(found)}
+        return self.dispatch_indices(api, parts, params, body)
+
+    def dispatch_indices(self, api, parts, params, body):
+        if api == "indices.exists":
+            return (200 if self.resolve(parts[0], must_exist=False) and (parts[0] in self.indices or parts[0] in self.aliases or "*" in parts[0]) else 404), None
+        if api == "indices.create":
+            if parts[0] in self.indices or parts[0] in self.aliases:
+                raise FakeElasticsearchError(400, "resource_already_exists_exception", f"index [{parts[0]}] already exists")
+            body = body or {}
+            settings = body.get("settings", {})
+            self.indices[parts[0]] = FakeIndex(body.get("mappings"), settings.get("index", settings))
+            self.generation += 1
+            return 200, {"acknowledged": True, "shards_acknowledged": True, "index": parts[0]}
+        if api == "indices.delete":
+            for name in self.resolve(parts[0]):
+                del self.indices[name]
+                for indices in self.aliases.values():
+                    indices.discard(name)
+            self.generation += 1
+            self.aliases = {alias: indices for alias, indices in self.aliases.items() if indices}
+            return 200, {"acknowledged": True}
+        if api == "indices.get":
+            return 200, {name: {"aliases": {alias: {} for alias, indices in self.aliases.items() if name in indices},
+                                "mappings": self.indices[name].mappings, "settings": {"index": dict(self.indices[name].settings)}}
+                         for name in self.resolve(parts[0])}
+        if api == "indices.get_settings":
+            return 200, {name: {"settings": {"index": dict(self.indices[name].settings)}} for name in self.resolve(parts[0])}
+        if api == "indices.put_settings":
+            settings = body.get("settings", body) if body else {}
+            settings = settings.get("index", settings)
+            for name in self.resolve(parts[0]):
+                for key, value in settings.items():
+                    if value is None:
+                        self.indices[name].settings.pop(key, None)
+                    else:
+                        self.indices[name].settings[key] = str(value)
+            return 200, {"acknowledged": True}
+        if api == "indices.get_mapping":
+            return 200, {name: {"mappings": self.indices[name].mappings} for name in self.resolve(parts[0])}
+        if api == "indices.put_mapping":
+            names = self.resolve(parts[0])
+            for name in names:
+                properties = self.indices[name].mappings.get("properties", {})
+                for field, field_mapping in body.get("properties", {}).items():
+                    if field in properties and properties[field].get("type") != field_mapping.get("type"):
+                        raise FakeElasticsearchError(400, "illegal_argument_exception", f"mapper [{field}] cannot be changed from type [{properties[field].get('type')}] to [{field_mapping.get('type')}]")
+            for name in names:
+                self.indices[name].mappings.setdefault("properties", {}).update(body.get("properties", {}))
+            return 200, {"acknowledged": True}
+        if api in ("indices.refresh", "indices.forcemerge"):
+            self.resolve(parts[0])
+            return 200, {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+        if api == "indices.exists_alias":
+            return (200 if parts[-1] in self.aliases else 404), None
+        if api == "indices.get_alias":
+            if parts[-1] not in self.aliases:
+                raise not_found("aliases_not_found_exception", f"alias [{parts[-1]}] missing")
+            return 200, {name: {"aliases": {parts[-1]: {}}} for name in sorted(self.aliases[parts[-1]])}
+        if api == "indices.update_aliases":
+            for action in body.get("actions", []):
+                (action_type, spec), = action.items()
+                if action_type == "add":
+                    if spec["alias"] in self.indices:
+                        raise FakeElasticsearchError(400, "invalid_alias_name_exception", f"an index exists with the same name as the alias [{spec['alias']}]")
+                    self.aliases.setdefault(spec["alias"], set()).add(spec["index"])
+                elif action_type == "remove":
+                    self.aliases.get(spec["alias"], set()).discard(spec["index"])
+                elif action_type == "remove_index":
+                    del self.indices[spec["index"]]
+                    self.generation += 1
+            self.aliases = {alias: indices for alias, indices in self.aliases.items() if indices}
+            return 200, {"acknowledged": True}
+        raise FakeElasticsearchError(400, "illegal_argument_exception", f"fake_es doesn't support the '{api}' API ({'/'.join(parts)})")
+
+    def bulk(self, parts, body):
+        default_index = parts[0] if parts[0] != "_bulk" else None
+        lines = iter(line for line in body.split(b"\n") if line.strip())
+        items = []
+        for line in lines:
+            (op_type, meta), = json_codec.loads(line).items()
+            source = json_codec.loads(next(lines)) if op_type in ("index", "create", "update") else None
+            index_name, doc_id = meta.get("_index") or default_index, meta.get("_id")
+            item = {"_index": index_name, "_id": doc_id}
+            if self.bulk_reject_rate and self.random.random() < self.bulk_reject_rate:
+                item.update(status=429, error={"type": "es_rejected_execution_exception", "reason": "rejected by fake_es"})
+            else:
+                try:
+                    if op_type in ("index", "create"):
+                        item["_id"], item["result"], item["status"] = self.index_doc(index_name, doc_id, source, op_type)
+                    elif op_type == "update":
+                        item["result"], item["status"] = self.update_doc(index_name, doc_id, source)
+                    elif op_type == "delete":
+                        item["result"], item["status"] = self.delete_doc(index_name, doc_id)
+                except FakeElasticsearchError as e:
+                    item.update(status=e.status, error=e.body["error"])
+            items.append({op_type: item})
+        return {"took": 0, "errors": any("error" in next(iter(item.values())) for item in items), "items": items}
+
+class FakeNode(BaseNode):
+    """Transport node answering from a FakeElasticsearch (the `fake` class attribute) instead of the network."""
+    fake = None
+
+    def perform_request(self, method, target, body=None, headers=None, request_timeout=None, **kwargs):
+        status, data = self.fake.handle(method, target, body)
+        meta = ApiResponseMeta(status=status, http_version="1.1", headers=HttpHeaders(RESPONSE_HEADERS), duration=0.0, node=self.config)
+        return NodeApiResponse(meta, data)
+
+def create_fake_client(fake=None, **client_options):
+    """An Elasticsearch client connected to `fake` (a new FakeElasticsearch if not given)."""
+    fake = fake if fake is not None else FakeElasticsearch()
+    node_class = type("FakeNode", (FakeNode,), {"fake": fake})
+    return Elasticsearch(FAKE_ES_URL, node_class=node_class, **client_options)
@@ -0,0 +1,137 @@
+"""
+Full rebuild of ES_INDEX from a compiled file (blue/green).
+
+The per-org diff of data_to_es.py updates the live index document by document. A full reload instead:
+1. creates a new versioned index `<ES_INDEX>-<timestamp>` with the `mapping` of data_to_es.py, without replicas and
+   without refresh during the load;
+2. bulk-loads the file (e.g. compiled.json) through a generator, the records being read one by one;
+3. restores the replicas and refresh interval, refreshes and force-merges the new index;
+4. points the ES_INDEX alias to the new index, in one atomic update_aliases call.
+Readers of ES_INDEX only see the old index until the new one is complete. If any document fails, the new index is deleted
+and the alias isn't touched. The first rebuild replaces ES_INDEX, if it's still a plain index, by the alias.
+The previous versioned indices are deleted, except the last REBUILD_KEEP_INDICES ones (to roll back by moving the alias).
+
+Usage:
+    python rebuild_index.py <compiled.json> [--keep N] [--thread-count N]
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import datetime
+from itertools import islice
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from directory_scraper.src.elasticsearch_upload import data_to_es
+from directory_scraper.src.elasticsearch_upload.data_to_es import (
+    ES_INDEX, DISCORD_WEBHOOK_URL, THREAD_ID, BULK_THREAD_COUNT, mapping, index_actions, format_failures
+)
+from directory_scraper.src.data_processing.compile_data import iter_json_array
+from directory_scraper.src.utils.record_hash import HASH_FIELD, HASH_BATCH_SIZE, hash_records
+from directory_scraper.src.utils.record_identity import iter_document_ids
+from directory_scraper.src.utils.discord_bot import send_discord_notification
+
+REBUILD_KEEP_INDICES = 1  # previous versioned indices kept after the swap
+DEFAULT_REPLICAS = "1"  # restored when ES_INDEX doesn't exist yet
+FORCE_MERGE_SEGMENTS = 1
+
+def get_versioned_index_name(timestamp=None):
+    return f"{ES_INDEX}-{(timestamp or datetime.now()).strftime('%Y%m%d%H%M%S')}"
+
+def get_live_index_settings():
+    """Returns (number_of_replicas, refresh_interval) of the index behind ES_INDEX, refresh_interval being None if not set."""
+    es = data_to_es.get_es_client()
+    if not es.indices.exists(index=ES_INDEX):
+        return DEFAULT_REPLICAS, None
+    settings = next(iter(es.indices.get_settings(index=ES_INDEX).values()))["settings"]["index"]
+    return settings.get("number_of_replicas", DEFAULT_REPLICAS), settings.get("refresh_interval")
+
+def iter_rebuild_actions(data_file, index, batch_size=HASH_BATCH_SIZE):
+    """Yields the index actions of the records of `data_file`, read one by one and hashed by batches, under their stable _id."""
+    records = iter_json_array(data_file)
+    seen_ids = {}  # numbering of the records with the same fingerprint, over all batches
+    while batch := list(islice(records, batch_size)):
+        for doc, sha_256_hash, document_id in zip(batch, hash_records(batch, batch_size), iter_document_ids(batch, seen_ids)):
+            doc[HASH_FIELD] = sha_256_hash
+            yield {"_index": index, "_id": document_id, "_source": doc}
+
+def swap_alias(new_index):
+    """
+    Points ES_INDEX to `new_index` in one update_aliases call. If ES_INDEX is a plain index (before the first rebuild),
+    it is removed in the same call, since an alias can't have the name of an index.
+    Returns the indices the alias pointed to before.
+    """
+    es = data_to_es.get_es_client()
+    actions = []
+    previous_indices = []
+    if es.indices.exists_alias(name=ES_INDEX):
+        previous_indices = list(es.indices.get_alias(name=ES_INDEX).keys())
+        actions += [{"remove": {"index": index, "alias": ES_INDEX}} for index in previous_indices]
+    elif es.indices.exists(index=ES_INDEX):
+        actions.append({"remove_index": {"index": ES_INDEX}})
+    actions.append({"add": {"index": new_index, "alias": ES_INDEX}})
+    es.indices.update_aliases(actions=actions)
+    return previous_indices
+
+def delete_old_indices(current_index, keep=REBUILD_KEEP_INDICES):
+    """Deletes the versioned indices of ES_INDEX older than the last `keep` ones before `current_index`."""
+    es = data_to_es.get_es_client()
+    # Only `<ES_INDEX>-<timestamp>`, ES_INDEX-* may match other indices (e.g. the logs index)
+    pattern = re.compile(re.escape(ES_INDEX) + r"-\d{14}")
+    versioned = sorted(index for index in es.indices.get(index=f"{ES_INDEX}-*").keys() if pattern.fullmatch(index) and index < current_index)
+    to_delete = versioned[:max(0, len(versioned) - keep)]
+    for index in to_delete:
+        es.indices.delete(index=index)
+        print(f'Deleted old index "{index}"')
+    return to_delete
+
+def rebuild_index(data_file, keep=REBUILD_KEEP_INDICES, thread_count=BULK_THREAD_COUNT):
+    """
+    Loads `data_file` in a new versioned index and swaps the ES_INDEX alias to it.
+    Returns a summary. Raises if the load fails (the new index is then deleted, ES_INDEX is unchanged).
+    """
+    es = data_to_es.get_es_client()
+    new_index = get_versioned_index_name()
+    replicas, refresh_interval = get_live_index_settings()
+
+    es.indices.create(index=new_index, mappings=mapping, settings={"number_of_replicas": 0, "refresh_interval": "-1"})
+    print(f'Created index "{new_index}", loading {data_file}...')
+    try:
+        success, failures = index_actions(iter_rebuild_actions(data_file, new_index), thread_count=thread_count)
+        if failures:
+            raise RuntimeError(f"{len(failures)} documents failed\n{format_failures(failures)}")
+
+        es.indices.put_settings(index=new_index, settings={"number_of_replicas": replicas, "refresh_interval": refresh_interval})
+        es.indices.refresh(index=new_index)
+        es.indices.forcemerge(index=new_index, max_num_segments=FORCE_MERGE_SEGMENTS)
+        doc_count = es.count(index=new_index)["count"]
+        print(f'Loaded {success} actions, {doc_count} documents in "{new_index}"')
+    except BaseException:
+        es.options(ignore_status=404).indices.delete(index=new_index)
+        print(f'Rebuild failed, deleted "{new_index}". "{ES_INDEX}" is unchanged.')
+        raise
+
+    previous_indices = swap_alias(new_index)
+    print(f'Alias "{ES_INDEX}" -> "{new_index}" (was: {", ".join(previous_indices) or "-"})')
+    delete_old_indices(new_index, keep)
+    return f"🛢️ {ES_INDEX} rebuilt from {os.path.basename(data_file)}: {doc_count} documents in {new_index}"
+
+def main(data_file, keep=REBUILD_KEEP_INDICES, thread_count=BULK_THREAD_COUNT):
+    if not data_to_es.get_elasticsearch_info():
+        print("Skipping rebuild due to Elasticsearch connection issues.")
+        return False
+    try:
+        summary = rebuild_index(data_file, keep, thread_count)
+    except Exception as e:
+        summary = f"❗🛢️ {ES_INDEX} rebuild from {os.path.basename(data_file)} failed: {e}"
+    print(summary)
+    if DISCORD_WEBHOOK_URL:
+        send_discord_notification(summary, DISCORD_WEBHOOK_URL, THREAD_ID)
+    return not summary.startswith("❗")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild ES_INDEX from a compiled JSON file in a new index, then swap the alias.")
+    parser.add_argument("data_file", help="JSON array of clean records, e.g. compiled.json")
+    parser.add_argument("--keep", type=int, default=REBUILD_KEEP_INDICES, help="Previous versioned indices to keep.")
+    parser.add_argument("--thread-count", type=int, default=BULK_THREAD_COUNT, help="Bulk requests in flight.")
+    args = parser.parse_args()
+    sys.exit(0 if main(args.data_file, args.keep, args.thread_count) else 1)
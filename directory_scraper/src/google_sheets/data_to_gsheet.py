@@ -5,7 +5,6 @@
 - To ensure an organization is recognized as valid, update `gsheets_config.json` with the `org_id` and its corresponding Google Sheet ID.
 """
 
-import json
 import os
 import argparse
 import sys
@@ -13,7 +12,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../.
 from directory_scraper.src.google_sheets.google_sheets_utils import GoogleSheetManager
 from directory_scraper.src.google_sheets.process_data import validate_data, group_data_by_org_id, load_data_into_sheet, update_data_in_sheet, get_gsheet_id
 from directory_scraper.src.utils.file_utils import load_spreadsheets_config
-from directory_scraper.path_config import DEFAULT_CLEAN_DATA_FOLDER
+from directory_scraper.src.utils import json_codec
+from directory_scraper.src.utils.record_hash import get_record_hashes
+from directory_scraper.path_config import DEFAULT_CLEAN_DATA_FOLDER, DEFAULT_LOG_DIR
 from dotenv import load_dotenv
 from directory_scraper.src.utils.discord_bot import send_discord_notification
 
@@ -27,6 +28,7 @@ GOOGLE_SERVICE_ACCOUNT_CREDS = os.getenv('GOOGLE_SERVICE_ACCOUNT_CREDS')
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DATA_FOLDER = os.path.join(BASE_DIR, DEFAULT_CLEAN_DATA_FOLDER)
+UPLOADED_DIGESTS_FILE = os.path.join(DEFAULT_LOG_DIR, "gsheet_uploaded_digests.json")  # {sheet_id: {org_id: digest of its record hashes}}
 
 def load_org_data(data_folder, data_file):
     """
@@ -37,17 +39,37 @@ def load_org_data(data_folder, data_file):
         print(f"Data file {data_file} not found in {data_folder}. Skipping.")
         return None
 
-    with open(file_path, 'r') as f:
-        data = json.load(f)
+    data = json_codec.load_file(file_path)
     
     return validate_data(data)
 
-def main_process_org(data_folder, org_id, sheet_id, operation, add_timestamp, org_data):
+def load_uploaded_digests():
+    try:
+        return json_codec.load_file(UPLOADED_DIGESTS_FILE)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_uploaded_digests(uploaded_digests):
+    os.makedirs(os.path.dirname(UPLOADED_DIGESTS_FILE), exist_ok=True)
+    json_codec.dump_file(uploaded_digests, UPLOADED_DIGESTS_FILE, json_codec.PRETTY)
+
+def main_process_org(data_folder, org_id, sheet_id, operation, add_timestamp, org_data, record_hashes=None):
+    """
+    'load' clears and loads the sheet. 'update' replaces the rows of each org_id, skipping the org_ids whose
+    record hashes didn't change since the last upload to this sheet (when `record_hashes` are given).
+    """
     google_sheets_manager = GoogleSheetManager(GOOGLE_SERVICE_ACCOUNT_CREDS, sheet_id, SCOPES)
+    all_uploaded_digests = load_uploaded_digests()
     if operation == "load":
         row_summary = load_data_into_sheet(google_sheets_manager, org_data, add_timestamp=True, separate_grouped_data_by_sheet=False, group_key="division_name")
+        all_uploaded_digests.pop(sheet_id, None)  # the next update compares with nothing
+        save_uploaded_digests(all_uploaded_digests)
     elif operation == "update":
-        row_summary = update_data_in_sheet(google_sheets_manager, org_data, add_timestamp)
+        uploaded_digests = all_uploaded_digests.setdefault(sheet_id, {})
+        try:
+            row_summary = update_data_in_sheet(google_sheets_manager, org_data, add_timestamp, record_hashes, uploaded_digests)
+        finally:
+            save_uploaded_digests(all_uploaded_digests)  # the org_ids uploaded before a failure are kept
     else:
         print("Wrong operation. Only 'load' or 'update' is allowed.")
         return 0
@@ -96,7 +118,8 @@ def process_specific_org(data_folder, ref_name, data_file, org_id, operation="up
         print(f"\n 🟡 Processing: {ref_name} (org_id: {org_id})")
         if DISCORD_WEBHOOK_URL:
             send_discord_notification(f"\n 🟡 Processing upload to gsheet: {ref_name} (org_id: {org_id})", DISCORD_WEBHOOK_URL, THREAD_ID)
-        rows_processed = main_process_org(data_folder, org_id, sheet_id, operation, add_timestamp, org_data)
+        record_hashes = get_record_hashes(os.path.join(data_folder, data_file), org_data)  # from the sidecar written by process_data
+        rows_processed = main_process_org(data_folder, org_id, sheet_id, operation, add_timestamp, org_data, record_hashes)
         # print(f"✅ {org_id}: {rows_processed} rows inserted.")
         return rows_processed
     
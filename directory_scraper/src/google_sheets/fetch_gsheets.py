@@ -1,5 +1,4 @@
 import os
-import json
 from directory_scraper.src.google_sheets.google_sheets_utils import GoogleSheetManager
 from dotenv import load_dotenv
 from directory_scraper.src.utils.file_utils import load_spreadsheets_config
@@ -10,6 +9,7 @@ from directory_scraper.path_config import DEFAULT_GSHEETS_OUTPUT_FOLDER, DEFAULT
 import time
 import random
 from directory_scraper.src.utils.discord_bot import send_discord_notification
+from directory_scraper.src.utils import json_codec
 
 load_dotenv()
 
@@ -65,8 +65,7 @@ def fetch_and_store_gsheet(sheet_id, sheet_name, file_name, output_folder, max_r
 
             # Save data to JSON file
             output_file_path = os.path.join(output_folder, file_name)
-            with open(output_file_path, "w") as json_file:
-                json.dump(data_as_dict, json_file, indent=4)
+            json_codec.dump_file(data_as_dict, output_file_path, json_codec.ROWS)
             print(f"Successfully fetched gsheet: {file_name}")
             # print(f"Successfully fetched and stored data: {output_file_path}")
             return "success", f"{file_name}: Success"
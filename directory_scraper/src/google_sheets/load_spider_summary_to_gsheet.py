@@ -1,4 +1,3 @@
-import json
 import os
 from datetime import datetime
 from dotenv import load_dotenv
@@ -8,56 +7,78 @@ from directory_scraper.path_config import DEFAULT_LOG_DIR
 from directory_scraper.src.google_sheets.google_sheets_utils import GoogleSheetManager
 from directory_scraper.src.google_sheets.process_data import retry_with_backoff
 from directory_scraper.src.google_sheets.data_to_gsheet import get_gsheet_id
+from directory_scraper.src.data_processing.spider_history import SPIDER_SUMMARY_FILE, load_spider_summary as load_spider_history
 
 load_dotenv()
 CREDS_FILE = os.getenv("GOOGLE_SERVICE_ACCOUNT_CREDS")
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
 LOG_DIR = os.path.join(DEFAULT_LOG_DIR)
-SPIDER_SUMMARY_FILE = os.path.join(LOG_DIR, 'spider_summary.json')
+
+def get_uploaded_runs(existing_data):
+    """
+    Returns the (spider_name, datetime_created) of every spider run already in the sheet, and the sheet's last header row.
+    A header row is written each time the columns change, so each row is read with the header above it.
+    """
+    uploaded, header = set(), None
+    for row in existing_data:
+        if "spider_name" in row and "datetime_created" in row:
+            header = row
+            continue
+        if header is None:
+            continue
+        name_index, created_index = header.index("spider_name"), header.index("datetime_created")
+        if len(row) > max(name_index, created_index):
+            uploaded.add((row[name_index], row[created_index]))
+    return uploaded, header
 
 def load_spider_summary(ref_name, sheet_id, data, add_timestamp=True):
+    """Appends the spider runs in `data` that are not in the "Summary Logs" sheet yet."""
     if not data:
         print("No data to load into Google Sheets.")
         return
 
-    row_count_summary = {}
-
     retry_with_backoff(google_sheets_manager.switch_to_sheet, "Summary Logs")
 
-    header = list(data[0].keys())
+    existing_data = google_sheets_manager.get_all_data()
+    uploaded_runs, existing_header = get_uploaded_runs(existing_data or [])
+    new_entries = [
+        spider_entry for spider_entry in data
+        if (spider_entry.get("spider_name"), spider_entry.get("datetime_created")) not in uploaded_runs
+    ]
+    if not new_entries:
+        print("All spider runs are already in Google Sheets.")
+        return
+
+    header = []
+    for spider_entry in new_entries:
+        header.extend(key for key in spider_entry if key not in header)
     if add_timestamp:
         header.append('last_uploaded')
-        
-    existing_data = google_sheets_manager.get_all_data()
-    if not existing_data or existing_data[0] != header:
+
+    if existing_header != header:
         retry_with_backoff(google_sheets_manager.append_rows, [header])
 
     rows_to_upload = []
-    for spider_entry in data:
-        row = list(spider_entry.values())
+    for spider_entry in new_entries:
+        row = [spider_entry.get(key) for key in header if key != 'last_uploaded']
         if add_timestamp:
             row.append(datetime.now().isoformat())
         rows_to_upload.append(row)
 
     retry_with_backoff(google_sheets_manager.append_rows, rows_to_upload)
+    print(f"Uploaded {len(rows_to_upload)} new spider runs ({len(data) - len(rows_to_upload)} already uploaded).")
 
 if __name__ == "__main__":
 
     if not os.path.exists(DEFAULT_LOG_DIR):
         os.makedirs(DEFAULT_LOG_DIR)
 
-    if not os.path.exists(SPIDER_SUMMARY_FILE):
-        print(f"Error: JSON file '{SPIDER_SUMMARY_FILE}' not found.")
+    data = load_spider_history()
+    if not data:
+        print(f"Error: No spider runs found in '{SPIDER_SUMMARY_FILE}'.")
         exit(1)
 
-    with open(SPIDER_SUMMARY_FILE, "r") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            print("Error: Failed to decode JSON file.")
-            exit(1)
-
     ref_name = "spider_summary"
     sheet_id = get_gsheet_id(ref_name)
     google_sheets_manager = GoogleSheetManager(CREDS_FILE, sheet_id, SCOPES)
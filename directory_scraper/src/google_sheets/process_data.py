@@ -6,6 +6,7 @@ import os
 from collections import defaultdict
 import random
 from directory_scraper.src.utils.discord_bot import send_discord_notification
+from directory_scraper.src.utils.record_hash import digest_hashes
 
 DISCORD_WEBHOOK_URL = os.getenv('DISCORD_WEBHOOK_URL') 
 THREAD_ID = os.getenv('THREAD_ID')
@@ -162,14 +163,23 @@ def load_data_into_sheet(google_sheets_manager, data, separate_grouped_data_by_s
 
     return row_count_summary
 
-def update_data_in_sheet(google_sheets_manager, data, add_timestamp=True):
+def update_data_in_sheet(google_sheets_manager, data, add_timestamp=True, record_hashes=None, uploaded_digests=None):
     """
     Update data in Google Sheet.
     1. Identify org_id to be updated.
     2. Delete all rows for the org_id.
     3. Insert/Append new rows for the org_id, including timestamp.
+
+    With the `record_hashes` of `data` (see record_hash.py) and `uploaded_digests` ({org_id: digest} of the last upload to this sheet),
+    the org_ids whose records didn't change are skipped. `uploaded_digests` is updated with the org_ids uploaded.
     """
     grouped_data = group_data_by_org_id(data)
+    org_digests = {}
+    if record_hashes is not None:
+        grouped_hashes = {}
+        for row, record_hash in zip(data, record_hashes):
+            grouped_hashes.setdefault(row['org_id'], []).append(record_hash)
+        org_digests = {org_id: digest_hashes(hashes) for org_id, hashes in grouped_hashes.items()}
     total_orgs = len(grouped_data)
     print(f"Total number of org_id to update: {total_orgs}")
 
@@ -192,6 +202,9 @@ def update_data_in_sheet(google_sheets_manager, data, add_timestamp=True):
         google_sheets_manager.append_rows([header])  # Add header if sheet is blank
 
     for org_index, (org_id, group_data) in enumerate(grouped_data.items(), start=1):
+        if uploaded_digests is not None and org_id in org_digests and uploaded_digests.get(org_id) == org_digests[org_id]:
+            print(f"\nNo changes for org_id: {org_id} ({org_index}/{total_orgs}), skipping.")
+            continue
         print(f"\nUpdating org_id: {org_id} ({org_index}/{total_orgs})")
         
         # Convert group_data to rows
@@ -206,6 +219,8 @@ def update_data_in_sheet(google_sheets_manager, data, add_timestamp=True):
 
         # Step 2: Insert new rows for this org_id
         google_sheets_manager.append_rows(group_rows)
+        if uploaded_digests is not None and org_id in org_digests:
+            uploaded_digests[org_id] = org_digests[org_id]
 
 def get_gsheet_id(ref_name):
     """Retrieve the Google Sheet ID for reference name (org_id) from the GSHEET_ID_MAPPING environment variable."""
@@ -39,7 +39,12 @@ async def upload_to_elasticsearch(sheet_id: str, user_name: str) -> dict:
 
         if previous_hash == current_hash:
             logging.info("Changes detected, cleaning data and uploading to ElasticSearch")
-            elasticsearch_upload(cleaned_data)
+            # An in-memory file: its record hashes, computed by clean_data, are reused by the upload
+            elasticsearch_upload([{
+                "file_name": f"gsheet_{sheet_id}.json",
+                "file_data": cleaned_data,
+                "record_hashes": gsheet_data.get("record_hashes"),
+            }])
 
     except Exception as e:
         logging.error(e)
@@ -6,10 +6,11 @@ import pandas as pd
 from pathlib import Path
 from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
-from directory_scraper.src.elasticsearch_upload.data_to_es import ES_LOG_INDEX, es
+from directory_scraper.src.elasticsearch_upload.data_to_es import ES_LOG_INDEX, get_es_client
 from directory_scraper.src.google_sheets_api.utils.utils_gsheet import GoogleSheetManager
 from directory_scraper.src.data_processing.process_data import data_processing_pipeline
 from directory_scraper.src.elasticsearch_upload.data_to_es import calculate_sha256_for_file
+from directory_scraper.src.utils.ref_data import REF_DATA
 
 # Setup
 load_dotenv()
@@ -23,12 +24,16 @@ logging.basicConfig(filename="gsheet_api.log", filemode="a", level=logging.INFO,
 
 # Replaces process_json_data from data_processing.process_data
 # Function now takes json object as the input, instead of a file path
-def process_json_data(input_data):
-    """Function to process a single JSON file and return the result"""
+def process_json_data(input_data, record_hashes=None):
+    """
+    Function to process a single JSON file and return the result.
+    The hashes of the processed records are appended to `record_hashes` if given (see data_processing_pipeline).
+    """
     try:
         if isinstance(input_data, list):
-            processed_data = data_processing_pipeline(input_data)
-            
+            processed_data = data_processing_pipeline(input_data, record_hashes=record_hashes)
+            REF_DATA.log_stats(logger)
+
             return processed_data
         else:
             logging.warning(f"Invalid JSON format in input_data, skipping file.")
@@ -39,7 +44,7 @@ def process_json_data(input_data):
 
 
 def check_document_hash(sheet_id:str) -> bool:
-    hash_search = es.search(
+    hash_search = get_es_client().search(
         index=ES_LOG_INDEX,
         query={"match": {"sheet_id": {"query": sheet_id}}},
         sort=[{"timestamp": {"order": "desc", "mode": "max"}}],
@@ -76,8 +81,10 @@ def clean_data(sheet_id:str, user_name:str) -> dict:
     # Extract latest hash from edit logs for comparison
     previous_hash = check_document_hash(sheet_id=sheet_id)
 
+    record_hashes = None
     if previous_hash == document_hash:
-        cleaned_data = process_json_data(sheet_df.to_dict(orient="records"))
+        record_hashes = []
+        cleaned_data = process_json_data(sheet_df.to_dict(orient="records"), record_hashes)
         
         # Append new hash to "Edit Logs" index
         edit_log = {
@@ -90,7 +97,7 @@ def clean_data(sheet_id:str, user_name:str) -> dict:
         log_id = f"{current_time}:{sheet_id}:{document_hash}"
 
         try:
-            es.index(
+            get_es_client().index(
                 index="edit_logs",
                 id=log_id,
                 document=edit_log
@@ -99,12 +106,12 @@ def clean_data(sheet_id:str, user_name:str) -> dict:
 
         except Exception as e:
             logging.error(f"Error, unable to update edit log. {e}")
-            return {"cleaned_data": None, "document_hash": None, "previous_hash": None, "current_hash": None}
+            return {"cleaned_data": None, "record_hashes": None, "document_hash": None, "previous_hash": None, "current_hash": None}
     else:
         cleaned_data = sheet_df.to_dict(orient="records")
         logging.info("No changes made.")
 
-    return {"cleaned_data": cleaned_data, "document_hash": document_hash, "previous_hash": previous_hash, "current_hash": document_hash}
+    return {"cleaned_data": cleaned_data, "record_hashes": record_hashes, "document_hash": document_hash, "previous_hash": previous_hash, "current_hash": document_hash}
 
 if __name__ == "__main__":
     ROOT_DIR = Path(os.path.abspath(__file__)).parents[2]
@@ -1,6 +1,7 @@
 import json
 import os
 import logging
+from directory_scraper.src.utils.ref_data import REF_DATA, ORG_MAPPING_FILE, GSHEETS_CONFIG_FILE
 
 def load_json_file(file_name):
     """
@@ -17,26 +18,24 @@ def load_mindef_units():
     return load_json_file('mindef_units.json')
 
 def load_org_mapping():
-    """Load and return the org_mapping.json file."""
-    org_mapping_file = os.path.join(os.path.dirname(__file__), 'json', 'org_mapping.json')
+    """Load and return the org_mapping.json file (cached, see ref_data.py)."""
+    org_mapping_file = REF_DATA.path(ORG_MAPPING_FILE)
     try:
-        with open(org_mapping_file, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        return REF_DATA.get(ORG_MAPPING_FILE)
     except FileNotFoundError:
         logging.error(f"Error: Mapping file '{org_mapping_file}' not found.")
         return None
     except json.JSONDecodeError:
         logging.error(f"Error: Could not decode JSON in '{org_mapping_file}'.")
         return None
-    
+
 def load_spreadsheets_config():
     """
-    Loads the spreadsheets configuration from the 'gsheets_config.json' file.
+    Loads the spreadsheets configuration from the 'gsheets_config.json' file (cached, see ref_data.py).
     """
-    spreadsheets_config_file = os.path.join(os.path.dirname(__file__), 'json', 'gsheets_config.json')
+    spreadsheets_config_file = REF_DATA.path(GSHEETS_CONFIG_FILE)
     try:
-        with open(spreadsheets_config_file, 'r') as f:
-            return json.load(f)
+        return REF_DATA.get(GSHEETS_CONFIG_FILE)
     except FileNotFoundError:
         print(f"Error: {spreadsheets_config_file} not found.")
         return {}
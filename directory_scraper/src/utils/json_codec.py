@@ -0,0 +1,80 @@
+"""
+JSON codec of the data files (spider outputs and backups, cleaned data, compiled.json, es_changes_log.ndjson, Sheets fetches).
+
+orjson is used when it is installed, the standard json module otherwise. For the scraped data (str, int, bool, None, lists and dicts)
+both give the same bytes (only floats in exponent notation differ: 1e20 / 1e+20). Non-ASCII characters are written as is, in UTF-8.
+Three layouts:
+- COMPACT: no whitespace
+- PRETTY: 2-space indent, for files read by people (logs)
+- ROWS: a JSON array with one compact item per line, e.g. `[\\n{...},\\n{...}\\n]`. This is the layout of compiled.json, and the
+  one data_to_es hashes, so a file written with ROWS has the same SHA-256 as its records. About 70% of the size of indent=4.
+
+`dumps` returns bytes, and files are read and written as bytes. Decoding errors are json.JSONDecodeError with both backends.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COMPACT = "compact"
+PRETTY = "pretty"
+ROWS = "rows"
+
+def get_backend():
+    return "orjson" if orjson is not None else "json"
+
+def dumps(obj, pretty=False, sort_keys=False, default=None):
+    """Serialises `obj` to UTF-8 bytes, compact or with a 2-space indent."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except orjson.JSONEncodeError:
+            pass  # e.g. an int over 64 bits, which the json module handles
+    if pretty:
+        text = json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=sort_keys, default=default)
+    else:
+        text = json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys, default=default)
+    return text.encode("utf-8")
+
+def loads(data):
+    """Parses JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def iter_rows(items, default=None):
+    """Yields the chunks of `items` in the ROWS layout (the opening bracket, one line per item, the closing bracket)."""
+    yield b"[\n"
+    empty = True
+    for item in items:
+        yield (b"" if empty else b",\n") + dumps(item, default=default)
+        empty = False
+    yield b"]" if empty else b"\n]"
+
+def dumps_rows(items, default=None):
+    """Serialises a list in the ROWS layout."""
+    return b"".join(iter_rows(items, default))
+
+def dump_file(obj, file_path, layout=COMPACT, default=None):
+    """
+    Writes `obj` to `file_path` in the given layout (COMPACT, PRETTY or ROWS).
+    ROWS accepts any iterable of items (e.g. a generator), written as it's consumed. Returns the number of bytes written.
+    """
+    with open(file_path, "wb") as f:
+        if layout == ROWS:
+            return sum(f.write(chunk) for chunk in iter_rows(obj, default))
+        if layout not in (COMPACT, PRETTY):
+            raise ValueError(f"Unknown layout '{layout}', expected '{COMPACT}', '{PRETTY}' or '{ROWS}'.")
+        return f.write(dumps(obj, pretty=layout == PRETTY, default=default))
+
+def load_file(file_path):
+    """Reads and parses a JSON file."""
+    with open(file_path, "rb") as f:
+        return loads(f.read())
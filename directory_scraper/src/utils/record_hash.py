@@ -0,0 +1,86 @@
+"""
+Canonical record hash: the SHA-256 stored in the `sha_256_hash` field of the ES documents.
+
+The hash is computed once, at the end of data_processing_pipeline, and saved in a sidecar next to the cleaned file
+(`<file>.json.hashes`). The sidecar also holds the SHA-256 of the file bytes, and the size and mtime of the file when it was
+written; it's only used while the file is unchanged. data_to_es (document diff and file SHA check) and data_to_gsheet
+(skipping unchanged orgs) read the sidecar instead of hashing again, and fall back to hashing the records.
+"""
+import hashlib
+import json
+import os
+from directory_scraper.src.utils import json_codec
+
+HASH_FIELD = "sha_256_hash"
+COLUMNS_TO_HASH = [
+    "org_sort", "org_id", "org_name", "org_type", "division_sort",
+    "division_name", "subdivision_name", "position_sort", "position_name",
+    "person_name", "person_email", "person_phone", "person_fax",
+    "parent_org_id"
+]
+HASH_BATCH_SIZE = 5000
+SIDECAR_SUFFIX = ".hashes"
+
+# json.dumps(sort_keys=True) builds a new encoder on every call, one encoder is reused instead (same output)
+_ENCODER = json.JSONEncoder(sort_keys=True)
+
+def hash_record(record):
+    """
+    SHA-256 of the COLUMNS_TO_HASH of a record, as `json.dumps(..., sort_keys=True)`.
+    Must stay byte for byte the same: the hashes already stored in ES were computed this way.
+    """
+    return hash_records([record])[0]
+
+def iter_record_hashes(records, batch_size=HASH_BATCH_SIZE):
+    """Yields the hash of each record, encoding and hashing the records by batches of `batch_size`."""
+    encode, sha256 = _ENCODER.encode, hashlib.sha256
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        payloads = [encode({col: record[col] for col in COLUMNS_TO_HASH if col in record}).encode("utf-8") for record in batch]
+        yield from (sha256(payload).hexdigest() for payload in payloads)
+
+def hash_records(records, batch_size=HASH_BATCH_SIZE):
+    """Returns the list of the hashes of `records` (a list), in order."""
+    return list(iter_record_hashes(records, batch_size))
+
+def digest_hashes(record_hashes):
+    """One SHA-256 for a list of record hashes, e.g. to tell if a group of records changed."""
+    return hashlib.sha256("\n".join(record_hashes).encode("utf-8")).hexdigest()
+
+def get_sidecar_path(data_file):
+    return data_file + SIDECAR_SUFFIX
+
+def write_sidecar(data_file, record_hashes, file_sha256):
+    """Saves the record hashes and file SHA-256 of `data_file`, which must have just been written."""
+    stat = os.stat(data_file)
+    sidecar = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "file_sha256": file_sha256, "record_hashes": record_hashes}
+    json_codec.dump_file(sidecar, get_sidecar_path(data_file))
+
+def load_sidecar(data_file):
+    """Returns the sidecar of `data_file`, or None if there is none or the file changed since it was written."""
+    try:
+        sidecar = json_codec.load_file(get_sidecar_path(data_file))
+        stat = os.stat(data_file)
+    except (FileNotFoundError, ValueError):
+        return None
+    if sidecar.get("size") != stat.st_size or sidecar.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return sidecar
+
+def get_record_hashes(data_file, records):
+    """The hashes of the records of `data_file` (already loaded as `records`), from its sidecar if it's up to date."""
+    sidecar = load_sidecar(data_file)
+    if sidecar and len(sidecar["record_hashes"]) == len(records):
+        return sidecar["record_hashes"]
+    return hash_records(records)
+
+def get_file_sha256(data_file):
+    """The SHA-256 of the bytes of `data_file`, from its sidecar if it's up to date."""
+    sidecar = load_sidecar(data_file)
+    if sidecar:
+        return sidecar["file_sha256"]
+    sha256 = hashlib.sha256()
+    with open(data_file, "rb") as f:
+        while chunk := f.read(1 << 20):
+            sha256.update(chunk)
+    return sha256.hexdigest()
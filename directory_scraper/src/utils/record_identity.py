@@ -0,0 +1,55 @@
+"""
+Stable identity of the records: the ES `_id` of a person doesn't depend on where they are listed.
+
+The former `_id` was `{org_id}_{division_sort:03}_{position_sort:06}`: inserting one person near the top of a division shifted
+the `_id` of everyone listed after them, and the ES diff saw all of them as deleted and added again. The `_id` is now
+`{org_id}-{fingerprint}`, the fingerprint being a hash of the normalised (org_id, division_name, person_name, person_email).
+The sort fields (org_sort, division_sort, position_sort) are plain attributes, a change of position is an update of the document.
+While migrating, a document moved from its legacy `_id` to its stable one lists the legacy `_id` in its `id_aliases` field.
+
+Records with the same fingerprint (e.g. vacant positions without name or email) are told apart by their order in the data:
+the second one gets `-2`, the third `-3`, and so on.
+"""
+import hashlib
+import re
+import unicodedata
+
+IDENTITY_FIELDS = ["org_id", "division_name", "person_name", "person_email"]
+SORT_FIELDS = ["org_sort", "division_sort", "position_sort"]
+FINGERPRINT_LENGTH = 16  # hex characters (64 bits), enough within an org
+ID_ALIASES_FIELD = "id_aliases"  # former `_id`s of a document, kept while consumers move to the stable ones
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalise(value):
+    """Case, width and whitespace insensitive form of a field: 'Ahmad  bin ALI ' and 'ahmad bin ali' are the same."""
+    if value is None:
+        return ""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", str(value))).strip().casefold()
+
+def get_fingerprint(record):
+    """SHA-256 (hex) of the normalised IDENTITY_FIELDS of a record."""
+    key = "\x1f".join(normalise(record.get(field)) for field in IDENTITY_FIELDS)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def get_legacy_document_id(record):
+    """The former `_id`, derived from the sort fields."""
+    return f"{record.get('org_id', '')}_{str(record.get('division_sort', '')).zfill(3)}_{str(record.get('position_sort', '')).zfill(6)}"
+
+def get_stable_id_pattern(org_id):
+    """Matches the stable `_id`s of `org_id` (and not its legacy ones)."""
+    return re.compile(re.escape(str(org_id)) + r"-[0-9a-f]{%d}(?:-\d+)?" % FINGERPRINT_LENGTH)
+
+def iter_document_ids(records, seen=None):
+    """
+    Yields the stable `_id` of each record, in order. The n-th record (n >= 2) with a fingerprint already seen gets `-n`.
+    Pass the same `seen` dict to continue the numbering over several calls (e.g. batches of one stream).
+    """
+    seen = {} if seen is None else seen
+    for record in records:
+        base_id = f"{record.get('org_id', '')}-{get_fingerprint(record)[:FINGERPRINT_LENGTH]}"
+        seen[base_id] = seen.get(base_id, 0) + 1
+        yield base_id if seen[base_id] == 1 else f"{base_id}-{seen[base_id]}"
+
+def get_document_ids(records):
+    return list(iter_document_ids(records))
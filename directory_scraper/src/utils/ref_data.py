@@ -0,0 +1,78 @@
+"""
+Registry of the reference data files in utils/json (org_mapping.json, gsheets_config.json).
+
+- A file is only read the first time it is needed, then kept in memory.
+- On every access the file's mtime is checked, and the file is read again if it changed.
+- `get_stats()` counts, per file, the reads done and the reads saved by the cache.
+
+The registry is shared by the whole process (process_data, data_to_gsheet, fetch_gsheets and the API all use REF_DATA
+through file_utils). Returned values are the cached objects themselves, callers must not modify them.
+"""
+import json
+import os
+import logging
+import threading
+
+JSON_DIR = os.path.join(os.path.dirname(__file__), 'json')
+
+ORG_MAPPING_FILE = 'org_mapping.json'
+GSHEETS_CONFIG_FILE = 'gsheets_config.json'
+
+class RefDataRegistry:
+    """
+    Lazily loaded, mtime-checked cache of JSON files.
+
+    Args:
+        json_dir (str): Folder the file names are relative to.
+    """
+    def __init__(self, json_dir=JSON_DIR):
+        self.json_dir = json_dir
+        self._entries = {}  # file name -> (mtime_ns, data)
+        self._stats = {}  # file name -> {"reads": int, "saved_reads": int}
+        self._lock = threading.Lock()
+
+    def path(self, file_name):
+        return os.path.join(self.json_dir, file_name)
+
+    def get(self, file_name):
+        """
+        Returns the parsed content of `file_name`, read from disk only if it isn't cached or its mtime changed.
+        Raises FileNotFoundError or json.JSONDecodeError like a plain read would.
+        """
+        file_path = self.path(file_name)
+        mtime_ns = os.stat(file_path).st_mtime_ns
+        with self._lock:
+            stats = self._stats.setdefault(file_name, {"reads": 0, "saved_reads": 0})
+            entry = self._entries.get(file_name)
+            if entry and entry[0] == mtime_ns:
+                stats["saved_reads"] += 1
+                return entry[1]
+
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if entry:
+                logging.info(f"Reference data '{file_name}' changed on disk, reloaded.")
+            self._entries[file_name] = (mtime_ns, data)
+            stats["reads"] += 1
+            return data
+
+    def clear(self):
+        """Drops every cached file, they are read again on next access."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Returns {file name: {"reads": n, "saved_reads": n}} since the registry was created or last reset."""
+        with self._lock:
+            return {file_name: dict(stats) for file_name, stats in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def log_stats(self, logger=logging):
+        """Logs the reads done and saved for each file."""
+        for file_name, stats in self.get_stats().items():
+            logger.info(f"Reference data '{file_name}': {stats['reads']} file reads, {stats['saved_reads']} saved by the cache.")
+
+REF_DATA = RefDataRegistry()
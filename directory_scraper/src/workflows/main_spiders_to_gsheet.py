@@ -15,10 +15,12 @@ import subprocess
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
 from directory_scraper.path_config import DEFAULT_SPIDERS_OUTPUT_FOLDER, DEFAULT_CLEAN_DATA_FOLDER
 from directory_scraper.src.data_processing.process_data import process_all_json_files
+from directory_scraper.src.data_processing.validation_report import ValidationReport, get_deltas, load_previous_report, format_deltas
 from directory_scraper.src.data_processing.run_spiders import main as run_spiders_main
 # from directory_scraper.src.elasticsearch_upload.data_to_es import main as data_to_es_main
 from directory_scraper.src.google_sheets.data_to_gsheet import  process_specific_org
 from directory_scraper.src.utils.file_utils import load_spreadsheets_config
+from directory_scraper.src.utils.ref_data import REF_DATA
 from directory_scraper.src.utils.discord_bot import send_discord_notification
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -63,7 +65,17 @@ def main():
     if spiders_successful:
         data_processing_successful = False
         try:
-            process_all_json_files(input_folder=RAW_OUTPUT_FOLDER, output_folder=CLEAN_DATA_FOLDER)
+            validation_report = ValidationReport()
+            file_results = process_all_json_files(input_folder=RAW_OUTPUT_FOLDER, output_folder=CLEAN_DATA_FOLDER, workers=os.cpu_count(), report=validation_report)
+            for result in file_results or []:
+                if result["status"] == "failed":
+                    print(f"Data processing failed for {result['file']}: {result['error']}")
+            if validation_report.path:
+                deltas = get_deltas(validation_report.to_dict(), load_previous_report(validation_report.path))
+                data_quality_message = format_deltas(deltas)
+                print(f"Validation report: {validation_report.path}\n{data_quality_message}")
+                if DISCORD_WEBHOOK_URL and data_quality_message:
+                    send_discord_notification(f"\n🔎 DATA QUALITY SUMMARY (validation issues, change since last run)\n{data_quality_message}", DISCORD_WEBHOOK_URL, THREAD_ID)
             if not os.listdir(CLEAN_DATA_FOLDER):
                 print("No data was cleaned nor processed. Skipping load data to Google Sheets")
                 return
@@ -124,6 +136,8 @@ def main():
         if DISCORD_WEBHOOK_URL:
             send_discord_notification(f"\n📗 GOOGLE SHEETS SUMMARY (no.of rows inserted)\n{final_summary_message}", DISCORD_WEBHOOK_URL, THREAD_ID)
 
+    saved_reads = sum(stats["saved_reads"] for stats in REF_DATA.get_stats().values())
+    print(f"\nReference data cache: {saved_reads} file reads saved.")
     print("\nFinished workflow.")
 
 if __name__ == "__main__":
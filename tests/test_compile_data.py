@@ -0,0 +1,38 @@
+import json
+import random
+
+import pytest
+
+from directory_scraper.src.data_processing.compile_data import iter_json_array
+
+def generate_items(rng, count):
+    values = [1, -7, 0, 1.5, -0.25, 1e5, 2.5e-3, 123456789, True, False, None, "", "a,b]", "ç é 中", [1, 2.5], {"x": 1e-5}]
+    items = []
+    for _ in range(count):
+        item = {"id": rng.randint(0, 10 ** rng.randint(0, 9)), "score": rng.uniform(-1e6, 1e6), "value": rng.choice(values)}
+        items.append(rng.choice([item, item["score"], item["id"], item["value"]]))
+    return items
+
+@pytest.mark.parametrize("seed", range(20))
+def test_iter_json_array_small_chunks(tmp_path, seed):
+    rng = random.Random(seed)
+    items = generate_items(rng, rng.randint(0, 30))
+    file_path = tmp_path / "data.json"
+    file_path.write_text(json.dumps(items, indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5), encoding="utf-8")
+    for chunk_size in (1, 2, 3, 5, 7, 64):
+        assert list(iter_json_array(file_path, chunk_size)) == items
+
+@pytest.mark.parametrize("content", ["[1.5]", "[1e5, 2.25E-3]", "[ -0.5 , 10 ]", "[]"])
+def test_iter_json_array_numbers(tmp_path, content):
+    file_path = tmp_path / "data.json"
+    file_path.write_text(content, encoding="utf-8")
+    for chunk_size in range(1, len(content) + 1):
+        assert list(iter_json_array(file_path, chunk_size)) == json.loads(content)
+
+@pytest.mark.parametrize("content", ["[1.5", "[1, 2", "{}", "[1x]"])
+def test_iter_json_array_invalid(tmp_path, content):
+    file_path = tmp_path / "data.json"
+    file_path.write_text(content, encoding="utf-8")
+    for chunk_size in (1, 3, 64):
+        with pytest.raises(ValueError):
+            list(iter_json_array(file_path, chunk_size))